@@ -0,0 +1,8 @@
+"""
+Benchmarks for performance sensitive parts of SALVE.
+
+These are not tests, and are not run as part of the testsuite. Each module
+can be run directly from the root of the repository, as in
+
+>>> python -m benchmarks.tokenize_bench
+"""
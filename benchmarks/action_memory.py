@@ -0,0 +1,79 @@
+"""
+Memory retained by the action tree of a directory block copying a synthetic
+1M-file tree, in bytes per action. The tree is built in memory, as compiling
+the block did before DirTreeCopyAction, with a DirCreateAction and
+DirChmodAction per directory and an ActionList of a FileBackupAction and a
+FileCopyAction per file, so that no files are needed.
+
+    python -m benchmarks.action_memory [NUM_FILES]
+"""
+from __future__ import print_function
+
+import logging
+import sys
+import tracemalloc
+
+import salve
+from salve.action import ActionList, backup, copy
+from salve.block import DirBlock
+from salve.context import ExecutionContext, FileContext
+
+FILES_PER_DIR = 100
+
+
+def expanded_copy_action(block, num_files):
+    """
+    The action tree for copying a tree of @num_files files, in directories
+    of FILES_PER_DIR files each, with @block.
+    """
+    source = block['source']
+    target = block['target']
+    ctx = block.file_context
+    act = ActionList([], ctx)
+    act.append(block._mkdir(target))
+    for i in range(num_files):
+        subdir = 'd%d' % (i // FILES_PER_DIR)
+        if i % FILES_PER_DIR == 0:
+            act.append(block._mkdir(target + '/' + subdir))
+        name = '%s/f%d' % (subdir, i)
+        # backups are prepended to copies, as in FileBlock
+        target_name = target + '/' + name
+        file_act = ActionList([copy.FileCopyAction(source + '/' + name,
+                                                   target_name, ctx)], ctx)
+        file_act.prepend(backup.FileBackupAction(target_name, ctx))
+        act.append(file_act)
+    return act
+
+
+def count_actions(act):
+    if isinstance(act, ActionList):
+        return 1 + sum(count_actions(a) for a in act)
+    return 1
+
+
+def main(num_files):
+    salve.logger.setLevel(logging.WARNING)
+    ExecutionContext()['backup_dir'] = '/var/backups/salve'
+    ExecutionContext()['backup_log'] = '/var/backups/salve.log'
+
+    block = DirBlock(FileContext('/etc/salve/root.manifest', 12))
+    block['source'] = '/srv/assets'
+    block['target'] = '/opt/assets'
+    block['mode'] = '755'
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        act = expanded_copy_action(block, num_files)
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    nbytes = after - before
+    nactions = count_actions(act)
+    print('{0} files, {1} actions: {2:.2f} MB ({3:.1f} bytes/action)'.format(
+        num_files, nactions, nbytes / 2.0 ** 20, nbytes / float(nactions)))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
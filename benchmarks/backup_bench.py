@@ -0,0 +1,91 @@
+"""
+Time to back up large files when each is hashed and then copied into the
+store, as FileBackupAction did, and when it is copied through a hash in
+one pass. When run as root on Linux, the page cache is dropped before each
+run, and the bytes read from storage, read_bytes in /proc/self/io, are
+reported per byte backed up.
+
+    python -m benchmarks.backup_bench [NUM_FILES] [FILE_MB]
+"""
+from __future__ import print_function
+
+import os
+import shutil
+import sys
+import tempfile
+
+from salve import util
+from salve.filesys import ConcreteFilesys
+from salve.filesys.fastcopy import copy_file
+
+from benchmarks.util import best_of, report
+
+
+def bytes_read():
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                if line.startswith('read_bytes:'):
+                    return int(line.split()[1])
+    except IOError:
+        return None
+
+
+def drop_caches():
+    """
+    Empties the page cache, returning False if that is not permitted.
+    """
+    os.system('sync')
+    try:
+        with open('/proc/sys/vm/drop_caches', 'w') as f:
+            f.write('3\n')
+    except IOError:
+        return False
+    return True
+
+
+def main(num_files, file_mb):
+    scratch = tempfile.mkdtemp()
+    try:
+        names = []
+        for i in range(num_files):
+            name = os.path.join(scratch, 'f%d' % i)
+            with open(name, 'wb') as f:
+                for _ in range(file_mb):
+                    f.write(os.urandom(2 ** 20))
+            names.append(name)
+        store = os.path.join(scratch, 'store')
+        total = num_files * file_mb * 2 ** 20
+
+        def two_pass():
+            for name in names:
+                copy_file(name, os.path.join(store,
+                                             util.hash_from_path(name)))
+
+        def one_pass():
+            filesys = ConcreteFilesys()
+            for name in names:
+                filesys.store_hashed(name, store)
+
+        for (label, backup) in (('hash, then copy', two_pass),
+                                ('single pass', one_pass)):
+            def run():
+                shutil.rmtree(store, ignore_errors=True)
+                os.mkdir(store)
+                cold = drop_caches()
+                before = bytes_read()
+                backup()
+                if cold and before is not None:
+                    return (bytes_read() - before) / float(total)
+            t, per_byte = best_of(run)
+            report(label, num_files * file_mb, 'MB', t)
+            if per_byte is not None:
+                print('  {0:.2f} bytes read from storage per byte backed up'.format(
+                    per_byte))
+    finally:
+        shutil.rmtree(scratch)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 8,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 64)
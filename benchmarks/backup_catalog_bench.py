@@ -0,0 +1,68 @@
+"""
+Time to find the versions of a file by scanning the backup log, as the only
+record of backups used to be, and through a BackupCatalog, along with the
+time to build the catalog from the log, and to sync it after a run.
+
+    python -m benchmarks.backup_catalog_bench [NUM_LINES] [NUM_FILES]
+"""
+from __future__ import print_function
+
+import os
+import shutil
+import sys
+import tempfile
+
+from salve.action.backup.catalog import BackupCatalog, parse_log_line
+
+from benchmarks.util import best_of, report
+
+LINE = '2016-01-{0:02d} 12:00:00 {1:0128x} /home/user/.config/file/{2}\n'
+
+
+def write_log(path, start, count, num_files):
+    with open(path, 'a') as f:
+        for i in range(start, start + count):
+            f.write(LINE.format(i % 28 + 1, i, i % num_files))
+
+
+def scan(path, target):
+    versions = []
+    with open(path) as f:
+        for line in f:
+            row = parse_log_line(line[:-1])
+            if row is not None and row[2] == target:
+                versions.append(row[:2])
+    return versions
+
+
+def main(num_lines, num_files):
+    scratch = tempfile.mkdtemp()
+    try:
+        log_path = os.path.join(scratch, 'backup.log')
+        db_path = os.path.join(scratch, 'catalog.db')
+        write_log(log_path, 0, num_lines, num_files)
+        target = '/home/user/.config/file/{0}'.format(num_files // 2)
+
+        t, found = best_of(lambda: scan(log_path, target), repeat=1)
+        report('scan log', 1, 'lookups', t)
+
+        catalog = BackupCatalog(db_path, log_path)
+        t, _ = best_of(catalog.rebuild, repeat=1)
+        report('build catalog', num_lines, 'lines', t)
+
+        t, versions = best_of(lambda: catalog.versions(target), repeat=100)
+        report('catalog versions()', 1, 'lookups', t)
+        assert [tuple(v) for v in versions] == sorted(found), \
+            'catalog and log disagree'
+
+        write_log(log_path, num_lines, 1000, num_files)
+        t, _ = best_of(catalog.sync, repeat=1)
+        report('sync 1000 appended lines', 1000, 'lines', t)
+        catalog.close()
+    finally:
+        shutil.rmtree(scratch)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 10000)
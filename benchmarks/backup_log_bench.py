@@ -0,0 +1,71 @@
+"""
+Time to write backup log lines by opening the log for every line, as
+FileBackupAction did, and through a BackupLog, which batches them, from one
+thread and from several.
+
+    python -m benchmarks.backup_log_bench [NUM_LINES] [THREADS]
+"""
+from __future__ import print_function
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+from salve.action.backup.log import BackupLog
+
+from benchmarks.util import best_of, report
+
+LINE = '2016-01-01 12:00:00 {0} /home/user/.config/some/file/{1}'
+
+
+def per_line(path, lines, lock):
+    for line in lines:
+        with lock:
+            with open(path, 'a') as f:
+                print(line, file=f)
+
+
+def batched(path, lines, backup_log):
+    for line in lines:
+        backup_log.write(line)
+
+
+def main(num_lines, num_threads):
+    scratch = tempfile.mkdtemp()
+    try:
+        path = os.path.join(scratch, 'backup.log')
+        lines = [LINE.format('0' * 128, i) for i in range(num_lines)]
+
+        def run(threads, write, make_arg, finish=lambda arg: None):
+            if os.path.exists(path):
+                os.remove(path)
+            arg = make_arg()
+            share = len(lines) // threads
+            workers = [threading.Thread(
+                target=write,
+                args=(path, lines[i * share:(i + 1) * share], arg))
+                for i in range(threads)]
+            for w in workers:
+                w.start()
+            for w in workers:
+                w.join()
+            finish(arg)
+
+        for threads in (1, num_threads):
+            t, _ = best_of(lambda: run(threads, per_line, threading.Lock))
+            report('open per line, {0} threads'.format(threads),
+                   num_lines, 'lines', t)
+            t, _ = best_of(lambda: run(threads, batched,
+                                       lambda: BackupLog(path),
+                                       lambda log: log.close()))
+            report('BackupLog, {0} threads'.format(threads),
+                   num_lines, 'lines', t)
+    finally:
+        shutil.rmtree(scratch)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 8)
@@ -0,0 +1,77 @@
+"""
+Time to back up many small text files into a BackupStore with each
+compression, and with packing on and off, with the bytes the store takes
+on disk and the number of entries in its largest directory. Then the time
+to check that all of them are stored, as a re-run of the same backups does.
+
+    python -m benchmarks.backup_store_bench [NUM_FILES]
+"""
+from __future__ import print_function
+
+import os
+import shutil
+import sys
+import tempfile
+
+from salve.filesys.store import BackupStore, compression_supported
+
+from benchmarks.util import best_of, report
+
+
+def disk_usage(root):
+    """
+    The bytes allocated to the files under @root, and the number of entries
+    in the largest directory.
+    """
+    total, widest = 0, 0
+    for (dirname, dirs, files) in os.walk(root):
+        widest = max(widest, len(dirs) + len(files))
+        for name in files:
+            total += os.lstat(os.path.join(dirname, name)).st_blocks * 512
+    return total, widest
+
+
+def main(num_files):
+    scratch = tempfile.mkdtemp()
+    try:
+        src = os.path.join(scratch, 'src')
+        os.mkdir(src)
+        names = []
+        for i in range(num_files):
+            name = os.path.join(src, 'f%d' % i)
+            with open(name, 'w') as f:
+                f.write('setting_%d = value\n' % i * (1 + i % 200))
+            names.append(name)
+
+        for compression in ('none', 'zlib', 'lzma'):
+            if not compression_supported(compression):
+                continue
+            for pack_threshold in (0, 16384):
+                root = os.path.join(scratch, 'store')
+
+                def backup():
+                    shutil.rmtree(root, ignore_errors=True)
+                    os.mkdir(root)
+                    store = BackupStore(root, compression=compression,
+                                        pack_threshold=pack_threshold)
+                    for name in names:
+                        store.add_file(name)
+                    store.close()
+
+                label = '{0}, {1}'.format(
+                    compression, 'packed' if pack_threshold else 'loose')
+                t, _ = best_of(backup)
+                report('store ' + label, num_files, 'files', t)
+                store = BackupStore(root)
+                t, _ = best_of(lambda: [store.add_file(name)
+                                        for name in names])
+                report('re-store ' + label, num_files, 'files', t)
+                size, widest = disk_usage(root)
+                print('  {0} KB on disk, {1} entries in largest dir'.format(
+                    size // 1024, widest))
+    finally:
+        shutil.rmtree(scratch)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
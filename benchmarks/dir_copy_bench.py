@@ -0,0 +1,96 @@
+"""
+Time and peak memory of a directory block copy, comparing the streaming
+DirTreeCopyAction against the compile-time os.walk expansion which it
+replaced. Needs Python 3, for tracemalloc.
+
+    python -m benchmarks.dir_copy_bench [NUM_FILES]
+"""
+from __future__ import print_function
+
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import salve
+from salve.action import ActionList, backup, copy, create
+from salve.context import ExecutionContext, FileContext
+from salve.filesys import ConcreteFilesys
+
+FILES_PER_DIR = 100
+
+
+def make_tree(root, num_files):
+    for i in range(num_files):
+        d = os.path.join(root, 'd%d' % (i // FILES_PER_DIR))
+        if i % FILES_PER_DIR == 0:
+            os.makedirs(d)
+        with open(os.path.join(d, 'f%d' % i), 'w') as f:
+            f.write('content %d\n' % i)
+
+
+def walked_copy_action(source, target, ctx):
+    """
+    The action which DirBlock.copy_action produced before DirTreeCopyAction,
+    with an action per directory and a pair of actions per file.
+    """
+    act = ActionList([create.DirCreateAction(target, ctx)], ctx)
+    for d, subdirs, files in os.walk(source):
+        for sd in subdirs:
+            target_dir = os.path.join(
+                target, os.path.relpath(os.path.join(d, sd), source))
+            act.append(create.DirCreateAction(target_dir, ctx))
+        for f in files:
+            target_dir = os.path.join(target, os.path.relpath(d, source))
+            target_fname = os.path.join(target_dir, f)
+            act.append(ActionList([
+                backup.FileBackupAction(target_fname, ctx),
+                copy.FileCopyAction(os.path.join(d, f), target_fname, ctx)
+            ], ctx))
+    return act
+
+
+def tree_copy_action(source, target, ctx):
+    return ActionList([create.DirCreateAction(target, ctx),
+                       copy.DirTreeCopyAction(source, target, ctx)], ctx)
+
+
+def measure(make_action, source, scratch):
+    target = os.path.join(scratch, 'target')
+    ExecutionContext()['backup_dir'] = os.path.join(scratch, 'backups')
+    ExecutionContext()['backup_log'] = os.path.join(scratch, 'backup.log')
+
+    tracemalloc.start()
+    start = time.time()
+    act = make_action(source, target, FileContext('bench'))
+    act(ConcreteFilesys())
+    elapsed = time.time() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    shutil.rmtree(target)
+    return elapsed, peak
+
+
+def main(num_files):
+    # every backup of a fresh target warns that there is nothing to back up
+    salve.logger.setLevel(logging.ERROR)
+    scratch = tempfile.mkdtemp()
+    try:
+        source = os.path.join(scratch, 'source')
+        make_tree(source, num_files)
+        print('{0:<24} {1:>10} {2:>12}'.format('', 'seconds', 'peak MB'))
+        for label, make_action in [('os.walk at compile', walked_copy_action),
+                                   ('DirTreeCopyAction', tree_copy_action)]:
+            elapsed, peak = measure(make_action, source, scratch)
+            print('{0:<24} {1:>10.3f} {2:>12.2f}'.format(
+                label, elapsed, peak / 2.0 ** 20))
+    finally:
+        shutil.rmtree(scratch)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
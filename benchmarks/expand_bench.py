@@ -0,0 +1,90 @@
+"""
+Manifest expansion time, comparing SALVEConfig.apply_to_block against the
+uncached templating which it replaced, both on its own and as part of a full
+ManifestBlock.expand_blocks run.
+
+    python -m benchmarks.expand_bench [NUM_BLOCKS]
+"""
+from __future__ import print_function
+
+import logging
+import os
+import string
+import sys
+
+import mock
+
+import salve
+from salve import paths
+from salve.config import SALVEConfig
+from salve.context import ExecutionContext, FileContext
+from salve.block import ManifestBlock
+from salve.parser.parse import parse_stream
+
+from benchmarks.util import best_of, write_manifest, report
+
+
+def uncached_apply_to_block(conf, block):
+    """
+    SALVEConfig.apply_to_block as it was before substitutions were cached.
+    """
+    ty = block.block_type.lower()
+    relevant_attrs = conf.attributes[ty]
+    for key in relevant_attrs:
+        if key not in block.attrs:
+            block[key] = relevant_attrs[key]
+    for key in conf.attributes['default']:
+        if key not in block.attrs:
+            block[key] = conf.attributes['default'][key]
+    for key in block.attrs:
+        block[key] = string.Template(block[key]).substitute(conf.env)
+
+
+def apply_all(blocks, originals, apply_to_block):
+    for (b, attrs) in zip(blocks, originals):
+        b.attrs = dict(attrs)
+        apply_to_block(b)
+    return [b.attrs for b in blocks]
+
+
+def expand(path):
+    root = ManifestBlock(FileContext('no such file'), source=path)
+    root.expand_blocks(paths.containing_dir(path), False)
+    return [b.attrs for b in root.sub_blocks]
+
+
+def main(num_blocks):
+    salve.logger.setLevel(logging.WARNING)
+    conf = SALVEConfig()
+    ExecutionContext()['config'] = conf
+    ExecutionContext()['parse_cache'] = None
+    # the config sets the log level from its globals
+    salve.logger.setLevel(logging.WARNING)
+
+    def uncached(block):
+        uncached_apply_to_block(conf, block)
+
+    path = write_manifest(num_blocks)
+    try:
+        with open(path) as f:
+            blocks = parse_stream(f)
+        originals = [b.attrs for b in blocks]
+        t_old, old = best_of(lambda: apply_all(blocks, originals, uncached))
+        t_new, new = best_of(lambda: apply_all(blocks, originals,
+                                               conf.apply_to_block))
+        assert old == new
+        with mock.patch.object(conf, 'apply_to_block', uncached):
+            t_old_expand, old = best_of(lambda: expand(path))
+        t_new_expand, new = best_of(lambda: expand(path))
+        assert old == new
+    finally:
+        os.remove(path)
+
+    report('uncached apply', num_blocks, 'blocks', t_old)
+    report('apply_to_block', num_blocks, 'blocks', t_new)
+    report('expand_blocks, uncached', num_blocks, 'blocks', t_old_expand)
+    report('expand_blocks', num_blocks, 'blocks', t_new_expand)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,62 @@
+"""
+Time to copy one large file, and many small ones, with shutil.copyfile,
+which ConcreteFilesys used, and with fastcopy, along with the strategy
+which fastcopy chose. Runs in the system's temporary directory, or in the
+directory given, to compare filesystems.
+
+    python -m benchmarks.file_copy_bench [LARGE_MB] [NUM_SMALL] [DIR]
+"""
+from __future__ import print_function
+
+import os
+import shutil
+import sys
+import tempfile
+
+from salve.filesys import fastcopy
+
+from benchmarks.util import best_of, report
+
+SMALL_SIZE = 4096
+
+
+def main(large_mb, num_small, scratch_parent=None):
+    scratch = tempfile.mkdtemp(dir=scratch_parent)
+    try:
+        large = os.path.join(scratch, 'large')
+        with open(large, 'wb') as f:
+            chunk = os.urandom(2 ** 20)
+            for _ in range(large_mb):
+                f.write(chunk)
+        small_dir = os.path.join(scratch, 'small')
+        os.mkdir(small_dir)
+        for i in range(num_small):
+            with open(os.path.join(small_dir, 'f%d' % i), 'wb') as f:
+                f.write(os.urandom(SMALL_SIZE))
+        small_names = os.listdir(small_dir)
+
+        def copy_large(copy_func):
+            return copy_func(large, large + '.copy')
+
+        def copy_small(copy_func):
+            for name in small_names:
+                result = copy_func(os.path.join(small_dir, name),
+                                   os.path.join(scratch, name))
+            return result
+
+        for (label, count, unit, run) in (
+                ('large file', large_mb, 'MB', copy_large),
+                ('small files', num_small, 'files', copy_small)):
+            t_old, _ = best_of(lambda: run(shutil.copyfile))
+            t_new, strategy = best_of(lambda: run(fastcopy.copy_file))
+            report('shutil.copyfile ' + label, count, unit, t_old)
+            report('fastcopy ' + label, count, unit, t_new)
+            print('fastcopy strategy: ' + strategy)
+    finally:
+        shutil.rmtree(scratch)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 512,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 5000,
+         sys.argv[3] if len(sys.argv) > 3 else None)
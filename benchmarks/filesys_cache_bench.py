@@ -0,0 +1,84 @@
+"""
+Execution time of the actions of many file blocks, each a backup, copy,
+chmod and chown of one file, on a ConcreteFilesys and on a CachingFilesys,
+with the lookup syscalls which the cache saved.
+
+    python -m benchmarks.filesys_cache_bench [NUM_FILES]
+"""
+from __future__ import print_function
+
+import grp
+import logging
+import os
+import pwd
+import shutil
+import sys
+import tempfile
+
+import salve
+from salve.action import ActionList, backup, copy, modify
+from salve.context import ExecutionContext, FileContext
+from salve.filesys import ConcreteFilesys, CachingFilesys
+
+from benchmarks.util import best_of, report
+
+FILES_PER_DIR = 100
+
+
+def file_blocks_action(source, target, num_files, ctx):
+    """
+    The actions compiled from @num_files file blocks, as FileBlock.compile
+    produces them.
+    """
+    user = pwd.getpwuid(os.geteuid()).pw_name
+    group = grp.getgrgid(os.getegid()).gr_name
+    act = ActionList([], ctx)
+    for i in range(num_files):
+        name = 'd%d/f%d' % (i // FILES_PER_DIR, i)
+        dst = os.path.join(target, name)
+        act.append(ActionList([
+            backup.FileBackupAction(dst, ctx),
+            copy.FileCopyAction(os.path.join(source, name), dst, ctx),
+            modify.FileChmodAction(dst, '640', ctx),
+            modify.FileChownAction(dst, user, group, ctx)], ctx))
+    return act
+
+
+def main(num_files):
+    salve.logger.setLevel(logging.ERROR)
+    scratch = tempfile.mkdtemp()
+    source = os.path.join(scratch, 'src')
+    target = os.path.join(scratch, 'dst')
+    ctx = FileContext('bench.manifest')
+
+    try:
+        for i in range(num_files):
+            d = 'd%d' % (i // FILES_PER_DIR)
+            if i % FILES_PER_DIR == 0:
+                os.makedirs(os.path.join(source, d))
+                os.makedirs(os.path.join(target, d))
+            with open(os.path.join(source, d, 'f%d' % i), 'w') as f:
+                f.write('content %d\n' % i)
+
+        def run(filesys):
+            # backups can only execute once, so each run gets a new tree,
+            # and a new backup store, so that later runs are not slowed by
+            # the growth of the store
+            backups = tempfile.mkdtemp(dir=scratch)
+            ExecutionContext()['backup_dir'] = os.path.join(backups, 'backup')
+            ExecutionContext()['backup_log'] = os.path.join(backups, 'log')
+            file_blocks_action(source, target, num_files, ctx)(filesys)
+            return filesys
+
+        t_old, _ = best_of(lambda: run(ConcreteFilesys()))
+        t_new, fs = best_of(lambda: run(CachingFilesys()))
+    finally:
+        shutil.rmtree(scratch)
+
+    report('ConcreteFilesys', num_files, 'files', t_old)
+    report('CachingFilesys', num_files, 'files', t_new)
+    print(fs.report())
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
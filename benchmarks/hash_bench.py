@@ -0,0 +1,72 @@
+"""
+Hashing throughput, in MB/s, of salve.util.hash_file for several hash
+algorithms and file sizes, and of the text-mode SHA-512 hashing which it
+replaced. Files below salve.util.MMAP_THRESHOLD are read in chunks, and
+larger ones hashed through mmap. Each file is hashed once before it is
+timed, so that it is in the page cache.
+
+    python -m benchmarks.hash_bench [TOTAL_MB]
+"""
+from __future__ import print_function
+
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+
+from salve import util
+
+from benchmarks.util import best_of
+
+ALGORITHMS = ('sha512', 'blake2b', 'sha256', 'sha1', 'md5')
+FILE_SIZES = (4 * 2 ** 10, 2 ** 20, 64 * 2 ** 20)
+
+
+def old_hash(path):
+    """
+    The hashing of salve.util.hash_from_path before binary reads.
+    """
+    hash = hashlib.sha512()
+    with open(path) as f:
+        while True:
+            string = f.read(2 ** 20).encode('utf-8')
+            if not string:
+                return hash.hexdigest()
+            hash.update(string)
+
+
+def main(total_mb):
+    scratch = tempfile.mkdtemp()
+    try:
+        print('{0:<24} {1:>10} {2:>10}'.format('algorithm', 'file size',
+                                               'MB/s'))
+        for size in FILE_SIZES:
+            # enough files of this size to hash about total_mb in all
+            count = max(1, total_mb * 2 ** 20 // size)
+            names = []
+            for i in range(count):
+                name = os.path.join(scratch, '%d-%d' % (size, i))
+                # ASCII content, which the old text-mode hashing can read
+                with open(name, 'wb') as f:
+                    f.write(b'0123456789abcdef' * (size // 16))
+                names.append(name)
+
+            runs = [('sha512 (text mode)', old_hash)]
+            runs.extend((a, lambda name, a=a: util.hash_file(name, a))
+                        for a in ALGORITHMS if util.hash_algorithm_supported(a))
+            for (label, hash_func) in runs:
+                for name in names:
+                    hash_func(name)
+                t, _ = best_of(lambda: [hash_func(name) for name in names])
+                print('{0:<24} {1:>10} {2:>10.0f}'.format(
+                    label, size, count * size / 2.0 ** 20 / t))
+
+            for name in names:
+                os.remove(name)
+    finally:
+        shutil.rmtree(scratch)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 256)
@@ -0,0 +1,55 @@
+"""
+Time to hash a tree of files with salve.util.hash_from_path, and through a
+HashCache which was loaded from the file saved by an earlier run, as a
+FileBackupAction hashes its source on every deploy.
+
+    python -m benchmarks.hash_cache_bench [NUM_FILES] [FILE_KB]
+"""
+from __future__ import print_function
+
+import os
+import shutil
+import sys
+import tempfile
+
+from salve import util
+from salve.filesys import hashcache
+from salve.filesys.hashcache import HashCache
+
+from benchmarks.util import best_of, report
+
+
+def main(num_files, file_kb):
+    scratch = tempfile.mkdtemp()
+    try:
+        names = []
+        for i in range(num_files):
+            name = os.path.join(scratch, 'f%d' % i)
+            with open(name, 'wb') as f:
+                f.write(os.urandom(file_kb * 2 ** 10))
+            names.append(name)
+        cache_path = os.path.join(scratch, 'cache', 'hashes.json')
+
+        # the files were just written, so let their hashes be stored
+        hashcache.RACY_SECONDS = -60
+        cache = HashCache(cache_path)
+        for name in names:
+            cache.hash_from_path(name)
+        cache.save()
+
+        def warm_run():
+            cache = HashCache(cache_path)
+            return [cache.hash_from_path(name) for name in names]
+
+        t_old, _ = best_of(lambda: [util.hash_from_path(name)
+                                    for name in names])
+        t_new, _ = best_of(warm_run)
+        report('hash_from_path', num_files, 'files', t_old)
+        report('HashCache, load and look up', num_files, 'files', t_new)
+    finally:
+        shutil.rmtree(scratch)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 256)
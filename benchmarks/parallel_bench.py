@@ -0,0 +1,79 @@
+"""
+Execution time of a tree of independent file copies, each with a backup and
+a chmod, run serially and with execute_parallel on several threads. Also
+reports the time spent building the dependency graph on its own.
+
+    python -m benchmarks.parallel_bench [NUM_FILES] [JOBS...]
+"""
+from __future__ import print_function
+
+import logging
+import os
+import shutil
+import sys
+import tempfile
+
+import salve
+from salve.action import ActionList, backup, copy, modify
+from salve.action.analysis import flatten
+from salve.action.schedule import build_dependencies, execute_parallel
+from salve.context import ExecutionContext, FileContext
+from salve.filesys import ConcreteFilesys
+
+from benchmarks.util import best_of, report
+
+FILES_PER_DIR = 100
+
+
+def file_copy_tree(source, target, num_files, ctx):
+    """
+    The actions of @num_files file blocks, each copying a file from @source
+    to @target, with a backup and a chmod.
+    """
+    act = ActionList([], ctx)
+    for i in range(num_files):
+        name = 'd%d/f%d' % (i // FILES_PER_DIR, i)
+        dst = os.path.join(target, name)
+        act.append(ActionList([
+            backup.FileBackupAction(dst, ctx),
+            copy.FileCopyAction(os.path.join(source, name), dst, ctx),
+            modify.FileChmodAction(dst, '640', ctx)], ctx))
+    return act
+
+
+def main(num_files, jobs_list):
+    salve.logger.setLevel(logging.ERROR)
+    scratch = tempfile.mkdtemp()
+    source = os.path.join(scratch, 'src')
+    target = os.path.join(scratch, 'dst')
+    ExecutionContext()['backup_dir'] = os.path.join(scratch, 'backup')
+    ExecutionContext()['backup_log'] = os.path.join(scratch, 'backup.log')
+    ctx = FileContext('bench.manifest')
+
+    try:
+        for i in range(num_files):
+            d = 'd%d' % (i // FILES_PER_DIR)
+            if i % FILES_PER_DIR == 0:
+                os.makedirs(os.path.join(source, d))
+                os.makedirs(os.path.join(target, d))
+            with open(os.path.join(source, d, 'f%d' % i), 'w') as f:
+                f.write('content %d\n' % i)
+
+        act = file_copy_tree(source, target, num_files, ctx)
+        actions = flatten(act)
+        t_graph, _ = best_of(lambda: build_dependencies(actions))
+        report('build_dependencies', len(actions), 'actions', t_graph)
+
+        # backups can only execute once, so each run gets a new tree
+        for jobs in jobs_list:
+            t, _ = best_of(lambda: execute_parallel(
+                file_copy_tree(source, target, num_files, ctx),
+                ConcreteFilesys(), jobs))
+            report('execute, %d jobs' % jobs, len(actions), 'actions', t)
+    finally:
+        shutil.rmtree(scratch)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+         [int(j) for j in sys.argv[2:]] or [1, 2, 4, 8])
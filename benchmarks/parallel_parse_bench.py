@@ -0,0 +1,60 @@
+"""
+Serial against parallel parsing of single manifests of increasing size, to
+find the size at which the worker processes start to pay for themselves.
+This is what MIN_PARALLEL_SIZE in salve.parser.parallel is based on.
+
+    python -m benchmarks.parallel_parse_bench [PROCESSES]
+"""
+from __future__ import print_function
+
+import logging
+import multiprocessing
+import os
+import sys
+
+import salve
+from salve.parser.parse import parse_stream
+from salve.parser.parallel import generate_blocks_parallel
+
+from benchmarks.util import best_of, write_manifest
+
+SIZES = [1000, 4000, 16000, 64000, 256000]
+
+
+def serial_parse(path):
+    with open(path) as f:
+        return parse_stream(f)
+
+
+def parallel_parse(path, processes):
+    with open(path) as f:
+        # min_size=0 forces the parallel path, whatever the size
+        return list(generate_blocks_parallel(f, processes, min_size=0))
+
+
+def describe(blocks):
+    return [(b.block_type, b.file_context.lineno, b.attrs) for b in blocks]
+
+
+def main(processes):
+    salve.logger.setLevel(logging.WARNING)
+    print('{0:>8} {1:>10} {2:>10} {3:>10} {4:>8}'.format(
+        'blocks', 'MB', 'serial', 'parallel', 'speedup'))
+    for num_blocks in SIZES:
+        path = write_manifest(num_blocks)
+        try:
+            size = os.path.getsize(path)
+            t_serial, serial = best_of(lambda: serial_parse(path))
+            t_parallel, parallel = best_of(
+                lambda: parallel_parse(path, processes))
+        finally:
+            os.remove(path)
+        assert describe(serial) == describe(parallel)
+        print('{0:>8} {1:>10.2f} {2:>9.3f}s {3:>9.3f}s {4:>7.2f}x'.format(
+            num_blocks, size / 2.0 ** 20, t_serial, t_parallel,
+            t_serial / t_parallel))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1
+         else multiprocessing.cpu_count())
@@ -0,0 +1,88 @@
+"""
+Memory retained by the Tokens of a large manifest, comparing the compact
+Token and shared FileContext representation against one Token and one
+FileContext object, each with an instance dict, per token.
+
+    python -m benchmarks.token_memory [NUM_BLOCKS]
+"""
+from __future__ import print_function
+
+import logging
+import os
+import sys
+import tracemalloc
+
+import salve
+from salve import paths
+from salve.parser.scanner import scan
+from salve.parser.tokenize import tokenize_stream
+
+from benchmarks.util import write_manifest
+
+
+class DictFileContext(object):
+    def __init__(self, filename, lineno=None):
+        self.filename = paths.clean_path(filename)
+        self.lineno = lineno
+
+
+class DictToken(object):
+    def __init__(self, value, ty, file_context):
+        self.value = value
+        self.ty = ty
+        self.file_context = file_context
+
+
+def dict_tokenize(path):
+    filename = paths.clean_path(path, absolute=True)
+    with open(path) as f:
+        return [DictToken(value, 'TEMPLATE', DictFileContext(filename, lineno))
+                for (value, lineno) in scan(f)]
+
+
+def compact_tokenize(path):
+    with open(path) as f:
+        return tokenize_stream(f)
+
+
+def retained(func):
+    """
+    Run @func under tracemalloc, returning the number of bytes still
+    allocated while its result is alive, and the result itself.
+    """
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = func()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return after - before, result
+
+
+def main(num_blocks):
+    salve.logger.setLevel(logging.WARNING)
+    path = write_manifest(num_blocks)
+    try:
+        dict_bytes, dict_tokens = retained(lambda: dict_tokenize(path))
+        ntokens = len(dict_tokens)
+        del dict_tokens
+        compact_bytes, compact_tokens = retained(
+            lambda: compact_tokenize(path))
+        assert len(compact_tokens) == ntokens
+    finally:
+        os.remove(path)
+
+    print('Tokenizing {0} blocks ({1} tokens)'.format(num_blocks, ntokens))
+    for (label, nbytes) in [('per-token FileContext', dict_bytes),
+                            ('shared FileContext, __slots__', compact_bytes)]:
+        print('{0:<32} {1:10.2f} MB  ({2:6.1f} bytes/token)'.format(
+            label, nbytes / 2.0 ** 20, nbytes / float(ntokens)))
+    print('saved: {0:.2f} MB ({1:.0f}%)'.format(
+        (dict_bytes - compact_bytes) / 2.0 ** 20,
+        100.0 * (dict_bytes - compact_bytes) / dict_bytes))
+
+
+if __name__ == '__main__':
+    # 14000 generated blocks come to roughly 100k tokens
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 14000)
@@ -0,0 +1,75 @@
+"""
+Tokenizer throughput, in tokens per second, comparing the scanner against
+the shlex based lexing which it replaced, and full parser throughput in
+blocks per second.
+
+    python -m benchmarks.tokenize_bench [NUM_BLOCKS]
+"""
+from __future__ import print_function
+
+import logging
+import os
+import shlex
+import sys
+
+import salve
+from salve.parser.scanner import scan, WORDCHARS
+from salve.parser.tokenize import tokenize_stream
+from salve.parser.parse import parse_stream
+
+from benchmarks.util import best_of, write_manifest, report
+
+
+def shlex_lex(path):
+    with open(path) as f:
+        shlexer = shlex.shlex(f, posix=True)
+        shlexer.wordchars = WORDCHARS
+        count = 0
+        current = shlexer.get_token()
+        while current is not None:
+            count += 1
+            current = shlexer.get_token()
+        return count
+
+
+def scanner_lex(path):
+    with open(path) as f:
+        count = 0
+        for tok in scan(f):
+            count += 1
+        return count
+
+
+def full_tokenize(path):
+    with open(path) as f:
+        return len(tokenize_stream(f))
+
+
+def full_parse(path):
+    with open(path) as f:
+        return len(parse_stream(f))
+
+
+def main(num_blocks):
+    salve.logger.setLevel(logging.WARNING)
+    path = write_manifest(num_blocks)
+    try:
+        t_shlex, n_shlex = best_of(lambda: shlex_lex(path))
+        t_scan, n_scan = best_of(lambda: scanner_lex(path))
+        t_full, n_full = best_of(lambda: full_tokenize(path))
+        t_parse, n_parse = best_of(lambda: full_parse(path))
+    finally:
+        os.remove(path)
+
+    assert n_shlex == n_scan == n_full
+
+    print('Tokenizing {0} blocks ({1} tokens)'.format(num_blocks, n_scan))
+    report('shlex get_token()', n_shlex, 'tokens', t_shlex)
+    report('scanner', n_scan, 'tokens', t_scan)
+    report('tokenize_stream (scanner)', n_full, 'tokens', t_full)
+    report('parse_stream', n_parse, 'blocks', t_parse)
+    print('scanner speedup over shlex: {0:.1f}x'.format(t_shlex / t_scan))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
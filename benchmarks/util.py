@@ -0,0 +1,84 @@
+from __future__ import print_function
+
+import os
+import tempfile
+import time
+
+
+def best_of(func, repeat=3):
+    """
+    Run @func @repeat times, and return the best wall clock time, in seconds,
+    along with the result of the last run.
+
+    Args:
+        @func
+        A callable taking no arguments.
+
+    KWArgs:
+        @repeat=3
+        The number of times to run @func.
+    """
+    best = None
+    result = None
+    for i in range(repeat):
+        start = time.time()
+        result = func()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+
+def manifest_text(num_blocks):
+    """
+    Generate the text of a manifest with @num_blocks blocks, mixing the
+    block styles that appear in real manifests.
+
+    Args:
+        @num_blocks
+        The number of blocks to generate.
+    """
+    chunks = []
+    for i in range(num_blocks):
+        if i % 3 == 0:
+            chunks.append('file $HOME/target/f%d\n' % i)
+        elif i % 3 == 1:
+            chunks.append(
+                '# a generated block\n'
+                'file {\n'
+                '    action copy\n'
+                '    source files/f%d\n'
+                '    target "$HOME/target dir/f%d"\n'
+                '    mode 644\n'
+                '}\n' % (i, i))
+        else:
+            chunks.append(
+                'directory {\n'
+                '    action create\n'
+                '    target $HOME/target/d%d\n'
+                '    user $USER\n'
+                '}\n' % i)
+    return ''.join(chunks)
+
+
+def write_manifest(num_blocks):
+    """
+    Write a generated manifest to a temporary file, returning its path.
+    The caller is responsible for removing the file.
+
+    Args:
+        @num_blocks
+        The number of blocks to generate.
+    """
+    fd, path = tempfile.mkstemp(suffix='.manifest')
+    with os.fdopen(fd, 'w') as f:
+        f.write(manifest_text(num_blocks))
+    return path
+
+
+def report(label, count, unit, seconds):
+    """
+    Print a single benchmark result line.
+    """
+    print('{0:<32} {1:>10} {2} in {3:8.4f}s  ({4:12.0f} {2}/s)'.format(
+        label, count, unit, seconds, count / seconds))
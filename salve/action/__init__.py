@@ -4,7 +4,8 @@ from .dynamic import DynamicAction
 from .list import ActionList
 from .shell import ShellAction
 
-from .copy import CopyAction, FileCopyAction, DirCopyAction
+from .copy import CopyAction, FileCopyAction, DirCopyAction, \
+    DirTreeCopyAction
 from .backup import BackupAction, FileBackupAction, DirBackupAction
 
 from .create import CreateAction, FileCreateAction, DirCreateAction
@@ -13,13 +14,15 @@ from .modify import ModifyAction, DirModifyAction, \
     ChownAction, ChmodAction, \
     FileChownAction, FileChmodAction, DirChownAction, DirChmodAction
 
+from .ensure import EnsureAction, FileEnsureAction, DirEnsureAction
+
 
 __all__ = [
     'Action', 'DynamicAction',
 
     'ActionList', 'ShellAction',
 
-    'CopyAction', 'FileCopyAction', 'DirCopyAction',
+    'CopyAction', 'FileCopyAction', 'DirCopyAction', 'DirTreeCopyAction',
 
     'BackupAction', 'FileBackupAction', 'DirBackupAction',
 
@@ -27,5 +30,7 @@ __all__ = [
 
     'ModifyAction', 'DirModifyAction', 'ChownAction', 'ChmodAction',
     'FileChownAction', 'FileChmodAction',
-    'DirChownAction', 'DirChmodAction'
+    'DirChownAction', 'DirChmodAction',
+
+    'EnsureAction', 'FileEnsureAction', 'DirEnsureAction'
 ]
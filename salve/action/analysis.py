@@ -0,0 +1,96 @@
+import os
+
+from .list import ActionList
+from .copy import FileCopyAction, DirCopyAction, DirTreeCopyAction
+from .backup import FileBackupAction, DirBackupAction
+from .create import FileCreateAction, DirCreateAction
+from .modify import FileChmodAction, DirChmodAction, \
+    FileChownAction, DirChownAction, ChownAction
+from .ensure import EnsureAction, FileEnsureAction, DirEnsureAction
+
+
+# the paths which each type of action reads or writes, which are used to
+# decide which actions may be reordered, removed or run at the same time
+# an action of any other type, such as a ShellAction, may touch any path
+_touched_paths = {
+    FileCopyAction: lambda a: (a.src, a.dst),
+    DirCopyAction: lambda a: (a.src, a.dst),
+    DirTreeCopyAction: lambda a: (a.src, a.dst),
+    FileBackupAction: lambda a: (a.src, a.source) if a.source
+    else (a.src,),
+    DirBackupAction: lambda a: (a.src,),
+    FileCreateAction: lambda a: (a.dst,),
+    DirCreateAction: lambda a: (a.dst,),
+    FileChmodAction: lambda a: (a.target,),
+    DirChmodAction: lambda a: (a.target,),
+    FileChownAction: lambda a: (a.target,),
+    DirChownAction: lambda a: (a.target,),
+    FileEnsureAction: lambda a: (a.target, a.source) if a.source
+    else (a.target,),
+    DirEnsureAction: lambda a: (a.target,),
+}
+
+
+def touched_paths(act):
+    """
+    Get the normalized paths which @act reads or writes, or None if it may
+    touch any path.
+    """
+    get_paths = _touched_paths.get(type(act))
+    if get_paths is None:
+        return None
+    return tuple(os.path.normpath(p) for p in get_paths(act))
+
+
+def related(path, other):
+    """
+    Checks if two normalized paths are the same, or if one contains the
+    other. Acting on either one may change the other.
+    """
+    if path == other:
+        return True
+    if len(path) > len(other):
+        path, other = other, path
+    return other.startswith(path.rstrip('/') + '/')
+
+
+def conflicts(act, paths):
+    """
+    Checks if @act may read or write any of @paths.
+    """
+    touched = touched_paths(act)
+    if touched is None:
+        return True
+    return any(related(p, q) for p in touched for q in paths)
+
+
+def flatten(act):
+    """
+    Get the actions in the tree under @act, in the order in which they are
+    executed, with all ActionLists removed. Subclasses of ActionList, like
+    DirBackupAction, are kept whole.
+    """
+    flat = []
+    pending = [act]
+    while pending:
+        a = pending.pop()
+        if type(a) is ActionList:
+            pending.extend(reversed(list(a)))
+        else:
+            flat.append(a)
+    return flat
+
+
+def owners(act):
+    """
+    Get the users and groups which the actions in the tree under @act may
+    chown files to, as a pair of sets. Actions synthesized during
+    execution, as by a recursive chown, use the same ones.
+    """
+    users = set()
+    groups = set()
+    for a in flatten(act):
+        if isinstance(a, (ChownAction, EnsureAction)) and a.user is not None:
+            users.add(a.user)
+            groups.add(a.group)
+    return users, groups
@@ -7,6 +7,29 @@ from salve.action.copy import CopyAction
 from salve.context import ExecutionContext
 
 
+# normalized (backup_dir, backup_log, files dir) triples, keyed on the
+# backup_dir and backup_log settings they were built from
+_locations_cache = {}
+
+
+def _backup_locations():
+    """
+    Get the normalized backup_dir and backup_log, and the directory in which
+    backed up files are stored, for the current settings. The same strings
+    are returned for every backup, rather than building new ones for each of
+    the (possibly millions of) BackupActions in an action tree.
+    """
+    key = (ExecutionContext()['backup_dir'], ExecutionContext()['backup_log'])
+    try:
+        return _locations_cache[key]
+    except KeyError:
+        backup_dir = os.path.normpath(key[0])
+        locations = (backup_dir, os.path.normpath(key[1]),
+                     paths.pjoin(backup_dir, 'files'))
+        _locations_cache[key] = locations
+        return locations
+
+
 class BackupAction(with_metaclass(abc.ABCMeta, CopyAction)):
     """
     The base class for all BackupActions, all of which are types of
@@ -14,7 +37,11 @@ class BackupAction(with_metaclass(abc.ABCMeta, CopyAction)):
 
     A BackupAction takes a file to backup, a backup directory and
     logfile, and performs the mechanics of a backup operation.
+
+    As with CopyAction, the fields are slots of the concrete subclasses.
     """
+    __slots__ = ()
+
     def __init__(self, src, file_context):
         """
         BackupAction constructor.
@@ -25,16 +52,12 @@ class BackupAction(with_metaclass(abc.ABCMeta, CopyAction)):
             @file_context
             The FileContext.
         """
-        backup_dir = os.path.normpath(ExecutionContext()['backup_dir'])
-        backup_log = os.path.normpath(ExecutionContext()['backup_log'])
+        backup_dir, backup_log, files_dir = _backup_locations()
         # in the default case, a Backup is a File Copy into the
         # backup_dir in which the target filename is @src's abspath
         # this leads to bad behavior if run as-is, but can serve as a
         # useful basis for the actual BackupAction
-        CopyAction.__init__(self,
-                            src,
-                            paths.pjoin(backup_dir, 'files'),
-                            file_context)
+        CopyAction.__init__(self, src, files_dir, file_context)
         # although redundant with CopyAction, useful for pretty printing
         self.backup_dir = backup_dir
         # backup_log is a clunky name internally, since we know this is
@@ -0,0 +1,178 @@
+import itertools
+import os
+import sqlite3
+
+from salve import paths
+from salve.context import ExecutionContext
+
+# the name of the catalog, in backup_dir
+CATALOG_NAME = 'catalog.db'
+
+# the number of log lines inserted by each executemany() during a sync
+SYNC_BATCH = 10000
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS backups ('
+    ' time TEXT NOT NULL, hash TEXT NOT NULL, path TEXT NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS backups_by_path ON backups (path, time)',
+    # the inode of the backup log, and how much of it has been read, in
+    # bytes, in a single row
+    'CREATE TABLE IF NOT EXISTS log_state ('
+    ' id INTEGER PRIMARY KEY CHECK (id = 0),'
+    ' inode INTEGER NOT NULL, offset INTEGER NOT NULL)',
+)
+
+
+def parse_log_line(line):
+    """
+    Split a line of the backup log, as written by FileBackupAction, into
+    a (time, hash, path) triple, or return None if it is malformed.
+
+    Args:
+        @line
+        The line, without its newline.
+    """
+    fields = line.split(' ', 3)
+    if len(fields) != 4:
+        return None
+    (date, clock, hash_val, path) = fields
+    return (date + ' ' + clock, hash_val, path)
+
+
+class BackupCatalog(object):
+    """
+    An index of the backup log, in SQLite, so that the versions of a file
+    are found without reading the whole log.
+
+    The log remains the record of every backup, and the catalog only
+    indexes it. The catalog remembers how much of the log it has read, and
+    sync() reads whatever has been appended since, so it is kept up to date
+    however the log was written. If the log was replaced or truncated, the
+    catalog is rebuilt from the start of it.
+    """
+    def __init__(self, path, logfile):
+        """
+        BackupCatalog constructor.
+
+        Args:
+            @path
+            The SQLite database of the catalog, which is created if it does
+            not exist.
+            @logfile
+            The backup log which it indexes.
+        """
+        self.path = path
+        self.logfile = logfile
+        # transactions are begun explicitly, so that a sync takes the write
+        # lock before it reads where the last one stopped
+        self.conn = sqlite3.connect(path, isolation_level=None)
+        for statement in _SCHEMA:
+            self.conn.execute(statement)
+
+    def close(self):
+        self.conn.close()
+
+    def _ingest(self, f, offset):
+        """
+        Insert the lines of the log from @offset onward, stopping before an
+        incomplete last line, in one streaming pass. Returns the offset up
+        to which the log was read, and the number of backups inserted.
+        """
+        f.seek(offset)
+        read_to = [offset]
+
+        def rows():
+            for line in f:
+                # a line without its newline is still being written
+                if not line.endswith(b'\n'):
+                    return
+                read_to[0] += len(line)
+                row = parse_log_line(
+                    line[:-1].decode('utf-8', 'replace'))
+                if row is not None:
+                    yield row
+
+        rows = rows()
+        count = 0
+        while True:
+            batch = list(itertools.islice(rows, SYNC_BATCH))
+            if not batch:
+                return (read_to[0], count)
+            self.conn.executemany(
+                'INSERT INTO backups (time, hash, path) VALUES (?, ?, ?)',
+                batch)
+            count += len(batch)
+
+    def sync(self):
+        """
+        Index the lines appended to the log since the last sync, or the
+        whole log if it was replaced or truncated since. Returns the number
+        of lines indexed.
+        """
+        try:
+            f = open(self.logfile, 'rb')
+        except IOError:
+            return 0
+        with f:
+            st = os.fstat(f.fileno())
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                state = self.conn.execute(
+                    'SELECT inode, offset FROM log_state').fetchone()
+                if state is None or state[0] != st.st_ino or \
+                   state[1] > st.st_size:
+                    # the index is dropped while the whole log is read, and
+                    # built once at the end, which is much faster
+                    self.conn.execute('DELETE FROM backups')
+                    self.conn.execute('DROP INDEX IF EXISTS backups_by_path')
+                    (offset, added) = self._ingest(f, 0)
+                    self.conn.execute(_SCHEMA[1])
+                elif state[1] == st.st_size:
+                    self.conn.execute('ROLLBACK')
+                    return 0
+                else:
+                    (offset, added) = self._ingest(f, state[1])
+                self.conn.execute(
+                    'INSERT OR REPLACE INTO log_state (id, inode, offset) '
+                    'VALUES (0, ?, ?)', (st.st_ino, offset))
+                self.conn.execute('COMMIT')
+            except BaseException:
+                self.conn.execute('ROLLBACK')
+                raise
+        return added
+
+    def rebuild(self):
+        """
+        Discard the index, and build it again from the whole log.
+        """
+        self.conn.execute('DELETE FROM log_state')
+        return self.sync()
+
+    def count(self):
+        """
+        Get the number of backups in the catalog.
+        """
+        return self.conn.execute('SELECT COUNT(*) FROM backups').fetchone()[0]
+
+    def versions(self, path):
+        """
+        Get the backed up versions of the file at @path, oldest first, as a
+        list of (time, hash) pairs.
+
+        Args:
+            @path
+            The absolute path to the file, as it appears in the log.
+        """
+        return self.conn.execute(
+            'SELECT time, hash FROM backups WHERE path = ? '
+            'ORDER BY time, rowid', (path,)).fetchall()
+
+
+def open_catalog():
+    """
+    Open the BackupCatalog kept in the backup_dir of the ExecutionContext,
+    which indexes its backup_log.
+    """
+    ctx = ExecutionContext()
+    return BackupCatalog(paths.pjoin(ctx['backup_dir'], CATALOG_NAME),
+                         ctx['backup_log'])
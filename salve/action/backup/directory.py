@@ -11,6 +11,8 @@ class DirBackupAction(ActionList, BackupAction):
     A single dir Backupaction. This is a type of BackupAction, and
     therefore a CopyAction, but also an AL of file backups.
     """
+    __slots__ = ('src', 'dst', 'backup_dir', 'logfile')
+
     verification_codes = \
         BackupAction.verification_codes.extend('NONEXISTENT_SOURCE')
 
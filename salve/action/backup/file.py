@@ -4,11 +4,12 @@ import time
 
 from salve import logger, paths
 from salve.action.backup.base import BackupAction
+from salve.action.backup.log import open_log
 from salve.action.copy import FileCopyAction
+from salve.action.copy.file import identical_files
 
 from salve.filesys import access_codes
 from salve.context import ExecutionContext
-from salve.util import hash_from_path
 
 
 class FileBackupAction(BackupAction, FileCopyAction):
@@ -16,10 +17,12 @@ class FileBackupAction(BackupAction, FileCopyAction):
     A single file Backupaction. This is a type of BackupAction, and
     therefore a CopyAction, but more specifically a FileCopyAction.
     """
+    __slots__ = ('backup_dir', 'logfile', 'hash_val', 'source')
+
     verification_codes = \
         FileCopyAction.verification_codes.extend('NONEXISTENT_SOURCE')
 
-    def __init__(self, src, file_context):
+    def __init__(self, src, file_context, source=None):
         """
         FileBackupAction constructor.
 
@@ -28,12 +31,19 @@ class FileBackupAction(BackupAction, FileCopyAction):
             The source file.
             @file_context
             The FileContext.
+
+        KWArgs:
+            @source
+            The file which is about to be copied over @src, if any. When
+            @src is already identical to it, @src will not change, so it is
+            not backed up.
         """
         # initialize as a BackupAction with a destination in the @backup_dir
         # should include initialization as a CopyAction
         BackupAction.__init__(self, src, file_context)
         # the hash_val is the result of taking the sha hash of @src
         self.hash_val = None
+        self.source = source
 
     def __str__(self):
         return ("FileBackupAction(src=" + self.src + ",backup_dir=" +
@@ -74,8 +84,8 @@ class FileBackupAction(BackupAction, FileCopyAction):
         """
         Perform the FileBackupAction.
 
-        Rewrites dst based on the value of the @src, does a file copy,
-        then writes to the logfile.
+        Rewrites dst based on the value of the @src, stores a copy of
+        @src there, then writes to the logfile.
         """
         vcode = self.verify_can_exec(filesys)
 
@@ -92,6 +102,13 @@ class FileBackupAction(BackupAction, FileCopyAction):
             logger.warn('{0}: {1}'.format(self.file_context, logstr))
             return
 
+        if self.source is not None and \
+           identical_files(filesys, self.source, self.src) is not None:
+            logstr = ('FileBackup: Skipping unchanged file \"%s\"' %
+                      self.src)
+            logger.info('{0}: {1}'.format(self.file_context, logstr))
+            return
+
         # transition to the execution phase
         ExecutionContext().transition(ExecutionContext.phases.EXECUTION)
 
@@ -102,16 +119,11 @@ class FileBackupAction(BackupAction, FileCopyAction):
 
         filesys.mkdir(self.dst)
 
-        self.hash_val = hash_from_path(self.src)
-
-        # update dst so that the FileCopyAction can run correctly
+        # a file is hashed as it is copied into the store, so that it is
+        # read only once, and dst names the object within the store
+        self.hash_val = filesys.store_hashed(self.src, self.dst)
         self.dst = paths.pjoin(self.dst, self.hash_val)
 
-        # if the backup exists, no need to actually rewrite it
-        if not filesys.exists(self.dst):
-            # otherwise, invoke the FileCopyAction execution
-            FileCopyAction.execute(self, filesys)
-
         self.write_log()
 
     def write_log(self):
@@ -121,7 +133,4 @@ class FileBackupAction(BackupAction, FileCopyAction):
         logval = time.strftime('%Y-%m-%d %H:%M:%S') + ' ' + \
             self.hash_val + ' ' + \
             paths.clean_path(self.src, absolute=True)
-        # TODO: use some locks to make this thread-safe for future
-        # versions of SALVE supporting parallelism
-        with open(self.logfile, 'a') as f:
-            print(logval, file=f)
+        open_log(self.logfile).write(logval)
@@ -0,0 +1,158 @@
+import atexit
+import contextlib
+import signal
+import sys
+import threading
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    # without fcntl, writes are only serialized within a process
+    fcntl = None
+
+# the default number of lines which are buffered before they are written
+DEFAULT_MAX_LINES = 1024
+
+
+class BackupLog(object):
+    """
+    A writer for a backup log, which stays open for a whole run and writes
+    lines in batches, rather than opening the log for every line.
+
+    Lines are buffered, up to @max_lines of them, and each batch is
+    appended under an fcntl lock on the log, so that batches written by
+    concurrent runs are never interleaved. Writes from many threads are
+    serialized by a lock of the writer's own.
+    """
+    def __init__(self, path, max_lines=DEFAULT_MAX_LINES):
+        """
+        BackupLog constructor.
+
+        Args:
+            @path
+            The path to the log, which is created if it does not exist.
+
+        KWArgs:
+            @max_lines
+            The number of lines to buffer before writing them out.
+        """
+        self.path = path
+        self.max_lines = max_lines
+        self.lock = threading.Lock()
+        self.lines = []
+        self.f = open(path, 'a')
+
+    def write(self, line):
+        """
+        Add a line to the log, which is written out once the buffer is
+        full, or when the log is flushed or closed.
+
+        Args:
+            @line
+            The line, without a newline.
+        """
+        with self.lock:
+            self.lines.append(line + '\n')
+            if len(self.lines) >= self.max_lines:
+                self._flush()
+
+    def _flush(self):
+        if not self.lines:
+            return
+        data = ''.join(self.lines)
+        self.lines = []
+        # a line written after the log was closed, by an action which was
+        # still running, reopens it
+        if self.f is None:
+            self.f = open(self.path, 'a')
+        if fcntl is not None:
+            fcntl.lockf(self.f.fileno(), fcntl.LOCK_EX)
+        try:
+            self.f.write(data)
+            self.f.flush()
+        finally:
+            if fcntl is not None:
+                fcntl.lockf(self.f.fileno(), fcntl.LOCK_UN)
+
+    def flush(self):
+        """
+        Write out all buffered lines.
+        """
+        with self.lock:
+            self._flush()
+
+    def close(self):
+        """
+        Write out all buffered lines, and close the log.
+        """
+        with self.lock:
+            self._flush()
+            if self.f is not None:
+                self.f.close()
+                self.f = None
+
+
+# the open BackupLogs, keyed on their paths, so that every backup in a run
+# writes through the same buffer
+_logs = {}
+_logs_lock = threading.Lock()
+
+
+def open_log(path):
+    """
+    Get the BackupLog for the log at @path, opening it if needed.
+    """
+    with _logs_lock:
+        try:
+            return _logs[path]
+        except KeyError:
+            log = BackupLog(path)
+            _logs[path] = log
+            return log
+
+
+def close_logs():
+    """
+    Close all open BackupLogs, writing out their buffered lines.
+    """
+    with _logs_lock:
+        logs = list(_logs.values())
+        _logs.clear()
+    for log in logs:
+        log.close()
+
+
+# lines still buffered when the interpreter exits are written out
+atexit.register(close_logs)
+
+
+def _exit_on_signal(signum, frame):
+    # exiting, rather than being killed, unwinds the run, so that the logs
+    # are closed by it, or by atexit, and no buffered line is lost
+    sys.exit(128 + signum)
+
+
+@contextlib.contextmanager
+def exit_cleanly_on_signals():
+    """
+    Within the context, SIGTERM and SIGHUP make SALVE exit, which writes
+    out buffered backup log lines, rather than be killed outright, which
+    would lose them. SIGINT already does so, by raising KeyboardInterrupt.
+
+    Handlers can only be set in the main thread, so elsewhere this does
+    nothing.
+    """
+    previous = {}
+    for name in ('SIGTERM', 'SIGHUP'):
+        signum = getattr(signal, name, None)
+        if signum is None:  # pragma: no cover
+            continue
+        try:
+            previous[signum] = signal.signal(signum, _exit_on_signal)
+        except ValueError:
+            break
+    try:
+        yield
+    finally:
+        for (signum, handler) in previous.items():
+            signal.signal(signum, handler)
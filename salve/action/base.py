@@ -12,7 +12,14 @@ class Action(with_metaclass(abc.ABCMeta, CompiledBlock)):
     but typically are limited to moving and creating files and
     directories explicitly.
     There is no meaningful generic Action, so this is an ABC.
+
+    Actions are slotted, since a large manifest tree compiles to a great
+    many of them. In the diamond hierarchies, like FileBackupAction, only
+    one branch may add slots, so the abstract classes in the other branches
+    have none, and their fields are slots of the concrete classes.
     """
+    __slots__ = ('file_context',)
+
     # by default, the only verification code is OK
     verification_codes = Enum('OK')
 
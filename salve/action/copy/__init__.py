@@ -1,9 +1,11 @@
 from .base import CopyAction
 from .file import FileCopyAction
 from .directory import DirCopyAction
+from .tree import DirTreeCopyAction
 
 __all__ = [
     'CopyAction',
     'FileCopyAction',
-    'DirCopyAction'
+    'DirCopyAction',
+    'DirTreeCopyAction'
 ]
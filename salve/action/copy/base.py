@@ -12,7 +12,12 @@ class CopyAction(with_metaclass(abc.ABCMeta, Action)):
     A generic Copy takes a source and destination, and copies the
     source to the destination. The meanings of a Copy vary between
     files and directories, so this is an ABC.
+
+    The src and dst fields are slots of the concrete subclasses, so that
+    DirBackupAction can also be an ActionList.
     """
+    __slots__ = ()
+
     verification_codes = \
         Action.verification_codes.extend('UNWRITABLE_TARGET',
                                          'UNREADABLE_SOURCE')
@@ -5,6 +5,8 @@ from salve.context import ExecutionContext
 
 
 class DirCopyAction(CopyAction):
+    __slots__ = ('src', 'dst')
+
     def verify_can_exec(self, filesys):
         """
         Check to ensure that execution can proceed without errors.
@@ -1,10 +1,77 @@
+import stat
+import threading
+
 from salve import logger
 from salve.action.copy.base import CopyAction
 from salve.filesys import access_codes
 from salve.context import ExecutionContext
 
+# the number of files, and of bytes, which copies did not write, because
+# the target was already identical to the source
+_skipped = [0, 0]
+_skipped_lock = threading.Lock()
+
+
+def identical_files(filesys, src, dst):
+    """
+    Checks if @dst is a regular file with the same contents as the regular
+    file @src, so that copying @src over it would change nothing. Returns
+    the size of the files if so, and None otherwise.
+
+    Files of different sizes are never identical. Files of the same size
+    are compared by hash, unless the trust_mtime setting is on and @dst was
+    modified no earlier than @src, in which case they are taken to be
+    identical without reading either one.
+
+    Args:
+        @filesys
+        The filesystem on which to look.
+        @src
+        @dst
+        The paths to the files.
+    """
+    try:
+        src_st = filesys.stat(src)
+        dst_st = filesys.stat(dst)
+    except OSError:
+        return None
+    if not stat.S_ISREG(src_st.st_mode) or \
+       not stat.S_ISREG(dst_st.st_mode) or \
+       src_st.st_size != dst_st.st_size:
+        return None
+
+    ctx = ExecutionContext()
+    trust_mtime = 'trust_mtime' in ctx and ctx['trust_mtime']
+    if not (trust_mtime and dst_st.st_mtime >= src_st.st_mtime) and \
+       filesys.hash(src) != filesys.hash(dst):
+        return None
+    return dst_st.st_size
+
+
+def skipped_copies():
+    """
+    Get the number of files, and of bytes, which copies did not write,
+    because the target was already identical to the source, as a pair.
+    """
+    with _skipped_lock:
+        return tuple(_skipped)
+
+
+def reset_skipped_copies():
+    """
+    Reset the counts returned by skipped_copies().
+    """
+    with _skipped_lock:
+        _skipped[:] = [0, 0]
+
 
 class FileCopyAction(CopyAction):
+    """
+    Copies a single file or link. A regular file which is already
+    identical to its source is not copied over.
+    """
+    __slots__ = ('src', 'dst')
+
     def verify_can_exec(self, filesys):
         """
         Check to ensure that execution can proceed without errors.
@@ -53,9 +120,21 @@ class FileCopyAction(CopyAction):
             logger.warn('{0}: {1}'.format(self.file_context, logstr))
             return
 
+        size = identical_files(filesys, self.src, self.dst)
+        if size is not None:
+            logstr = 'FileCopy: Skipping identical target \"%s\"' % self.dst
+            logger.info('{0}: {1}'.format(self.file_context, logstr))
+            with _skipped_lock:
+                _skipped[0] += 1
+                _skipped[1] += size
+            return
+
         ExecutionContext().transition(ExecutionContext.phases.EXECUTION)
 
         logstr = 'Performing File Copy \"%s\" -> \"%s\"' % (self.src, self.dst)
         logger.info('{0}: {1}'.format(self.file_context, logstr))
 
-        filesys.copy(self.src, self.dst)
+        strategy = filesys.copy(self.src, self.dst)
+        if strategy is not None:
+            logstr = 'FileCopy: Copied \"%s\" by %s' % (self.dst, strategy)
+            logger.info('{0}: {1}'.format(self.file_context, logstr))
@@ -0,0 +1,126 @@
+from salve import logger, paths
+from salve.action.copy.base import CopyAction
+from salve.action.copy.file import FileCopyAction
+from salve.action.create import DirCreateAction
+from salve.action.modify import DirChmodAction
+from salve.filesys import access_codes
+from salve.context import ExecutionContext
+
+
+class DirTreeCopyAction(CopyAction):
+    """
+    Copies the contents of a directory tree into an existing directory, one
+    entry at a time. Every subdirectory is created (and chmoded, if a mode is
+    given), and every file is backed up and then copied.
+
+    The source tree is only walked when the action executes, and the work
+    for each entry is done as the entry is found, so the memory used does
+    not grow with the size of the tree.
+    """
+    __slots__ = ('src', 'dst', 'mode')
+
+    def __init__(self, src, dst, file_context, mode=None):
+        """
+        DirTreeCopyAction constructor.
+
+        Args:
+            @src
+            The directory whose contents are copied.
+            @dst
+            The directory into which they are copied.
+            @file_context
+            The FileContext.
+
+        KWArgs:
+            @mode
+            The umask, as an octal string, of the created subdirectories.
+            When None, they are not chmoded.
+        """
+        CopyAction.__init__(self, src, dst, file_context)
+        self.mode = mode
+
+    def verify_can_exec(self, filesys):
+        """
+        Check to ensure that execution can proceed without errors.
+        Ensures that the source directory is readable and traversable. The
+        entries are verified one at a time, as they are copied.
+        """
+        ExecutionContext().transition(ExecutionContext.phases.VERIFICATION)
+
+        logstr = ('DirTreeCopy: Checking source is readable + traversable, ' +
+                  '\"{0}\"'.format(self.src))
+        logger.info('{0}: {1}'.format(self.file_context, logstr))
+
+        if not filesys.access(self.src, access_codes.R_OK | access_codes.X_OK):
+            return self.verification_codes.UNREADABLE_SOURCE
+
+        return self.verification_codes.OK
+
+    def _copy_entries(self, filesys, src_dir, dst_dir):
+        """
+        Copy the entries of a single directory, returning a list of the
+        (source, destination) pairs of the subdirectories to descend into.
+
+        Args:
+            @filesys
+            The filesystem on which to copy.
+            @src_dir
+            The directory whose entries are copied.
+            @dst_dir
+            The directory into which they are copied.
+        """
+        # the import must be here, because backups are a type of copy
+        from salve.action.backup import FileBackupAction
+
+        subdirs = []
+        for entry in filesys.scandir(src_dir):
+            src = paths.pjoin(src_dir, entry.name)
+            dst = paths.pjoin(dst_dir, entry.name)
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+
+            # synthesize the same actions as a DirBlock copy would for
+            # each entry, and invoke them
+            # as in os.walk, links to dirs are created as dirs, but not
+            # descended into
+            if is_dir:
+                DirCreateAction(dst, self.file_context)(filesys)
+                if self.mode is not None:
+                    DirChmodAction(dst, self.mode, self.file_context)(filesys)
+                if not entry.is_symlink():
+                    subdirs.append((src, dst))
+            else:
+                FileBackupAction(dst, self.file_context,
+                                 source=src)(filesys)
+                FileCopyAction(src, dst, self.file_context)(filesys)
+
+        return subdirs
+
+    def execute(self, filesys):
+        """
+        Copy a directory tree into an existing directory, walking the tree
+        from the top down, as os.walk does.
+        """
+        vcode = self.verify_can_exec(filesys)
+
+        if vcode == self.verification_codes.UNREADABLE_SOURCE:
+            logstr = ('DirTreeCopy: Non-Readable source directory \"%s\"' %
+                      self.src)
+            logger.warn('{0}: {1}'.format(self.file_context, logstr))
+            return
+
+        ExecutionContext().transition(ExecutionContext.phases.EXECUTION)
+
+        logstr = ('Performing Directory Tree Copy \"%s\" -> \"%s\"' %
+                  (self.src, self.dst))
+        logger.info('{0}: {1}'.format(self.file_context, logstr))
+
+        # the directories which have been created, but not yet copied,
+        # innermost last
+        pending = [(self.src, self.dst)]
+        while pending:
+            src_dir, dst_dir = pending.pop()
+            subdirs = self._copy_entries(filesys, src_dir, dst_dir)
+            pending.extend(reversed(subdirs))
@@ -11,6 +11,8 @@ class CreateAction(with_metaclass(abc.ABCMeta, Action)):
     Extends verification codes to include UNWRITABLE_TARGET as an error
     condition.
     """
+    __slots__ = ('dst',)
+
     verification_codes = \
         Action.verification_codes.extend('UNWRITABLE_TARGET')
 
@@ -8,6 +8,8 @@ class DirCreateAction(CreateAction):
     """
     An action to create a directory.
     """
+    __slots__ = ()
+
     def __str__(self):
         return ("DirCreateAction(dst=" + self.dst + ",context=" +
                 repr(self.file_context) + ")")
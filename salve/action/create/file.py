@@ -8,6 +8,8 @@ class FileCreateAction(CreateAction):
     """
     An action to create a single file.
     """
+    __slots__ = ()
+
     def __str__(self):
         return ("FileCreateAction(dst=" + self.dst +
                 ",context=" + repr(self.file_context) + ")")
@@ -10,6 +10,8 @@ class DynamicAction(with_metaclass(abc.ABCMeta, Action)):
     DynamicActions are actions that may not be executable at the time
     that they are instantiated. Is an ABC.
     """
+    __slots__ = ()
+
     @abc.abstractmethod
     def generate(self):  # pragma: no cover
         """
@@ -0,0 +1,193 @@
+import abc
+import stat
+
+from salve import logger, ugo, with_metaclass
+from salve.action.base import Action
+from salve.action.backup import FileBackupAction
+from salve.action.copy import FileCopyAction
+from salve.action.create import FileCreateAction, DirCreateAction
+from salve.context import ExecutionContext
+
+
+class EnsureAction(with_metaclass(abc.ABCMeta, Action)):
+    """
+    The base class for EnsureActions, which put a single file or directory
+    in place and then bring its mode and owner to the requested state.
+    Is an ABC.
+
+    An EnsureAction is what the plan optimizer makes of a create or copy
+    followed by a chmod and chown of the same target. The target is only
+    stat()ed once for both, and the chmod is skipped when it would do
+    nothing, as the chown already is.
+    """
+    __slots__ = ('target', 'mode', 'user', 'group')
+
+    def __init__(self, target, file_context, mode=None, user=None,
+                 group=None):
+        """
+        EnsureAction constructor.
+
+        Args:
+            @target
+            Path to the file or directory.
+            @file_context
+            The FileContext.
+
+        KWArgs:
+            @mode
+            The umask of @target, as an octal string. When None, the mode
+            is not changed.
+            @user
+            @group
+            The owner of @target. When None, the owner is not changed.
+        """
+        Action.__init__(self, file_context)
+        self.target = target
+        self.mode = int(mode, 8) if mode is not None else None
+        self.user = user
+        self.group = group
+
+    def _attrs_str(self):
+        mode = '{0:o}'.format(self.mode) if self.mode is not None else None
+        return (",mode=" + str(mode) + ",user=" + str(self.user) +
+                ",group=" + str(self.group) +
+                ",context=" + repr(self.file_context) + ")")
+
+    @abc.abstractmethod
+    def put_in_place(self, filesys):  # pragma: no cover
+        """
+        Create @target, or copy it into place.
+
+        Args:
+            @filesys
+            The filesystem on which to act.
+        """
+        pass
+
+    def _ensure_mode(self, filesys, st):
+        # chmod follows symlinks, so a link's own mode says nothing about
+        # whether the chmod would do anything
+        if stat.S_IMODE(st.st_mode) == self.mode and \
+           not stat.S_ISLNK(st.st_mode):
+            return
+        if not ugo.is_root() and not ugo.is_owner(self.target):
+            logger.warn('{0}: Unowned target \"{1}\"'.format(
+                self.prefix, self.target))
+            return
+
+        logger.info('Performing {0} Chmod of \"{1}\" to {2:o}'.format(
+            self.prefix, self.target, self.mode))
+        filesys.chmod(self.target, self.mode)
+
+    def _ensure_owner(self, filesys, st):
+        uid = ugo.name_to_uid(self.user)
+        gid = ugo.name_to_gid(self.group)
+        if st.st_uid == uid and st.st_gid == gid:
+            return
+        if not ugo.is_root():
+            logger.warn('{0}: Cannot Chown as Non-Root User'.format(
+                self.prefix))
+            return
+
+        logger.info('Performing {0} Chown of \"{1}\" to {2}:{3}'.format(
+            self.prefix, self.target, self.user, self.group))
+        # chown without following symlinks
+        filesys.chown(self.target, uid, gid)
+
+    def execute(self, filesys):
+        """
+        EnsureAction execution.
+
+        Puts the target in place, then sets its mode and owner, if they
+        were given and differ from the target's.
+        """
+        self.put_in_place(filesys)
+
+        if self.mode is None and self.user is None:
+            return
+
+        ExecutionContext().transition(ExecutionContext.phases.VERIFICATION)
+
+        logger.info('{0}: Checking target exists, \"{1}\"'.format(
+            self.prefix, self.target))
+
+        try:
+            st = filesys.stat(self.target)
+        except OSError:
+            logger.warn('{0}: Non-Existent target \"{1}\"'.format(
+                self.prefix, self.target))
+            return
+
+        ExecutionContext().transition(ExecutionContext.phases.EXECUTION)
+
+        if self.mode is not None:
+            self._ensure_mode(filesys, st)
+        if self.user is not None:
+            self._ensure_owner(filesys, st)
+
+
+class FileEnsureAction(EnsureAction):
+    """
+    An EnsureAction on a single file, which is created, or backed up and
+    copied from a source file.
+    """
+    __slots__ = ('source', 'backup')
+
+    prefix = 'FileEnsure'
+
+    def __init__(self, target, file_context, source=None, backup=False,
+                 mode=None, user=None, group=None):
+        """
+        FileEnsureAction constructor.
+
+        Args:
+            @target
+            Path to the file.
+            @file_context
+            The FileContext.
+
+        KWArgs:
+            @source
+            The file copied to @target. When None, @target is created
+            instead.
+            @backup
+            When True, @target is backed up before it is copied over.
+            @mode
+            @user
+            @group
+            As for EnsureAction.
+        """
+        EnsureAction.__init__(self, target, file_context, mode=mode,
+                              user=user, group=group)
+        self.source = source
+        self.backup = backup
+
+    def __str__(self):
+        return ("FileEnsureAction(target=" + self.target +
+                ",source=" + str(self.source) +
+                ",backup=" + str(self.backup) + self._attrs_str())
+
+    def put_in_place(self, filesys):
+        if self.source is None:
+            FileCreateAction(self.target, self.file_context)(filesys)
+            return
+        if self.backup:
+            FileBackupAction(self.target, self.file_context,
+                             source=self.source)(filesys)
+        FileCopyAction(self.source, self.target, self.file_context)(filesys)
+
+
+class DirEnsureAction(EnsureAction):
+    """
+    An EnsureAction on a single directory, which is created. Only the
+    directory itself is chmoded and chowned, not its contents.
+    """
+    __slots__ = ()
+
+    prefix = 'DirEnsure'
+
+    def __str__(self):
+        return "DirEnsureAction(target=" + self.target + self._attrs_str()
+
+    def put_in_place(self, filesys):
+        DirCreateAction(self.target, self.file_context)(filesys)
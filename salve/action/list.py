@@ -1,3 +1,5 @@
+import itertools
+
 from salve.action.base import Action
 
 
@@ -7,33 +9,47 @@ class ActionList(Action):
     the basic Action types.
 
     It is used to provide a sequential list of other actions to execute.
+    Prepended actions are kept in a separate list, in reverse order, which
+    is only created on the first prepend. That makes prepending as cheap as
+    appending, without paying for a deque in every AL.
     """
+    __slots__ = ('_head', '_tail')
+
     def __init__(self, act_lst, file_context):
         """
         ActionList constructor.
 
         Args:
             @act_list
-            A list of Action objects. No checking is performed, the
-            class assumes that what it is handed is in fact a list of
-            Action objects.
+            A list, or any other iterable, of Action objects. No checking
+            is performed, the class assumes that what it is handed is in
+            fact a list of Action objects. It is copied into the AL.
 
             @file_context
             The FileContext.
         """
         Action.__init__(self, file_context)
-        self.actions = act_lst
+        self._head = None
+        self._tail = list(act_lst)
+
+    @property
+    def actions(self):
+        """
+        A list of the sub-actions of the AL, in order.
+        """
+        return list(self)
 
     def __iter__(self):
         """
         Iterating over an AL iterates over its sub-actions.
         """
-        for act in self.actions:
-            yield act
+        if self._head:
+            return itertools.chain(reversed(self._head), self._tail)
+        return iter(self._tail)
 
     def __str__(self):
         return ("ActionList([" +
-                ",".join(str(a) for a in self.actions) +
+                ",".join(str(a) for a in self) +
                 "],context=" + repr(self.file_context) + ")")
 
     def append(self, act):
@@ -45,7 +61,7 @@ class ActionList(Action):
             The action to append.
         """
         assert isinstance(act, Action)
-        self.actions.append(act)
+        self._tail.append(act)
 
     def prepend(self, act):
         """
@@ -56,7 +72,9 @@ class ActionList(Action):
             The action to prepend.
         """
         assert isinstance(act, Action)
-        self.actions.insert(0, act)
+        if self._head is None:
+            self._head = []
+        self._head.append(act)
 
     def execute(self, filesys):
         """
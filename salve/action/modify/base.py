@@ -8,6 +8,8 @@ class ModifyAction(with_metaclass(abc.ABCMeta, Action)):
     The base class for all Actions that modify existing files and
     directories.
     """
+    __slots__ = ('target',)
+
     verification_codes = \
         Action.verification_codes.extend('NONEXISTENT_TARGET')
 
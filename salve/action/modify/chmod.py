@@ -9,7 +9,11 @@ class ChmodAction(with_metaclass(abc.ABCMeta, ModifyAction)):
     """
     The base class for ChmodActions.
     Is an ABC.
+
+    The mode field is a slot of the concrete subclasses.
     """
+    __slots__ = ()
+
     verification_codes = \
         ModifyAction.verification_codes.extend('UNOWNED_TARGET')
 
@@ -9,7 +9,11 @@ class ChownAction(with_metaclass(abc.ABCMeta, ModifyAction)):
     """
     The base class for ChownActions.
     Is an ABC.
+
+    The user and group fields are slots of the concrete subclasses.
     """
+    __slots__ = ()
+
     verification_codes = \
         ModifyAction.verification_codes.extend('NOT_ROOT',
                                                'SKIP_EXEC')
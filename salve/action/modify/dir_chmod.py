@@ -1,6 +1,5 @@
-from salve import logger, paths, ugo
+from salve import logger, ugo
 from salve.action.modify.chmod import ChmodAction
-from salve.action.modify.file_chmod import FileChmodAction
 from salve.action.modify.directory import DirModifyAction
 
 from salve.filesys import access_codes
@@ -11,6 +10,8 @@ class DirChmodAction(ChmodAction, DirModifyAction):
     """
     A ChmodAction applied to a directory.
     """
+    __slots__ = ('mode', 'recursive')
+
     def __init__(self, target, mode, file_context, recursive=False):
         """
         DirChmodAction constructor.
@@ -89,22 +90,6 @@ class DirChmodAction(ChmodAction, DirModifyAction):
         filesys.chmod(self.target, self.mode)
 
         if self.recursive:
-            for directory, subdirs, files in filesys.walk(self.target):
-                # chmod on all subdirectories
-                for sd in subdirs:
-                    target = paths.pjoin(directory, sd)
-                    # synthesize a new action and invoke it
-                    # synthetic DirChmods are always nonrecursive
-                    synth = DirChmodAction(target,
-                                           '{0:o}'.format(self.mode),
-                                           self.file_context,
-                                           recursive=False)
-                    synth(filesys)
-                # chmod on all files in the directory
-                for f in files:
-                    target = paths.pjoin(directory, f)
-                    # synthesize a new action and invoke it
-                    synth = FileChmodAction(target,
-                                            '{0:o}'.format(self.mode),
-                                            self.file_context)
-                    synth(filesys)
+            changed, skipped = filesys.chmod_tree(self.target, self.mode)
+            logger.info('DirChmod: Changed {0}, skipped {1} entries under '
+                        '\"{2}\"'.format(changed, skipped, self.target))
@@ -1,6 +1,5 @@
-from salve import logger, paths, ugo
+from salve import logger, ugo
 from salve.action.modify.chown import ChownAction
-from salve.action.modify.file_chown import FileChownAction
 from salve.action.modify.directory import DirModifyAction
 from salve.filesys import access_codes
 from salve.context import ExecutionContext
@@ -10,6 +9,8 @@ class DirChownAction(ChownAction, DirModifyAction):
     """
     A ChownAction applied to a directory.
     """
+    __slots__ = ('user', 'group', 'recursive')
+
     def __init__(self, target, user, group, file_context,
                  recursive=False):
         """
@@ -69,19 +70,11 @@ class DirChownAction(ChownAction, DirModifyAction):
         """
         Recursive execution on directory contents.
         """
-        for directory, subdirs, files in filesys.walk(self.target):
-            # chown on all subdirectories
-            for sd in subdirs:
-                # synthesize a new action and invoke it
-                synth = DirChownAction(paths.pjoin(directory, sd), self.user,
-                                       self.group, self.file_context)
-                synth(filesys)
-            # chown on all files in the directory
-            for f in files:
-                # synthesize a new action and invoke it
-                synth = FileChownAction(paths.pjoin(directory, f), self.user,
-                                        self.group, self.file_context)
-                synth(filesys)
+        changed, skipped = filesys.chown_tree(self.target,
+                                              ugo.name_to_uid(self.user),
+                                              ugo.name_to_gid(self.group))
+        logger.info('DirChown: Changed {0}, skipped {1} entries under '
+                    '\"{2}\"'.format(changed, skipped, self.target))
 
     def execute(self, filesys):
         """
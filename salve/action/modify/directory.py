@@ -11,7 +11,12 @@ class DirModifyAction(with_metaclass(abc.ABCMeta, ModifyAction)):
     Primarily used to carry information about the recursivity of the
     modification.
     Is an ABC.
+
+    The recursive field is a slot of the concrete subclasses, which are
+    also ChmodActions or ChownActions.
     """
+    __slots__ = ()
+
     def __init__(self, target, recursive, file_context):
         """
         DirModifyAction constructor.
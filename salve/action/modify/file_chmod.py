@@ -7,6 +7,8 @@ class FileChmodAction(ChmodAction):
     """
     A ChmodAction applied to a single file.
     """
+    __slots__ = ('mode',)
+
     def __init__(self, target, mode, file_context):
         """
         FileChmodAction constructor.
@@ -7,6 +7,8 @@ class FileChownAction(ChownAction):
     """
     A ChownAction applied to a single file.
     """
+    __slots__ = ('user', 'group')
+
     def __init__(self, target, user, group, file_context):
         """
         FileChownAction constructor.
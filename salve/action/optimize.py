@@ -0,0 +1,248 @@
+import bisect
+import itertools
+import os
+
+from salve import logger
+
+from .analysis import flatten, touched_paths, conflicts
+from .list import ActionList
+from .copy import FileCopyAction
+from .backup import FileBackupAction
+from .create import FileCreateAction, DirCreateAction
+from .modify import FileChmodAction, DirChmodAction, \
+    FileChownAction, DirChownAction
+from .ensure import FileEnsureAction, DirEnsureAction
+from .plan import action_key
+
+
+# the kind of modification made by each type of ModifyAction
+_modify_kinds = {
+    FileChmodAction: 'chmod',
+    DirChmodAction: 'chmod',
+    FileChownAction: 'chown',
+    DirChownAction: 'chown',
+}
+
+
+def _ancestors(path):
+    """
+    Get the directories containing the normalized path @path, innermost
+    first.
+    """
+    parent = os.path.dirname(path)
+    while parent != path:
+        yield parent
+        path, parent = parent, os.path.dirname(parent)
+
+
+def _supersede_modifies(actions):
+    """
+    Removes every chmod or chown which is followed by another of the same
+    kind on the same path, since only the last one has any lasting effect,
+    when nothing in between could depend on or change the outcome.
+    A non-recursive one is superseded by either kind, a recursive one only
+    by another recursive one.
+    """
+    # for each path, the kinds of the later modifications of it which may
+    # supersede earlier ones, each mapped to whether they include a
+    # recursive one
+    later = {}
+    # for each directory, the paths in @later which are inside of it
+    beneath = {}
+
+    def forget(path):
+        """
+        Forgets the later modifications of @path, and of every path which
+        contains it, or is inside of it.
+        """
+        doomed = set(beneath.get(path, ()))
+        doomed.update(p for p in itertools.chain([path], _ancestors(path))
+                      if p in later)
+        for p in doomed:
+            del later[p]
+            for a in _ancestors(p):
+                beneath[a].discard(p)
+
+    kept = []
+    for act in reversed(actions):
+        kind = _modify_kinds.get(type(act))
+        if kind is not None:
+            path = os.path.normpath(act.target)
+            recursive = getattr(act, 'recursive', False)
+            if kind in later.get(path, {}) and \
+               (later[path][kind] or not recursive):
+                continue
+
+        # an earlier modification of a path is not superseded by the later
+        # ones if this action may read or write that path in between
+        touched = touched_paths(act)
+        if touched is None:
+            later.clear()
+            beneath.clear()
+        else:
+            for p in touched:
+                forget(p)
+
+        if kind is not None:
+            if path not in later:
+                later[path] = {}
+                for a in _ancestors(path):
+                    beneath.setdefault(a, set()).add(path)
+            later[path][kind] = recursive
+        kept.append(act)
+    kept.reverse()
+    return kept
+
+
+def _remove_duplicates(actions):
+    """
+    Removes every action which does exactly the same thing as an earlier
+    one, when nothing in between could have changed the outcome.
+    """
+    # the index in @kept of the last action with each key
+    seen = {}
+    kept = []
+    for act in actions:
+        if touched_paths(act) is None:
+            seen = {}
+            kept.append(act)
+            continue
+        key = action_key(act)
+        if key in seen:
+            paths = touched_paths(act)
+            if not any(conflicts(a, paths) for a in kept[seen[key] + 1:]):
+                continue
+        seen[key] = len(kept)
+        kept.append(act)
+    return kept
+
+
+def _fusable_modifies(act):
+    """
+    Get the types of chmod and chown which may be fused with @act.
+    """
+    if type(act) in (FileCopyAction, FileCreateAction):
+        return (FileChmodAction, FileChownAction)
+    return (DirChmodAction, DirChownAction)
+
+
+def _fuse(actions):
+    """
+    Replaces every create or copy of a single file or directory, followed
+    by a chmod and/or chown of it, with one EnsureAction. A backup which
+    directly precedes a file copy is fused into it as well.
+    """
+    # the indices of the non-recursive chmods and chowns, by type and path
+    modifies = {}
+    for (i, act) in enumerate(actions):
+        if type(act) in _modify_kinds and \
+           not getattr(act, 'recursive', False):
+            key = (type(act), os.path.normpath(act.target))
+            modifies.setdefault(key, []).append(i)
+
+    def next_modify(modify_type, path, i):
+        """
+        The index of the first chmod or chown of @path after index @i, or
+        None.
+        """
+        indices = modifies.get((modify_type, path), ())
+        pos = bisect.bisect_right(indices, i)
+        if pos < len(indices):
+            return indices[pos]
+        return None
+
+    fused = set()
+    kept = []
+    for (i, act) in enumerate(actions):
+        if i in fused:
+            continue
+        if type(act) not in (FileCopyAction, FileCreateAction,
+                             DirCreateAction):
+            kept.append(act)
+            continue
+
+        target = act.dst
+        paths = (os.path.normpath(target),)
+        found = [j for j in (next_modify(t, paths[0], i)
+                             for t in _fusable_modifies(act))
+                 if j is not None]
+        # the chmod and chown can only be fused if no action which might
+        # depend on the target comes between them and @act
+        if found:
+            for j in range(i + 1, max(found)):
+                if j not in fused and j not in found and \
+                   conflicts(actions[j], paths):
+                    found = [k for k in found if k < j]
+                    break
+        # an EnsureAction chmods before it chowns, and a chown which changes
+        # the owner clears setuid and setgid, so a chmod which came after the
+        # chown is left in place, after the fused action
+        if len(found) == 2:
+            (chmod_index, chown_index) = sorted(
+                found, key=lambda j: type(actions[j]) not in
+                (FileChmodAction, DirChmodAction))
+            if chown_index < chmod_index:
+                found = [chown_index]
+        if not found:
+            kept.append(act)
+            continue
+
+        mode = user = group = None
+        for j in found:
+            fused.add(j)
+            if type(actions[j]) in (FileChmodAction, DirChmodAction):
+                mode = '{0:o}'.format(actions[j].mode)
+            else:
+                user = actions[j].user
+                group = actions[j].group
+
+        if type(act) is DirCreateAction:
+            kept.append(DirEnsureAction(target, act.file_context, mode=mode,
+                                        user=user, group=group))
+            continue
+
+        source = None
+        backup = False
+        if type(act) is FileCopyAction:
+            source = act.src
+            if kept and type(kept[-1]) is FileBackupAction and \
+               touched_paths(kept[-1])[0] == paths[0] and \
+               kept[-1].source in (None, source):
+                kept.pop()
+                backup = True
+        kept.append(FileEnsureAction(target, act.file_context,
+                                     source=source, backup=backup,
+                                     mode=mode, user=user, group=group))
+    return kept
+
+
+def optimize(act):
+    """
+    Optimizes an action tree, typically the result of compiling the root
+    ManifestBlock, and returns the optimized tree, which has the same
+    effect.
+
+    The tree is flattened into a single ActionList, and then
+      - chmods and chowns which are overridden by a later one on the same
+        path, with nothing touching that path in between, are removed
+      - actions which repeat an earlier one exactly are removed
+      - a create or copy, with the chmod and chown of the same target, is
+        fused into a single EnsureAction
+    No action is moved or removed across one which could touch any file,
+    like a ShellAction.
+
+    Args:
+        @act
+        The root action of the tree.
+    """
+    actions = flatten(act)
+    num_actions = len(actions)
+
+    actions = _supersede_modifies(actions)
+    actions = _remove_duplicates(actions)
+    actions = _fuse(actions)
+
+    logger.info('{0}: Plan optimizer eliminated {1} of {2} actions'.format(
+        str(act.file_context), num_actions - len(actions), num_actions))
+
+    return ActionList(actions, act.file_context)
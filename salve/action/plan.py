@@ -0,0 +1,240 @@
+import json
+
+import salve
+from salve.context import FileContext, FileContextFactory
+from salve.exceptions import SALVEException
+from salve.util import stream_filename
+
+from .list import ActionList
+from .shell import ShellAction
+from .copy import FileCopyAction, DirCopyAction, DirTreeCopyAction
+from .backup import FileBackupAction, DirBackupAction
+from .create import FileCreateAction, DirCreateAction
+from .modify import FileChmodAction, DirChmodAction, \
+    FileChownAction, DirChownAction
+from .ensure import FileEnsureAction, DirEnsureAction
+
+# identifies a file as a SALVE plan, rather than any other JSON document
+PLAN_FORMAT = 'salve-plan'
+# the version of the plan format, which is bumped whenever a change to it
+# means that older versions of SALVE can no longer execute new plans
+PLAN_VERSION = 1
+
+
+def _mode(act):
+    if act.mode is None:
+        return None
+    return '{0:o}'.format(act.mode)
+
+
+# the action types which may appear in a plan
+# each one maps the name used in plans to the class, a function producing the
+# arguments which describe an action, and a function building an action from
+# those arguments and a FileContext
+#
+# Backups are built from their sources alone, so that they use the
+# backup_dir and backup_log of the host executing the plan
+_action_types = {
+    'list': (
+        ActionList,
+        None,
+        None),
+    'shell': (
+        ShellAction,
+        lambda a: [a.cmd],
+        lambda args, ctx: ShellAction(args[0], ctx)),
+    'file_copy': (
+        FileCopyAction,
+        lambda a: [a.src, a.dst],
+        lambda args, ctx: FileCopyAction(args[0], args[1], ctx)),
+    'dir_copy': (
+        DirCopyAction,
+        lambda a: [a.src, a.dst],
+        lambda args, ctx: DirCopyAction(args[0], args[1], ctx)),
+    'dir_tree_copy': (
+        DirTreeCopyAction,
+        lambda a: [a.src, a.dst, a.mode],
+        lambda args, ctx: DirTreeCopyAction(args[0], args[1], ctx,
+                                            mode=args[2])),
+    'file_backup': (
+        FileBackupAction,
+        lambda a: [a.src, a.source],
+        lambda args, ctx: FileBackupAction(
+            args[0], ctx, source=args[1] if len(args) > 1 else None)),
+    'dir_backup': (
+        DirBackupAction,
+        lambda a: [a.src],
+        lambda args, ctx: DirBackupAction(args[0], ctx)),
+    'file_create': (
+        FileCreateAction,
+        lambda a: [a.dst],
+        lambda args, ctx: FileCreateAction(args[0], ctx)),
+    'dir_create': (
+        DirCreateAction,
+        lambda a: [a.dst],
+        lambda args, ctx: DirCreateAction(args[0], ctx)),
+    'file_chmod': (
+        FileChmodAction,
+        lambda a: [a.target, _mode(a)],
+        lambda args, ctx: FileChmodAction(args[0], args[1], ctx)),
+    'dir_chmod': (
+        DirChmodAction,
+        lambda a: [a.target, _mode(a), a.recursive],
+        lambda args, ctx: DirChmodAction(args[0], args[1], ctx,
+                                         recursive=args[2])),
+    'file_chown': (
+        FileChownAction,
+        lambda a: [a.target, a.user, a.group],
+        lambda args, ctx: FileChownAction(args[0], args[1], args[2], ctx)),
+    'dir_chown': (
+        DirChownAction,
+        lambda a: [a.target, a.user, a.group, a.recursive],
+        lambda args, ctx: DirChownAction(args[0], args[1], args[2], ctx,
+                                         recursive=args[3])),
+    'file_ensure': (
+        FileEnsureAction,
+        lambda a: [a.target, a.source, a.backup, _mode(a), a.user, a.group],
+        lambda args, ctx: FileEnsureAction(args[0], ctx, source=args[1],
+                                           backup=args[2], mode=args[3],
+                                           user=args[4], group=args[5])),
+    'dir_ensure': (
+        DirEnsureAction,
+        lambda a: [a.target, _mode(a), a.user, a.group],
+        lambda args, ctx: DirEnsureAction(args[0], ctx, mode=args[1],
+                                          user=args[2], group=args[3])),
+}
+
+# map each class to its name in plans, for the exact class of an action
+_type_names = dict((cls, name) for (name, (cls, _, _))
+                   in _action_types.items())
+
+
+def action_key(act):
+    """
+    Describes what an action does, independent of where it came from, as a
+    hashable (type, arguments) pair. Two actions with the same key do the
+    same thing. Returns None for ActionLists, and for any action which
+    cannot be stored in a plan.
+
+    Args:
+        @act
+        The action to describe.
+    """
+    name = _type_names.get(type(act))
+    if name is None or name == 'list':
+        return None
+    return (name, tuple(_action_types[name][1](act)))
+
+
+class _PlanWriter(object):
+    """
+    Converts an action tree to the nested lists stored in a plan.
+
+    Every action is a list [type, file, lineno, args...], where @file is an
+    index into the plan's list of filenames, so that each manifest's name is
+    stored only once.
+    """
+    def __init__(self):
+        self.filenames = []
+        self.file_indices = {}
+
+    def file_index(self, filename):
+        try:
+            return self.file_indices[filename]
+        except KeyError:
+            self.file_indices[filename] = len(self.filenames)
+            self.filenames.append(filename)
+            return self.file_indices[filename]
+
+    def encode(self, act):
+        name = _type_names.get(type(act))
+        if name is None:
+            raise SALVEException(
+                'Cannot store ' + type(act).__name__ + ' in a plan',
+                act.file_context)
+        record = [name, self.file_index(act.file_context.filename),
+                  act.file_context.lineno]
+        if name == 'list':
+            record.extend(self.encode(sub) for sub in act)
+        else:
+            record.extend(_action_types[name][1](act))
+        return record
+
+
+class _PlanReader(object):
+    """
+    Builds an action tree from the nested lists stored in a plan.
+    """
+    def __init__(self, filenames, plan_context):
+        self.file_contexts = [FileContextFactory(f) for f in filenames]
+        self.plan_context = plan_context
+
+    def decode(self, record):
+        try:
+            name, file_index, lineno = record[:3]
+            args = record[3:]
+            ctx = self.file_contexts[file_index](lineno)
+            if name == 'list':
+                return ActionList([self.decode(sub) for sub in args], ctx)
+            return _action_types[name][2](args, ctx)
+        except (KeyError, IndexError, TypeError, ValueError):
+            raise SALVEException('Malformed plan action: ' + str(record),
+                                 self.plan_context)
+
+
+def dump_plan(act, stream):
+    """
+    Writes an action tree, typically the result of compiling the root
+    ManifestBlock, to @stream as a plan. A plan is a versioned JSON document
+    which can be loaded by load_plan(), on any host, and executed without
+    parsing any manifests or applying any configuration.
+
+    Args:
+        @act
+        The root action of the tree.
+        @stream
+        A file-like object, opened for writing text.
+    """
+    writer = _PlanWriter()
+    root = writer.encode(act)
+    plan = {
+        'format': PLAN_FORMAT,
+        'version': PLAN_VERSION,
+        'salve_version': salve.__version__,
+        'files': writer.filenames,
+        'action': root
+    }
+    json.dump(plan, stream, separators=(',', ':'))
+
+
+def load_plan(stream):
+    """
+    Reads a plan written by dump_plan() from @stream, and returns the root
+    action, ready to be executed.
+
+    Raises a SALVEException if @stream does not hold a plan, or holds a plan
+    in a version of the format which this version of SALVE cannot read.
+
+    Args:
+        @stream
+        A file-like object, opened for reading text.
+    """
+    plan_context = FileContext(stream_filename(stream) or 'plan')
+
+    try:
+        plan = json.load(stream)
+    except ValueError:
+        raise SALVEException('Not a SALVE plan', plan_context)
+    if not isinstance(plan, dict) or plan.get('format') != PLAN_FORMAT:
+        raise SALVEException('Not a SALVE plan', plan_context)
+    if plan.get('version') != PLAN_VERSION:
+        raise SALVEException(
+            'Unsupported plan version ' + str(plan.get('version')) +
+            ', expected ' + str(PLAN_VERSION), plan_context)
+
+    salve.logger.info(
+        '{0}: Loading plan compiled by SALVE {1}'.format(
+            str(plan_context), plan.get('salve_version')))
+
+    reader = _PlanReader(plan.get('files', []), plan_context)
+    return reader.decode(plan.get('action'))
@@ -0,0 +1,240 @@
+import os
+import threading
+
+# handle Py2 vs. Py3 Queue rename
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from salve import logger
+
+from .analysis import flatten, touched_paths
+
+
+class _RealPaths(object):
+    """
+    Resolves paths to the paths they refer to on the host, through any
+    symlinks, so that two actions on the same file by different paths are
+    known to depend on one another. The real path of each directory is only
+    looked up once.
+    """
+    def __init__(self):
+        self.dirs = {}
+
+    def real_dir(self, path):
+        try:
+            return self.dirs[path]
+        except KeyError:
+            self.dirs[path] = os.path.realpath(path)
+            return self.dirs[path]
+
+    def __call__(self, path):
+        parent, name = os.path.split(path)
+        if not name:
+            return self.real_dir(path)
+        real = os.path.join(self.real_dir(parent), name)
+        if os.path.islink(real):
+            return os.path.realpath(real)
+        return real
+
+
+class _Ancestors(object):
+    """
+    Gets the proper ancestors of normalized absolute paths, innermost first.
+    The ancestors of each directory are only computed once, since the paths
+    in an action tree mostly share their directories.
+    """
+    def __init__(self):
+        self.dirs = {}
+
+    def of_dir(self, path):
+        try:
+            return self.dirs[path]
+        except KeyError:
+            parent = os.path.dirname(path)
+            if parent == path:
+                result = (path,)
+            else:
+                result = (path,) + self.of_dir(parent)
+            self.dirs[path] = result
+            return result
+
+    def __call__(self, path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            return ()
+        return self.of_dir(parent)
+
+
+def build_dependencies(actions):
+    """
+    Builds the dependency graph of a list of actions, in the order of serial
+    execution. Returns a list holding, for each action, the set of indices of
+    the earlier actions which must be complete before it starts.
+
+    An action depends on the earlier actions which touch the same path, an
+    ancestor of it, or a descendant of it, so that, for example, a directory
+    is created before anything in it, and a file is backed up before it is
+    copied over. An action which may touch any path, like a ShellAction,
+    depends on every action before it, and every action after it depends on
+    it.
+
+    Only the last earlier action on each of those paths is included, since
+    it already depends on the ones before it.
+
+    Args:
+        @actions
+        The actions, as a list.
+    """
+    real_path = _RealPaths()
+    ancestors = _Ancestors()
+    deps = []
+
+    # the index of the last action on each path
+    last_on = {}
+    # the indices of the actions on paths under each directory since the last
+    # action on the directory itself
+    last_under = {}
+    # the last action which may touch any path, and the actions since then
+    last_barrier = None
+    since_barrier = []
+
+    for (i, act) in enumerate(actions):
+        act_deps = set()
+        touched = touched_paths(act)
+        if touched is None:
+            act_deps.update(since_barrier)
+            if last_barrier is not None:
+                act_deps.add(last_barrier)
+            last_on = {}
+            last_under = {}
+            last_barrier = i
+            since_barrier = []
+            deps.append(act_deps)
+            continue
+
+        if last_barrier is not None:
+            act_deps.add(last_barrier)
+        since_barrier.append(i)
+
+        for path in set(real_path(p) for p in touched):
+            if path in last_on:
+                act_deps.add(last_on[path])
+            act_deps.update(last_under.pop(path, ()))
+            for ancestor in ancestors(path):
+                if ancestor in last_on:
+                    act_deps.add(last_on[ancestor])
+                last_under.setdefault(ancestor, []).append(i)
+            last_on[path] = i
+
+        act_deps.discard(i)
+        deps.append(act_deps)
+
+    return deps
+
+
+class _Scheduler(object):
+    """
+    Runs a list of actions on a pool of threads, starting each one once all
+    of the actions which it depends on are complete. When several actions
+    are ready, the one which comes first in serial order runs first.
+    """
+    def __init__(self, actions, deps, filesys):
+        self.actions = actions
+        self.filesys = filesys
+        self.waiting_on = [len(d) for d in deps]
+        self.dependents = [[] for _ in actions]
+        for (i, act_deps) in enumerate(deps):
+            for d in act_deps:
+                self.dependents[d].append(i)
+
+        self.lock = threading.Lock()
+        self.ready = queue.PriorityQueue()
+        self.running = 0
+        self.error = None
+
+    def worker(self):
+        while True:
+            i = self.ready.get()[1]
+            if i is None:
+                return
+            try:
+                self.actions[i](self.filesys)
+            except Exception as e:
+                with self.lock:
+                    if self.error is None:
+                        self.error = e
+            self.finish(i)
+
+    def finish(self, i):
+        """
+        Mark action @i as complete, and queue the actions which were only
+        waiting on it, unless an action has failed.
+        """
+        with self.lock:
+            self.running -= 1
+            if self.error is None:
+                for d in self.dependents[i]:
+                    self.waiting_on[d] -= 1
+                    if self.waiting_on[d] == 0:
+                        self.start(d)
+            if self.running == 0:
+                self.stop()
+
+    def start(self, i):
+        self.running += 1
+        self.ready.put((i, i))
+
+    def stop(self):
+        for _ in range(self.num_workers):
+            self.ready.put((len(self.actions), None))
+
+    def run(self, jobs):
+        self.num_workers = min(jobs, len(self.actions))
+        if self.num_workers == 0:
+            return
+        with self.lock:
+            for (i, n) in enumerate(self.waiting_on):
+                if n == 0:
+                    self.start(i)
+
+        workers = [threading.Thread(target=self.worker)
+                   for _ in range(self.num_workers)]
+        for w in workers:
+            w.daemon = True
+            w.start()
+        for w in workers:
+            w.join()
+
+        if self.error is not None:
+            raise self.error
+
+
+def execute_parallel(act, filesys, jobs):
+    """
+    Executes an action tree on up to @jobs threads. The result is the same
+    as executing it serially: actions which touch related paths still run
+    in their serial order, and only independent ones run at the same time.
+
+    If an action raises an exception, no more actions are started, and the
+    exception is raised once the running ones are complete.
+
+    Args:
+        @act
+        The root action of the tree.
+        @filesys
+        The filesystem on which the actions are executed.
+        @jobs
+        The number of threads.
+    """
+    if jobs <= 1:
+        act(filesys)
+        return
+
+    actions = flatten(act)
+    deps = build_dependencies(actions)
+    logger.info('{0}: Executing {1} actions on {2} threads'.format(
+        str(act.file_context), len(actions), jobs))
+
+    _Scheduler(actions, deps, filesys).run(jobs)
@@ -10,6 +10,8 @@ class ShellAction(Action):
     A ShellAction is one of the basic Action types, used to invoke
     shell subprocesses.
     """
+    __slots__ = ('cmd',)
+
     def __init__(self, command, file_context):
         """
         ShellAction constructor.
@@ -43,6 +45,8 @@ class ShellAction(Action):
                                    shell=True)
         # Popen is asynchronous without an invocation of wait()
         process.wait()
+        # the command may have changed any file
+        filesys.invalidate()
         # check if returncode became nonzero, and fail if it did
         if process.returncode != 0:
             raise ActionException(
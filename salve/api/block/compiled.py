@@ -12,6 +12,8 @@ class CompiledBlock(with_metaclass(abc.ABCMeta)):
     will be produced by parsing a manifest, but the compiled block defines what
     actions are taken by means of that block.
     """
+    __slots__ = ()
+
     @abc.abstractmethod
     def verify_can_exec(self):
         """
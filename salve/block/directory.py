@@ -4,7 +4,7 @@ import os
 
 import salve
 
-from salve.action import ActionList, backup, copy, create, modify
+from salve.action import ActionList, copy, create, modify
 from salve.api import Block
 
 from .base import CoreBlock
@@ -89,35 +89,12 @@ class DirBlock(CoreBlock):
         if not isinstance(act, ActionList):
             act = ActionList([act], self.file_context)
 
-        # walk over all files and subdirs in the directory, creating
-        # directories and copying files
-        for d, subdirs, files in os.walk(self['source']):
-            # for every subdir, rewrite it to be prefixed with the
-            # target and create that directory
-            for sd in subdirs:
-                target_dir = os.path.join(
-                    self['target'],
-                    os.path.relpath(os.path.join(d, sd),
-                                    self['source'])
-                    )
-                act.append(self._mkdir(target_dir))
-            # for every file, first backup any file that is at the
-            # destination, then copy from source to target tree
-            for f in files:
-                fname = os.path.join(d, f)
-                target_dir = os.path.join(
-                    self['target'],
-                    os.path.relpath(d, self['source'])
-                    )
-                target_fname = os.path.join(target_dir, f)
-                backup_act = backup.FileBackupAction(target_fname,
-                                                     self.file_context)
-                copy_act = copy.FileCopyAction(fname,
-                                               target_fname,
-                                               self.file_context)
-                file_act = ActionList([backup_act, copy_act],
-                                      self.file_context)
-                act.append(file_act)
+        # copy the contents of the source into the target, creating
+        # directories and backing up and copying files
+        # the source is only walked when this executes
+        mode = self['mode'] if 'mode' in self else None
+        act.append(copy.DirTreeCopyAction(self['source'], self['target'],
+                                          self.file_context, mode=mode))
 
         if 'mode' in self:
             act.append(modify.DirChmodAction(self['target'],
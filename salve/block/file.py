@@ -131,7 +131,8 @@ class FileBlock(CoreBlock):
         if self['action'] in triggers_backup:
             backup_action = backup.FileBackupAction(
                 self['target'],
-                self.file_context)
+                self.file_context,
+                source=self['source'])
             file_action = add_action(file_action,
                                      backup_action,
                                      prepend=True)
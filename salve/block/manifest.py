@@ -1,12 +1,22 @@
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:  # pragma: no cover
+    # without concurrent.futures (Python 2), manifests are parsed serially
+    ThreadPoolExecutor = None
+
 import salve
 from salve import paths
 
 from salve.action import ActionList
-from salve.context import ExecutionContext
+from salve.context import ExecutionContext, FileContextFactory
 from salve.api import Block
 
 from .base import CoreBlock
 
+# the default for the parse_workers global, the number of manifests which may
+# be read and parsed concurrently
+DEFAULT_PARSE_WORKERS = 8
+
 
 class ManifestBlock(CoreBlock):
     """
@@ -45,6 +55,15 @@ class ManifestBlock(CoreBlock):
         block, forming a block tree. This is, in a certain sense, part
         of the parser.
 
+        Sibling manifest blocks are read and parsed concurrently, by a
+        bounded pool of parse_workers threads, but the resulting tree is
+        always built in manifest order, so the blocks and any errors are
+        exactly the same as with a serial expansion.
+
+        A manifest which is included from several places is parsed only
+        once per call. Every include gets its own copy of the parsed blocks,
+        which then have config applied and paths expanded as usual.
+
         Args:
             @root_dir is the root of all relative paths in the manifest.
 
@@ -59,10 +78,44 @@ class ManifestBlock(CoreBlock):
             through invocations in order to ensure that there are no
             manifest loops.
         """
+        ctx = ExecutionContext()
+        workers = DEFAULT_PARSE_WORKERS
+        if 'parse_workers' in ctx:
+            workers = int(ctx['parse_workers'])
+
+        pool = None
+        if ThreadPoolExecutor is not None and workers > 1:
+            pool = ThreadPoolExecutor(max_workers=workers)
+        run = _ExpansionRun(pool)
+        try:
+            self._expand(root_dir, v3_relpaths, ancestors, run)
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True)
+
+        salve.logger.debug(
+            '{0}: Manifest expansion saved {1} parses of repeated includes'
+            .format(str(self.file_context), run.parses_saved))
+
+    def _expand(self, root_dir, v3_relpaths, ancestors, run):
+        """
+        Does the work of expand_blocks, recursively.
+
+        Args:
+            @root_dir
+            @v3_relpaths
+            @ancestors
+            As in expand_blocks.
+
+            @run
+            The _ExpansionRun shared by all of the blocks expanded by the
+            same call to expand_blocks.
+        """
         # This import must take place inside of the function because
         # there is a circular dependency between ManifestBlocks and the
         # parser
-        from salve.parser import parse_stream
+        from salve.parser.cache import parse_manifest
+        from salve.parser.parse import blocks_to_records, blocks_from_records
         # ensure that this block has config applied and paths expanded
         # this guarantees that 'source' is accurate
         ExecutionContext()['config'].apply_to_block(self)
@@ -79,20 +132,39 @@ class ManifestBlock(CoreBlock):
             raise self.mk_except('Manifest ' + filename + ' includes itself')
         ancestors.add(filename)
 
-        # parse the manifest source
-        with open(filename) as man:
-            self.sub_blocks = parse_stream(man)
-
         # set the directory from which relative paths are expanded
         containing_dir = root_dir
         if v3_relpaths:
             containing_dir = paths.containing_dir(filename)
+
+        key = (filename, containing_dir)
+        # a manifest which has already been parsed during this run gets
+        # fresh copies of the same blocks, so that they can have config
+        # applied and paths expanded independently
+        if key in run.parsed:
+            file_contexts, records = run.parsed[key]
+            self.sub_blocks = blocks_from_records(file_contexts, records)
+            run.parses_saved += 1
+        else:
+            # parse the manifest source, or pick up the result of parsing it
+            # ahead of time -- any error from that parse is raised here
+            future = run.pending.pop(key, None)
+            if future is not None:
+                self.sub_blocks = future.result()
+            else:
+                self.sub_blocks = parse_manifest(filename)
+            run.parsed[key] = (
+                FileContextFactory(paths.clean_path(filename, absolute=True)),
+                blocks_to_records(self.sub_blocks))
+
+        if run.pool is not None:
+            self._prefetch_sub_manifests(containing_dir, v3_relpaths,
+                                         ancestors, run)
+
         for b in self.sub_blocks:
             # recursively apply to manifest blocks
             if isinstance(b, ManifestBlock):
-                b.expand_blocks(containing_dir,
-                                v3_relpaths,
-                                ancestors=ancestors)
+                b._expand(containing_dir, v3_relpaths, ancestors, run)
             # expand any relative paths and substitute for any vars
             # must be in order so that a variable which expands to a
             # relative path works correctly
@@ -100,6 +172,55 @@ class ManifestBlock(CoreBlock):
                 ExecutionContext()['config'].apply_to_block(b)
                 b.expand_file_paths(containing_dir)
 
+        # only the manifests which contain this one are its ancestors, so a
+        # manifest may be included from several places, as long as it does
+        # not include itself
+        ancestors.discard(filename)
+
+    def _prefetch_sub_manifests(self, containing_dir, v3_relpaths, ancestors,
+                                run):
+        """
+        Starts parsing the sources of all of this block's sub-manifests in
+        the run's pool, so that they are ready by the time that they are
+        expanded.
+
+        Args:
+            @containing_dir
+            The directory from which the sub-blocks' relative paths are
+            expanded.
+            @v3_relpaths
+            As in expand_blocks.
+            @ancestors
+            The set of containing manifests.
+            @run
+            The _ExpansionRun for this expansion.
+        """
+        from salve.parser.cache import parse_manifest
+
+        for b in self.sub_blocks:
+            if not isinstance(b, ManifestBlock):
+                continue
+            # find the source on a copy of the block, so that expansion
+            # itself still sees the block exactly as it was parsed
+            peek = ManifestBlock(b.file_context)
+            peek.attrs = dict(b.attrs)
+            try:
+                ExecutionContext()['config'].apply_to_block(peek)
+                peek.expand_file_paths(containing_dir)
+                filename = peek['source']
+            except Exception:
+                # leave it to the expansion to raise this error, in order
+                continue
+            # an include loop is reported before the manifest would be
+            # parsed, and repeated includes are parsed only once
+            key = (filename, containing_dir)
+            if v3_relpaths:
+                key = (filename, paths.containing_dir(filename))
+            if (filename in ancestors or key in run.parsed or
+                    key in run.pending):
+                continue
+            run.pending[key] = run.pool.submit(parse_manifest, filename)
+
     def compile(self):
         """
         Uses the ManifestBlock to produce an action.
@@ -125,3 +246,30 @@ class ManifestBlock(CoreBlock):
                 act.append(subact)
 
         return act
+
+
+class _ExpansionRun(object):
+    """
+    The state shared by every ManifestBlock expanded by a single call to
+    ManifestBlock.expand_blocks
+    """
+    def __init__(self, pool):
+        """
+        _ExpansionRun constructor.
+
+        Args:
+            @pool
+            The executor used to parse sub-manifests ahead of time, or None
+            to parse each one only when it is reached.
+        """
+        self.pool = pool
+        # maps (filename, relative path root) to the FileContextFactory and
+        # block records (see salve.parser.parse.blocks_to_records) of each
+        # manifest parsed so far
+        self.parsed = {}
+        # maps the same keys to futures for the parses which were started
+        # ahead of time, and have not been picked up yet
+        self.pending = {}
+        # the number of times that a manifest did not need to be parsed
+        # because it was in self.parsed
+        self.parses_saved = 0
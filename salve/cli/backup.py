@@ -1,5 +1,153 @@
 #!/usr/bin/python
 
+from __future__ import print_function
+
+import os
+import shutil
+import sqlite3
+import stat
+import sys
+import tempfile
+
+import salve
+
+from salve import paths, ugo
+from salve.context import ExecutionContext, FileContext
+from salve.exceptions import SALVEException
+from salve.action.backup import FileBackupAction
+from salve.action.backup.catalog import open_catalog
+from salve.action.backup.log import close_logs
+from salve.filesys import ConcreteFilesys
+from salve.filesys.store import open_store, close_stores
+
+
+def show_versions(filename, versions):
+    """
+    Print the backed up versions of a file, numbered by generation, oldest
+    first.
+
+    Args:
+        @filename
+        The absolute path to the file.
+        @versions
+        Its versions, as (time, hash) pairs, as found in the catalog.
+    """
+    if not versions:
+        print('No backups of \"{0}\"'.format(filename))
+        return
+    for (generation, (when, hash_val)) in enumerate(versions, 1):
+        print('{0} {1} {2}'.format(generation, when, hash_val))
+
+
+def _put_in_place(tmp, filename):
+    """
+    Replace @filename with the recovered version at @tmp, keeping the mode
+    and owner of the file it replaces.
+    """
+    try:
+        st = os.lstat(filename)
+    except OSError:
+        st = None
+    if st is None or not stat.S_ISREG(st.st_mode) or os.path.islink(tmp):
+        os.rename(tmp, filename)
+        return
+
+    # renaming over a file with other links would leave them with the
+    # current version, so it is rewritten in place instead
+    if st.st_nlink > 1:
+        shutil.copyfile(tmp, filename)
+        return
+
+    os.chmod(tmp, stat.S_IMODE(st.st_mode))
+    if ugo.is_root():
+        os.chown(tmp, st.st_uid, st.st_gid)
+        # the chown clears setuid and setgid
+        os.chmod(tmp, stat.S_IMODE(st.st_mode))
+    os.rename(tmp, filename)
+
+
+def recover(filename, versions, generation):
+    """
+    Restore a file to one of its backed up versions, directly from the
+    backup store. The file as it is now is backed up first, so that the
+    recovery can itself be undone.
+
+    Args:
+        @filename
+        The absolute path to the file.
+        @versions
+        Its versions, as (time, hash) pairs, as found in the catalog.
+        @generation
+        The generation to restore, counting from 1 for the oldest, or None
+        for the latest.
+    """
+    context = FileContext(filename)
+    if not versions:
+        raise SALVEException('No backups to recover from', context)
+    if generation is None:
+        generation = len(versions)
+    if not 1 <= generation <= len(versions):
+        raise SALVEException(
+            'No generation {0}, there are {1}'.format(generation,
+                                                      len(versions)),
+            context)
+    (when, hash_val) = versions[generation - 1]
+
+    if os.path.lexists(filename):
+        FileBackupAction(filename, context).execute(ConcreteFilesys())
+        close_logs()
+
+    # the version is written beside the file, and put in place from there,
+    # so that a missing or unreadable backup leaves the file alone
+    files_dir = paths.pjoin(ExecutionContext()['backup_dir'], 'files')
+    tmp_dir = tempfile.mkdtemp(dir=paths.containing_dir(filename))
+    try:
+        tmp = paths.pjoin(tmp_dir, 'recovered')
+        try:
+            open_store(files_dir).restore(hash_val, tmp)
+        except KeyError:
+            raise SALVEException(
+                'Backup {0} is missing from \"{1}\"'
+                .format(hash_val, files_dir), context)
+        finally:
+            close_stores()
+        _put_in_place(tmp, filename)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    salve.logger.info('Recovered \"{0}\" from the backup of {1}'.format(
+        filename, when))
+
 
 def main(args):
-    pass  # pragma: no cover
+    """
+    The main method of the backup subcommand. Looks up the backups of a
+    file in the backup catalog, which is brought up to date with the backup
+    log first, and shows them, or recovers the file from one of them.
+    """
+    filename = paths.clean_path(args.filename, absolute=True)
+    try:
+        versions = []
+        # without a backup_dir, nothing has been backed up
+        if os.path.isdir(ExecutionContext()['backup_dir']):
+            catalog = open_catalog()
+            try:
+                if args.rebuild_catalog:
+                    catalog.rebuild()
+                else:
+                    catalog.sync()
+                versions = catalog.versions(filename)
+            finally:
+                catalog.close()
+
+        if args.recover:
+            recover(filename, versions, args.generation)
+        else:
+            show_versions(filename, versions)
+    except (sqlite3.Error, IOError, OSError) as e:
+        salve.logger.error('{0}: {1}'.format(filename, e))
+        # as in deploy, give the right exit status for commandline usage
+        sys.exit(1)
+    except SALVEException as e:
+        salve.logger.error(str(e.file_context) + ': ' + e.message)
+        sys.exit(1)
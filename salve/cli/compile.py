@@ -0,0 +1,57 @@
+#!/usr/bin/python
+
+import os
+import sys
+import tempfile
+
+import salve
+
+from salve.action.plan import dump_plan
+from salve.exceptions import SALVEException
+from salve.cli.deploy import compile_manifest
+
+
+def _write_plan(root_action, output):
+    """
+    Writes the plan for @root_action to a temporary file beside @output,
+    and renames it into place, so that a failed compile never leaves a
+    partial plan for deploy --plan to run.
+
+    Args:
+        @root_action
+        The compiled action to write.
+        @output
+        The path of the plan.
+    """
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(output)), suffix='.tmp')
+    try:
+        # mkstemp creates the file readable only by its owner, but the plan
+        # should get the same umask-based mode that open() would give it
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_path, 0o666 & ~umask)
+        with os.fdopen(fd, 'w') as f:
+            dump_plan(root_action, f)
+        os.rename(tmp_path, output)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def main(args):
+    """
+    The main method of SALVE compilation. Parses, expands, and compiles the
+    manifest tree, and writes the resulting actions to a plan, which
+    deploy --plan can execute later, and on other hosts.
+    """
+    try:
+        root_action = compile_manifest(args.manifest, args)
+        _write_plan(root_action, args.output)
+    except SALVEException as e:
+        salve.logger.error(str(e.file_context) + ': ' + e.message)
+        # as in deploy, give the right exit status for commandline usage
+        sys.exit(1)
+
+    salve.logger.info('Wrote plan for \"%s\" to \"%s\"' %
+                      (args.manifest, args.output))
@@ -3,26 +3,105 @@
 from __future__ import print_function
 
 import os
+import sqlite3
 import sys
 
 import salve
 
-from salve import paths
-from salve.context import FileContext
+from salve import paths, ugo
+from salve.context import FileContext, ExecutionContext
 from salve.exceptions import SALVEException
+from salve.action.analysis import owners
+from salve.action.backup.catalog import open_catalog
+from salve.action.backup.log import close_logs, exit_cleanly_on_signals
+from salve.action.copy.file import skipped_copies, reset_skipped_copies
+from salve.action.optimize import optimize
+from salve.action.plan import load_plan
+from salve.action.schedule import execute_parallel
 from salve.block import ManifestBlock
-from salve.filesys import ConcreteFilesys
+from salve.filesys import CachingFilesys
+from salve.filesys.hashcache import HashCache, DEFAULT_MAX_ENTRIES
+from salve.filesys.store import close_stores
+from salve.parser.cache import ParseCache, DEFAULT_MAX_SIZE
 
 
-def run_on_manifest(root_manifest, args):
+def setup_parse_cache(args):
     """
-    Given a manifest file, loads SALVEConfig, parses and expands the
-    root manifest, then executes the actions defined by that manifest.
+    Puts a ParseCache in the ExecutionContext, so that manifests are parsed
+    through it, unless it is disabled in the args or there is no cache_dir.
+
+    Args:
+        @args
+        The options, as parsed from the commandline.
+    """
+    ctx = ExecutionContext()
+    cache = None
+    if args.parse_cache and 'cache_dir' in ctx:
+        max_size = DEFAULT_MAX_SIZE
+        if 'parse_cache_size' in ctx:
+            max_size = int(ctx['parse_cache_size'])
+        cache = ParseCache(paths.pjoin(ctx['cache_dir'], 'manifests'),
+                           max_size=max_size)
+    ctx['parse_cache'] = cache
+
+
+def setup_hash_cache(args):
+    """
+    Puts a HashCache, stored beside the backups in backup_dir, in the
+    ExecutionContext, so that files are hashed through it. If the args ask
+    for every file to be rehashed, the stored hashes are not read, but
+    replaced with the ones computed in this run. Returns the cache, or None
+    if there is no backup_dir.
+
+    Args:
+        @args
+        The options, as parsed from the commandline.
+    """
+    ctx = ExecutionContext()
+    cache = None
+    if 'backup_dir' in ctx:
+        max_entries = DEFAULT_MAX_ENTRIES
+        if 'hash_cache_size' in ctx:
+            max_entries = int(ctx['hash_cache_size'])
+        cache = HashCache(paths.pjoin(ctx['backup_dir'], 'hashes.json'),
+                          max_entries=max_entries, load=not args.rehash)
+    ctx['hash_cache'] = cache
+    return cache
+
+
+def sync_catalog():
+    """
+    Indexes the lines which a run appended to the backup log in the backup
+    catalog, so that the backup subcommand finds them without reading the
+    log. A catalog which cannot be written is only warned about, since the
+    backup subcommand brings it up to date before using it anyway.
+    """
+    ctx = ExecutionContext()
+    if 'backup_dir' not in ctx or 'backup_log' not in ctx or \
+       not os.path.isfile(ctx['backup_log']) or \
+       not os.path.isdir(ctx['backup_dir']):
+        return
+    try:
+        catalog = open_catalog()
+        try:
+            catalog.sync()
+        finally:
+            catalog.close()
+    except (sqlite3.Error, IOError, OSError) as e:
+        salve.logger.warn('Could not update backup catalog in \"{0}\": '
+                          '{1}'.format(ctx['backup_dir'], e))
+
+
+def compile_manifest(root_manifest, args):
+    """
+    Given a manifest file, parses and expands the root manifest, then
+    compiles it into the action which executes the whole manifest tree.
+    Unless it is disabled in the args, the action is optimized, to remove
+    redundant operations.
 
     Args:
         @root_manifest
-        The manifest at the root of the manifest tree, and starting
-        point for manifest execution.
+        The manifest at the root of the manifest tree.
         @args
         The options, as parsed from the commandline.
     """
@@ -32,12 +111,106 @@ def run_on_manifest(root_manifest, args):
 
     # root_block is a synthetic manifest block containing the root
     # manifest
+    setup_parse_cache(args)
+
     root_block = ManifestBlock(FileContext('no such file'),
                                source=root_manifest)
     root_block.expand_blocks(root_dir, args.v3_relpath)
 
     root_action = root_block.compile()
-    root_action(ConcreteFilesys())
+    if args.optimize:
+        root_action = optimize(root_action)
+    return root_action
+
+
+def execute(root_action, args):
+    """
+    Executes a compiled action tree, with as many jobs as are given in the
+    args, and logs the syscalls saved by caching file lookups.
+
+    The users and groups which the tree chowns to are all looked up first,
+    so that no action waits on NSS for them. Files which are already
+    identical to their sources are not copied, and the bytes which were
+    not written are logged. Hashes of unchanged files are reused from
+    earlier runs, and those computed in this one are saved for later runs.
+    Backup log lines are written in batches, and all of them are written
+    out when the run ends, even when it is ended by a signal, and then
+    indexed in the backup catalog.
+
+    Args:
+        @root_action
+        The action to execute.
+        @args
+        The options, as parsed from the commandline.
+    """
+    ExecutionContext()['trust_mtime'] = args.trust_mtime
+    reset_skipped_copies()
+    ugo.clear_cache()
+    users, groups = owners(root_action)
+    ugo.prefetch(users, groups)
+
+    hash_cache = setup_hash_cache(args)
+
+    filesys = CachingFilesys()
+    try:
+        with exit_cleanly_on_signals():
+            execute_parallel(root_action, filesys, args.jobs)
+    finally:
+        close_logs()
+        sync_catalog()
+        close_stores()
+        if hash_cache is not None:
+            try:
+                hash_cache.save()
+            except (IOError, OSError) as e:
+                salve.logger.warn('Could not write hash cache \"{0}\": '
+                                  '{1}'.format(hash_cache.path, e))
+            salve.logger.info('File hashes: {0} cached, {1} '
+                              'computed'.format(hash_cache.hits,
+                                                hash_cache.misses))
+    # the report contains a '%', so it must not be the format string
+    salve.logger.info('%s', filesys.report())
+    salve.logger.info('UID and GID lookups: {0} cached, {1} made'.format(
+        *ugo.cache_stats()))
+    salve.logger.info('Skipped copying {0} identical files, {1} bytes not '
+                      'written'.format(*skipped_copies()))
+
+
+def run_on_manifest(root_manifest, args):
+    """
+    Given a manifest file, loads SALVEConfig, parses and expands the
+    root manifest, then executes the actions defined by that manifest.
+
+    Args:
+        @root_manifest
+        The manifest at the root of the manifest tree, and starting
+        point for manifest execution.
+        @args
+        The options, as parsed from the commandline.
+    """
+    root_action = compile_manifest(root_manifest, args)
+    execute(root_action, args)
+
+
+def run_on_plan(plan_file, args):
+    """
+    Given a plan written by the compile subcommand, loads and executes the
+    actions stored in it. No manifests are parsed, and no configuration is
+    applied to blocks, since that was all done when the plan was compiled.
+
+    Args:
+        @plan_file
+        The plan to execute.
+        @args
+        The options, as parsed from the commandline.
+    """
+    try:
+        with open(plan_file) as f:
+            root_action = load_plan(f)
+    except (IOError, OSError) as e:
+        raise SALVEException('Could not read plan: ' + str(e),
+                             FileContext(plan_file))
+    execute(root_action, args)
 
 
 def main(args):
@@ -45,7 +218,10 @@ def main(args):
     The main method of SALVE deployment. Runs the core program end-to-end.
     """
     try:
-        run_on_manifest(args.manifest, args)
+        if args.manifest is None:
+            run_on_plan(args.plan, args)
+        else:
+            run_on_manifest(args.manifest, args)
     except SALVEException as e:
         salve.logger.error(str(e.file_context) + ': ' + e.message)
         # Normally, sys.exit() is to be avoided, but main() is only
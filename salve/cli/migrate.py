@@ -0,0 +1,35 @@
+#!/usr/bin/python
+
+import os
+import sys
+
+import salve
+
+from salve import paths
+from salve.context import ExecutionContext
+from salve.filesys.store import open_store, close_stores
+
+
+def main(args):
+    """
+    The main method of backup migration. Moves the backups stored flat in
+    backup_dir by earlier versions of SALVE into the sharded, packed and
+    compressed layout of the backup store. Backups are readable in either
+    layout, so this only needs to be run once, to speed up later runs.
+    """
+    files_dir = paths.pjoin(ExecutionContext()['backup_dir'], 'files')
+    if not os.path.isdir(files_dir):
+        salve.logger.info('No backups to migrate in \"%s\"' % files_dir)
+        return
+
+    try:
+        count = open_store(files_dir).migrate(jobs=args.jobs)
+    except (IOError, OSError) as e:
+        salve.logger.error('Could not migrate backups: ' + str(e))
+        # as in deploy, give the right exit status for commandline usage
+        sys.exit(1)
+    finally:
+        close_stores()
+
+    salve.logger.info('Migrated {0} backups in \"{1}\"'.format(count,
+                                                               files_dir))
@@ -7,10 +7,12 @@ from salve.config import SALVEConfig
 from salve.context import ExecutionContext
 from salve.cli.default_subparser import set_default_subparser
 import salve.cli.deploy
+import salve.cli.compile
 import salve.cli.backup
+import salve.cli.migrate
 
 
-def add_backup_args(parser):  # pragma: no cover
+def add_backup_args(parser):
     """
     Takes in an argparse parser and adds the options for the backup subcommand.
     This is necessary because of the way that argparse handles subparsers --
@@ -28,19 +30,41 @@ def add_backup_args(parser):  # pragma: no cover
     parser.add_argument(
         '-f', '--filename', dest='filename', default=None,
         required=True, help='The absolute path to the file to act upon.')
+    parser.add_argument(
+        '-g', '--generation', dest='generation', type=int, default=None,
+        help='The generation to recover, as numbered by --show-versions. ' +
+        'Defaults to the latest.')
+    parser.add_argument(
+        '--rebuild-catalog', dest='rebuild_catalog', action='store_true',
+        default=False,
+        help='Boolean flag, indicates that the backup catalog should be ' +
+        'rebuilt from the whole backup log.')
 
     parser.set_defaults(func=salve.cli.backup.main)
 
 
-def add_deploy_args(parser):
+def add_manifest_args(parser, manifest_group=None):
     """
-    Takes in an argparse parser and adds the options for the deploy subcommand.
-    This is necessary because of the way that argparse handles subparsers --
-    namely, that they are created automatically at the time of addition.
+    Takes in an argparse parser and adds the options which control how a
+    manifest tree is read, shared by the deploy and compile subcommands.
+
+    Args:
+        @parser
+        The parser for the subcommand.
+
+    KWArgs:
+        @manifest_group
+        A group of @parser to which the manifest option is added. When None,
+        the manifest option is added to @parser, and is required.
     """
-    parser.add_argument(
-        '-m', '--manifest', dest='manifest', default=None,
-        required=True, help='The root manifest file for execution.')
+    if manifest_group is None:
+        parser.add_argument(
+            '-m', '--manifest', dest='manifest', default=None,
+            required=True, help='The root manifest file for execution.')
+    else:
+        manifest_group.add_argument(
+            '-m', '--manifest', dest='manifest', default=None,
+            help='The root manifest file for execution.')
     parser.add_argument(
         '-d', '--directory', dest='directory', default=None,
         help='The directory to which relative paths in manifests refer. ' +
@@ -54,10 +78,80 @@ def add_deploy_args(parser):
         default=False, action='store_true', help='Expand relative paths ' +
         'in manifests relative to the current manifest, rather than ' +
         'the root manifest.')
+    parser.add_argument(
+        '--no-parse-cache', dest='parse_cache',
+        default=True, action='store_false', help='Parse every manifest, ' +
+        'instead of reusing the parsed blocks cached in cache_dir by ' +
+        'earlier runs.')
+    parser.add_argument(
+        '--no-optimize', dest='optimize',
+        default=True, action='store_false', help='Execute every action ' +
+        'compiled from the manifests, instead of removing and fusing ' +
+        'redundant ones.')
+
+
+def add_deploy_args(parser):
+    """
+    Takes in an argparse parser and adds the options for the deploy subcommand.
+    This is necessary because of the way that argparse handles subparsers --
+    namely, that they are created automatically at the time of addition.
+    """
+    # deploy runs either a manifest tree or a compiled plan
+    source_group = parser.add_mutually_exclusive_group(required=True)
+    add_manifest_args(parser, manifest_group=source_group)
+    source_group.add_argument(
+        '--plan', dest='plan', default=None,
+        help='A plan written by the compile subcommand, to execute ' +
+        'instead of a manifest.')
+    parser.add_argument(
+        '-j', '--jobs', dest='jobs', default=1, type=int,
+        help='The number of actions to execute at the same time. Actions ' +
+        'on related paths always execute in order.')
+    parser.add_argument(
+        '--trust-mtime', dest='trust_mtime',
+        default=False, action='store_true', help='Take a target file of ' +
+        'the same size as its source, and modified no earlier, to be ' +
+        'identical to it, instead of comparing their hashes before ' +
+        'skipping the copy.')
+    parser.add_argument(
+        '--rehash', dest='rehash',
+        default=False, action='store_true', help='Hash every file again, ' +
+        'instead of reusing the hashes of unchanged files stored in ' +
+        'backup_dir by earlier runs.')
 
     parser.set_defaults(func=salve.cli.deploy.main)
 
 
+def add_compile_args(parser):
+    """
+    Takes in an argparse parser and adds the options for the compile
+    subcommand.
+    This is necessary because of the way that argparse handles subparsers --
+    namely, that they are created automatically at the time of addition.
+    """
+    add_manifest_args(parser)
+    parser.add_argument(
+        '-o', '--output', dest='output', default=None,
+        required=True, help='The file to which the plan is written.')
+
+    parser.set_defaults(func=salve.cli.compile.main)
+
+
+def add_migrate_args(parser):
+    """
+    Takes in an argparse parser and adds the options for the migrate-backups
+    subcommand.
+    This is necessary because of the way that argparse handles subparsers --
+    namely, that they are created automatically at the time of addition.
+    """
+    parser.add_argument(
+        '-j', '--jobs', dest='jobs', default=1, type=int,
+        help='The number of backups to move, and compress, at the same ' +
+        'time.')
+
+    parser.set_defaults(func=salve.cli.migrate.main)
+
+
 def get_parser():
     """
     Produces a command line option parser for SALVE using argparse.
@@ -92,16 +186,26 @@ def get_parser():
         title='Subcommands',
         parser_class=SALVESharedParser, metavar='')
 
-    # don't yet add the backup parser -- it isn't supported yet
-    # backup_parser = subparsers.add_parser('backup',
-    #         help='Directly manipulate, inspect, and restore from backups.')
-    # add_backup_args(backup_parser)
+    backup_parser = subparsers.add_parser(
+        'backup', help='Directly manipulate, inspect, and restore from ' +
+        'backups.')
+    add_backup_args(backup_parser)
 
     deploy_parser = subparsers.add_parser(
         'deploy', help='Run on a manifest' +
         ' tree and deploy the described configuration.')
     add_deploy_args(deploy_parser)
 
+    compile_parser = subparsers.add_parser(
+        'compile', help='Compile a manifest tree into a plan, which ' +
+        'deploy --plan executes without reading any manifests.')
+    add_compile_args(compile_parser)
+
+    migrate_parser = subparsers.add_parser(
+        'migrate-backups', help='Move backups stored by earlier versions ' +
+        'into the sharded and packed backup store.')
+    add_migrate_args(migrate_parser)
+
     # make the deploy subcommand the default
     set_default_subparser(parser, 'deploy')
 
@@ -125,8 +229,8 @@ def load_args():
     if args.log_level:
         salve.logger.setLevel(salve.log.str_to_level(args.log_level))
 
-    # do 'deploy' specific actions to clean/validate args
-    if args.func is salve.cli.deploy.main:
+    # do actions specific to reading manifests to clean/validate args
+    if args.func in (salve.cli.deploy.main, salve.cli.compile.main):
         # set all v3 options if version3 is set
         if args.version3:
             args.v3_relpath = True
@@ -11,14 +11,49 @@ import string
 import salve
 import salve.log
 
-from salve import ugo
+from salve import ugo, util
 from salve.context import FileContext, ExecutionContext
 from salve.exceptions import SALVEException
+from salve.filesys import store
 
 from .parser import SALVEConfigParser
 
 SALVE_ENV_PREFIX = 'SALVE_'
 
+# the maximum number of distinct strings whose substitutions are cached by
+# SALVEConfig.template
+TEMPLATE_CACHE_SIZE = 4096
+
+
+class _Environment(dict):
+    """
+    The variables substituted into config and block attributes.
+
+    This is a dict which counts its modifications, so that anything derived
+    from it, like the substitutions cached by SALVEConfig, can tell when it
+    is out of date.
+    """
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self, *args, **kwargs)
+        self.version = 0
+
+    def _modified(method):
+        def wrapper(self, *args, **kwargs):
+            self.version += 1
+            return method(self, *args, **kwargs)
+        wrapper.__name__ = method.__name__
+        return wrapper
+
+    __setitem__ = _modified(dict.__setitem__)
+    __delitem__ = _modified(dict.__delitem__)
+    clear = _modified(dict.clear)
+    pop = _modified(dict.pop)
+    popitem = _modified(dict.popitem)
+    setdefault = _modified(dict.setdefault)
+    update = _modified(dict.update)
+
+    del _modified
+
 
 class SALVEConfig(object):
     """
@@ -30,6 +65,9 @@ class SALVEConfig(object):
     without modifying the config files. They also offer a way
     of guaranteeing that the configuration values are as desired
     without inspecting the files.
+    The attributes for each block type are merged with the defaults once,
+    when the configuration is loaded, so changing the attributes after
+    that is not supported.
     """
     def __init__(self, filename=None):
         """
@@ -47,12 +85,14 @@ class SALVEConfig(object):
             user = os.environ['SUDO_USER']
         userhome = os.path.expanduser('~' + user)
 
-        # copy the environ to a dictionary, because we don't want to
-        # modify the environment just to track things like USER and
-        # HOME when working around invocation with sudo
-        self.env = {}
-        for k in os.environ:
-            self.env[k] = os.environ[k]
+        # substitutions are cached, see template()
+        self._template_cache = {}
+        self._cache_version = None
+
+        # copy the environ to a dictionary (the env setter copies), because
+        # we don't want to modify the environment just to track things like
+        # USER and HOME when working around invocation with sudo
+        self.env = os.environ
         # in self.env, reset USER and HOME to the desired values
         # along with SALVE_USER_PRIMARY_GROUP
         self.env['USER'] = user
@@ -83,9 +123,34 @@ class SALVEConfig(object):
                                for s in sections)
 
         self._apply_environment_overrides()
+        self._block_defaults = self._merge_block_defaults()
 
         self._set_context_globals()
 
+    @property
+    def env(self):
+        """
+        The variables which are substituted into attributes. It may be
+        modified, or replaced, and templating will pick up the changes.
+        """
+        return self._env
+
+    @env.setter
+    def env(self, value):
+        # always keep a copy, both to avoid modifying the source, and so that
+        # modifications can be tracked
+        self._env = _Environment(value)
+        self._cache_version = None
+
+    def _check_cache(self):
+        """
+        Empties the caches of substitutions if the environment has been
+        modified since they were filled.
+        """
+        if self._cache_version != self._env.version:
+            self._template_cache.clear()
+            self._cache_version = self._env.version
+
     def _apply_environment_overrides(self):
         # Grab all of the mappings from the environment that
         # start with the SALVE prefix and are uppercase
@@ -127,6 +192,17 @@ class SALVEConfig(object):
                 val = salve.log.str_to_level(val)
                 salve.logger.setLevel(val)
 
+            if key == 'hash_algorithm' and \
+               not util.hash_algorithm_supported(val):
+                raise SALVEException(
+                    'Unsupported hash_algorithm "%s"' % val,
+                    FileContext(self.filename))
+            if key == 'backup_compression' and \
+               not store.compression_supported(val):
+                raise SALVEException(
+                    'Unsupported backup_compression "%s"' % val,
+                    FileContext(self.filename))
+
             ExecutionContext()[key] = val
 
     def template(self, template_string):
@@ -137,14 +213,49 @@ class SALVEConfig(object):
         Returns a new string in which placeholders have been replaced,
         or raises a KeyError if they are not found.
 
+        The same few strings, like $USER and $HOME, are substituted into a
+        great many blocks, so results are cached, up to TEMPLATE_CACHE_SIZE
+        of them, until the environment is modified.
+
         Args:
             @template_string
             A string containing variables meant to be replaced with
             environment variables, as represented or overridden in the
             Config.
         """
-        temp = string.Template(template_string)
-        return temp.substitute(self.env)
+        # without a '$', there is nothing to substitute
+        if '$' not in template_string:
+            return template_string
+
+        self._check_cache()
+        try:
+            return self._template_cache[template_string]
+        except KeyError:
+            pass
+
+        result = string.Template(template_string).substitute(self._env)
+        # a full cache is simply emptied, since it is only full when most
+        # strings are distinct, and then there is little to lose
+        if len(self._template_cache) >= TEMPLATE_CACHE_SIZE:
+            self._template_cache.clear()
+        self._template_cache[template_string] = result
+        return result
+
+    def _merge_block_defaults(self):
+        """
+        For each block type, merge the attributes for that type with the
+        default attributes, so that they can be applied to each block in a
+        single pass. The result is a dict mapping lowercased block types to
+        lists of (key, value) pairs.
+        """
+        block_defaults = {}
+        for ty in self.attributes:
+            if ty in ('global', 'default'):
+                continue
+            merged = dict(self.attributes['default'])
+            merged.update(self.attributes[ty])
+            block_defaults[ty] = list(merged.items())
+        return block_defaults
 
     def apply_to_block(self, block):
         """
@@ -158,19 +269,15 @@ class SALVEConfig(object):
             general policy is to only apply attributes that are not
             already specified.
         """
-        ty = block.block_type.lower()
-        relevant_attrs = self.attributes[ty]
-
-        # set any unset attrs in the config
-        for key in relevant_attrs:
-            if key not in block.attrs:
-                block[key] = relevant_attrs[key]
-
-        # set any remaining unspecified attributes using defaults
-        for key in self.attributes['default']:
-            if key not in block.attrs:
-                block[key] = self.attributes['default'][key]
+        template = self.template
+        attrs = block.attrs
 
         # template any block attrs
-        for key in block.attrs:
-            block[key] = self.template(block[key])
+        for key in attrs:
+            block[key] = template(attrs[key])
+
+        # set any unset attrs using the config, and then the defaults,
+        # templating only those which are used
+        for (key, value) in self._block_defaults[block.block_type.lower()]:
+            if key not in attrs:
+                block[key] = template(value)
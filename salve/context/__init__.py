@@ -1,4 +1,4 @@
-from .filectx import FileContext
+from .filectx import FileContext, FileContextFactory
 from .execctx import ExecutionContext
 
-__all__ = ['FileContext', 'ExecutionContext']
+__all__ = ['FileContext', 'FileContextFactory', 'ExecutionContext']
@@ -1,12 +1,24 @@
 #!/usr/bin/python
 
+try:
+    from sys import intern
+except ImportError:  # pragma: no cover
+    # on Python 2, intern is a builtin
+    pass
+
 from salve import paths
 
 
 class FileContext(object):
     """
     Identifies a location in the manifest tree by filename and lineno.
+
+    FileContexts are never modified once they are created, so a single
+    FileContext may be shared by everything at the same location. See
+    FileContextFactory.
     """
+    __slots__ = ('filename', 'lineno')
+
     def __init__(self, filename, lineno=None):
         """
         FileContext initializer.
@@ -34,3 +46,44 @@ class FileContext(object):
         if self.lineno is not None:
             contents = contents + ',lineno=' + str(self.lineno)
         return 'FileContext(' + contents + ')'
+
+
+class FileContextFactory(object):
+    """
+    Produces the FileContexts for locations in a single file.
+
+    The filename is cleaned and interned once, rather than once per
+    FileContext, and there is only ever one FileContext per line, which is
+    shared by every token and block on that line.
+    """
+    __slots__ = ('filename', 'contexts')
+
+    def __init__(self, filename):
+        """
+        FileContextFactory initializer.
+
+        Args:
+            @filename
+            The file for which FileContexts are produced.
+        """
+        self.filename = intern(str(paths.clean_path(filename)))
+        self.contexts = {}
+
+    def __call__(self, lineno=None):
+        """
+        Get the FileContext for a line of the file.
+
+        KWArgs:
+            @lineno=None
+            The line number, as in the FileContext initializer.
+        """
+        try:
+            return self.contexts[lineno]
+        except KeyError:
+            # bypass the FileContext initializer, since the filename has
+            # already been cleaned
+            ctx = FileContext.__new__(FileContext)
+            ctx.filename = self.filename
+            ctx.lineno = lineno
+            self.contexts[lineno] = ctx
+            return ctx
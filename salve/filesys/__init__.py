@@ -1,11 +1,13 @@
 from .abstract import Filesys
 from .concrete import ConcreteFilesys
+from .caching import CachingFilesys
 
 from .access import access_codes
 
 __all__ = [
     'Filesys',
     'ConcreteFilesys',
+    'CachingFilesys',
 
     'access_codes'
 ]
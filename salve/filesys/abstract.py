@@ -180,6 +180,23 @@ class Filesys(with_metaclass(abc.ABCMeta)):
             The destination file, as a path.
         """
 
+    @abc.abstractmethod
+    def store_hashed(self, path, store_dir):  # pragma: no cover
+        """
+        Stores the file or link at @path in the backup store in the
+        directory @store_dir, named by the hash of its contents, as hash()
+        names it, reading the file only once. Contents which are already
+        stored are not stored again.
+
+        Returns the name of the hash.
+
+        Args:
+            @path
+            The path to the file or link.
+            @store_dir
+            The path to the directory of the store, which must exist.
+        """
+
     @abc.abstractmethod
     def walk(self, path, *args, **kwargs):  # pragma: no cover
         """
@@ -202,6 +219,61 @@ class Filesys(with_metaclass(abc.ABCMeta)):
             The path to the directory to walk.
         """
 
+    @abc.abstractmethod
+    def scandir(self, path, *args, **kwargs):  # pragma: no cover
+        """
+        An iterator over the entries of the directory at @path, like
+        os.scandir, yielding objects with a name attribute, the name of the
+        entry within @path, and is_dir() and is_symlink() methods. is_dir()
+        follows symlinks, so a link to a directory is a directory, as in
+        walk().
+
+        Unlike walk(), this does not build lists of the contents of the
+        directory, so it can be used on directories of any size.
+
+        If the directory does not exist, or cannot be read, the iterator is
+        empty.
+
+        Args:
+            @path
+            The path to the directory to scan.
+        """
+
+    @abc.abstractmethod
+    def chmod_tree(self, path, mode):  # pragma: no cover
+        """
+        Chmods everything under the directory at @path, but not @path
+        itself, to @mode. Symlinks are neither followed nor changed, and
+        entries which already have @mode are left alone, as are entries
+        the current user does not own, unless running as root.
+
+        Returns a pair (changed, skipped), the number of entries which were
+        chmoded and the number which were left alone.
+
+        Args:
+            @path
+            The path to the directory.
+            @mode
+            An octal int for ugo-style permissions, as in chmod().
+        """
+
+    @abc.abstractmethod
+    def chown_tree(self, path, uid, gid):  # pragma: no cover
+        """
+        Chowns everything under the directory at @path, but not @path
+        itself, to @uid and @gid. As with chown(), symlinks are not
+        followed, and entries which already have that owner are left alone.
+
+        Returns a pair (changed, skipped), as chmod_tree() does.
+
+        Args:
+            @path
+            The path to the directory.
+            @uid
+            @gid
+            The new owner, as in chown().
+        """
+
     @abc.abstractmethod
     def touch(self, path, *args, **kwargs):  # pragma: no cover
         """
@@ -266,6 +338,20 @@ class Filesys(with_metaclass(abc.ABCMeta)):
         >>>     exit()
         """
 
+    def invalidate(self, path=None, subtree=False):
+        """
+        Called when something other than this filesys, like a shell
+        command, may have changed @path, so that any filesys which keeps
+        information about paths can forget it. Does nothing by default.
+
+        KWArgs:
+            @path
+            The path which may have changed. When None, any path may have
+            changed.
+            @subtree
+            When True, anything under @path may have changed as well.
+        """
+
     def get_existing_ancestor(self, path):
         """
         Find the nearest ancestor of a file, dir, or link that passes an
@@ -0,0 +1,386 @@
+import os
+import stat
+import threading
+from contextlib import contextmanager
+
+from salve import ugo
+from salve.filesys.access import access_codes
+from salve.filesys.concrete import ConcreteFilesys
+
+
+class CachingFilesys(ConcreteFilesys):
+    """
+    A ConcreteFilesys which remembers the lstat() of every path it looks at,
+    and answers exists(), lookup_type(), stat() and existence checks from
+    it, rather than asking the OS again. The results of other access()
+    checks, and the hashes of files, are remembered as well.
+
+    Everything remembered about a path is forgotten when the filesys
+    changes it, so a CachingFilesys should only be used for a single run, in
+    which nothing else changes the files that it looks at. Anything else
+    which might, like a shell command, must call invalidate().
+
+    Counts the lookup syscalls (lstat, access) it makes, and the ones it
+    saves compared to a ConcreteFilesys.
+    """
+    def __init__(self):
+        ConcreteFilesys.__init__(self)
+        # guards everything below, when actions are executed in parallel
+        self.lock = threading.Lock()
+        # the lstat() result of each path, or the (errno, strerror) of the
+        # OSError which it raised
+        self.stats = {}
+        # the paths with each (st_dev, st_ino), to forget hard links
+        self.paths_of = {}
+        # the hash of the contents of each file, forgotten along with its
+        # lstat()
+        self.hashes = {}
+        # the result of each access() check, by path and then by mode
+        self.access_results = {}
+        # the paths with access() results which were not known to be
+        # checked on anything but a symlink, and which a change to any
+        # path may affect
+        self.indirect = set()
+        # the files with more than one link, which a change to a tree may
+        # affect through a link outside of it
+        self.linked = set()
+        # the paths with anything remembered about them, or beneath them,
+        # by the directory containing them, to forget a whole tree
+        self.children = {}
+        # bumped whenever anything is forgotten, so that a result which
+        # was looked up before that is not remembered after it
+        self.epoch = 0
+
+        self.syscalls = 0
+        self.saved = 0
+
+    def _count(self, made, saved):
+        with self.lock:
+            self.syscalls += made
+            self.saved += saved
+
+    def _register(self, path):
+        # the caller must hold the lock
+        parent = os.path.dirname(path)
+        while parent != path:
+            kids = self.children.setdefault(parent, set())
+            if path in kids:
+                return
+            kids.add(path)
+            path, parent = parent, os.path.dirname(parent)
+
+    def _lstat(self, path, saves=1):
+        """
+        Get the lstat() of @path, or the (errno, strerror) of the OSError
+        which it raises, along with True if it was cached.
+
+        KWArgs:
+            @saves
+            The number of syscalls saved when it is cached.
+        """
+        with self.lock:
+            try:
+                result = self.stats[path]
+                self.saved += saves
+                return result, True
+            except KeyError:
+                epoch = self.epoch
+
+        try:
+            result = os.lstat(path)
+        except OSError as e:
+            result = (e.errno, e.strerror)
+
+        with self.lock:
+            self.syscalls += 1
+            if self.epoch == epoch:
+                self.stats[path] = result
+                self._register(path)
+                if isinstance(result, os.stat_result):
+                    key = (result.st_dev, result.st_ino)
+                    self.paths_of.setdefault(key, set()).add(path)
+                    if result.st_nlink > 1 and \
+                       not stat.S_ISDIR(result.st_mode):
+                        self.linked.add(path)
+        return result, False
+
+    def _drop(self, path):
+        # the caller must hold the lock
+        result = self.stats.pop(path, None)
+        self.hashes.pop(path, None)
+        self.access_results.pop(path, None)
+        self.indirect.discard(path)
+        self.linked.discard(path)
+        return result
+
+    def _forget_path(self, path, result=None):
+        # the caller must hold the lock
+        # @result is the stat() of @path, if it is not cached
+        cached = self._drop(path)
+        if cached is not None:
+            result = cached
+        if isinstance(result, os.stat_result):
+            key = (result.st_dev, result.st_ino)
+            for p in self.paths_of.pop(key, ()):
+                self._drop(p)
+        return result
+
+    def _forget_beneath(self, path):
+        # the caller must hold the lock
+        # forgets the paths inside of @path, but not @path itself
+        pending = list(self.children.pop(path, ()))
+        while pending:
+            p = pending.pop()
+            self._forget_path(p)
+            pending.extend(self.children.pop(p, ()))
+
+    def _forget_indirect(self):
+        # the caller must hold the lock
+        for p in self.indirect:
+            self.access_results.pop(p, None)
+        self.indirect = set()
+
+    def _forget_all(self):
+        # the caller must hold the lock
+        self.stats = {}
+        self.paths_of = {}
+        self.hashes = {}
+        self.access_results = {}
+        self.indirect = set()
+        self.linked = set()
+        self.children = {}
+
+    def invalidate(self, path=None, subtree=False):
+        """
+        Forget what is known about @path, and any other paths to the same
+        file, or about every path if @path is None.
+
+        KWArgs:
+            @subtree
+            When True, also forget everything under @path, and any other
+            paths to the files under it.
+        """
+        with self.lock:
+            self.epoch += 1
+            if path is None:
+                self._forget_all()
+                return
+            self._forget_indirect()
+            self._forget_path(path)
+            if subtree:
+                self._forget_beneath(path)
+                # a file under @path may be linked to from outside of it
+                for p in list(self.linked):
+                    self._forget_path(p)
+
+    def _forget_modified(self, path):
+        """
+        Forget what is known about @path, after its mode or owner changes.
+        """
+        with self.lock:
+            self.epoch += 1
+            self._forget_indirect()
+            result = self._forget_path(path)
+            if not isinstance(result, os.stat_result):
+                result = None
+            # a chmod follows symlinks to a file whose paths are unknown,
+            # and changing a directory can change which of the files under
+            # it can be seen, unless running as root
+            if result is None or stat.S_ISLNK(result.st_mode) or \
+               (stat.S_ISDIR(result.st_mode) and not ugo.is_root()):
+                self._forget_all()
+
+    def _forget_created(self, path):
+        """
+        Forget what is known about @path, after it is created or written,
+        and about its ancestors, which may also have been created.
+        """
+        # a file which was written without being looked up may still have
+        # other links which were
+        with self.lock:
+            cached = path in self.stats
+        written = None
+        if not cached:
+            try:
+                written = os.lstat(path)
+            except OSError:
+                pass
+            self._count(1, 0)
+
+        with self.lock:
+            self.epoch += 1
+            self._forget_indirect()
+            result = self._forget_path(path, written)
+            # writing to a link writes to a file whose paths are unknown
+            if isinstance(result, os.stat_result) and \
+               stat.S_ISLNK(result.st_mode):
+                self._forget_all()
+                return
+            parent = os.path.dirname(path)
+            while parent != path:
+                self._forget_path(parent)
+                path, parent = parent, os.path.dirname(parent)
+
+    def stat(self, path):
+        result, hit = self._lstat(path)
+        if isinstance(result, os.stat_result):
+            return result
+        raise OSError(result[0], result[1], path)
+
+    def exists(self, path):
+        result, hit = self._lstat(path)
+        return isinstance(result, os.stat_result)
+
+    def lookup_type(self, path):
+        result, hit = self._lstat(path, saves=0)
+        # count the calls which ConcreteFilesys would make, to islink(),
+        # isdir() and isfile() in turn
+        if not isinstance(result, os.stat_result):
+            ty, calls = None, 3
+        elif stat.S_ISLNK(result.st_mode):
+            ty, calls = self.element_types.LINK, 1
+        elif stat.S_ISDIR(result.st_mode):
+            ty, calls = self.element_types.DIR, 2
+        elif stat.S_ISREG(result.st_mode):
+            ty, calls = self.element_types.FILE, 3
+        else:
+            ty, calls = None, 3
+        self._count(0, calls if hit else calls - 1)
+        return ty
+
+    def access(self, path, mode):
+        # existence checks on anything but a link can use the lstat()
+        if mode == access_codes.F_OK:
+            result, hit = self._lstat(path, saves=0)
+            if not isinstance(result, os.stat_result) or \
+               not stat.S_ISLNK(result.st_mode):
+                if hit:
+                    self._count(0, 1)
+                return isinstance(result, os.stat_result)
+
+        with self.lock:
+            try:
+                result = self.access_results[path][mode]
+                self.saved += 1
+                return result
+            except KeyError:
+                epoch = self.epoch
+
+        result = ConcreteFilesys.access(self, path, mode)
+        with self.lock:
+            self.syscalls += 1
+            if self.epoch == epoch:
+                self.access_results.setdefault(path, {})[mode] = result
+                self._register(path)
+                # access() follows symlinks, to files whose paths are
+                # unknown
+                st = self.stats.get(path)
+                if not isinstance(st, os.stat_result) or \
+                   stat.S_ISLNK(st.st_mode):
+                    self.indirect.add(path)
+        return result
+
+    def hash(self, path):
+        with self.lock:
+            try:
+                return self.hashes[path]
+            except KeyError:
+                epoch = self.epoch
+
+        result = ConcreteFilesys.hash(self, path)
+        with self.lock:
+            if self.epoch == epoch:
+                self.hashes[path] = result
+                self._register(path)
+        return result
+
+    def get_existing_ancestor(self, path):
+        path = os.path.abspath(path)
+        # as in ConcreteFilesys, links are followed
+        while not self.access(path, access_codes.F_OK):
+            path = os.path.dirname(path)
+        return path
+
+    def chmod(self, path, *args, **kwargs):
+        try:
+            return ConcreteFilesys.chmod(self, path, *args, **kwargs)
+        finally:
+            self._forget_modified(path)
+
+    def chown(self, path, uid, gid):
+        try:
+            return ConcreteFilesys.chown(self, path, uid, gid)
+        finally:
+            self._forget_modified(path)
+
+    def chmod_tree(self, path, mode):
+        try:
+            return ConcreteFilesys.chmod_tree(self, path, mode)
+        finally:
+            self.invalidate(path, subtree=True)
+
+    def chown_tree(self, path, uid, gid):
+        try:
+            return ConcreteFilesys.chown_tree(self, path, uid, gid)
+        finally:
+            self.invalidate(path, subtree=True)
+
+    def copy(self, src, dst):
+        is_dir = self.lookup_type(src) == self.element_types.DIR
+        try:
+            return ConcreteFilesys.copy(self, src, dst)
+        finally:
+            # a copied directory is created, along with everything in it
+            self._forget_created(dst)
+            if is_dir:
+                self.invalidate(dst, subtree=True)
+
+    def store_hashed(self, path, store_dir):
+        try:
+            return ConcreteFilesys.store_hashed(self, path, store_dir)
+        finally:
+            # the store only writes objects, packs and the directories
+            # holding them, all of which are inside of @store_dir
+            with self.lock:
+                self.epoch += 1
+                self._forget_indirect()
+                self._forget_beneath(store_dir)
+
+    def touch(self, path, *args, **kwargs):
+        try:
+            return ConcreteFilesys.touch(self, path, *args, **kwargs)
+        finally:
+            self._forget_created(path)
+
+    def symlink(self, path, target):
+        try:
+            return ConcreteFilesys.symlink(self, path, target)
+        finally:
+            self._forget_created(target)
+
+    def mkdir(self, path, recursive=True):
+        try:
+            return ConcreteFilesys.mkdir(self, path, recursive=recursive)
+        finally:
+            self._forget_created(path)
+
+    @contextmanager
+    def open(self, path, mode='r', *args, **kwargs):
+        try:
+            with ConcreteFilesys.open(self, path, mode, *args,
+                                      **kwargs) as f:
+                yield f
+        finally:
+            if mode.strip('rbtU') != '':
+                self._forget_created(path)
+
+    def report(self):
+        """
+        Describe the lookup syscalls saved, as a string for the log.
+        """
+        with self.lock:
+            total = self.syscalls + self.saved
+            return ('Filesys cache saved {0} of {1} lookup syscalls ' +
+                    '({2:.0f}%)').format(
+                self.saved, total,
+                100.0 * self.saved / total if total else 0.0)
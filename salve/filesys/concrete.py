@@ -2,12 +2,70 @@
 
 import os
 import shutil
+import stat
+import sys
 from contextlib import contextmanager
 
+try:
+    from os import scandir as _scandir
+except ImportError:  # pragma: no cover
+    # Python 2, with or without the scandir backport
+    try:
+        from scandir import scandir as _scandir
+    except ImportError:
+        _scandir = None
+
+from salve import ugo
 from salve.filesys.abstract import Filesys
+from salve.filesys.fastcopy import copy_file
+from salve.filesys.hashcache import context_hash_cache
+from salve.filesys.store import open_store
 from salve.util import hash_from_path
 
 
+def _supports_dir_fd():
+    """
+    Checks if directories can be scanned by file descriptor, and their
+    entries stat()ed, chmoded and chowned relative to it.
+    """
+    supports_fd = getattr(os, 'supports_fd', set())
+    supports_dir_fd = getattr(os, 'supports_dir_fd', set())
+    return (hasattr(os, 'scandir') and os.scandir in supports_fd and
+            all(f in supports_dir_fd
+                for f in (os.open, os.stat, os.chmod, os.chown)))
+
+
+_dir_fd_walk = _supports_dir_fd()
+
+# copytree only takes a function with which to copy files on Python 3
+_copytree_takes_copy_function = sys.version_info >= (3,)
+
+
+def _copy_with_stat(src, dst):
+    """
+    Copies a file within a tree as shutil.copy2, which copytree uses by
+    default, does, but with fastcopy.
+    """
+    copy_file(src, dst)
+    shutil.copystat(src, dst)
+
+
+class _ListdirEntry(object):
+    """
+    A stand-in for os.DirEntry where there is no scandir, which looks up the
+    entry's type with stat() calls instead.
+    """
+    def __init__(self, dirname, name):
+        self.name = name
+        self.path = os.path.join(dirname, name)
+
+    def is_dir(self):
+        return os.path.isdir(self.path)
+
+    def is_symlink(self):
+        return os.path.islink(self.path)
+
+
 class ConcreteFilesys(Filesys):
     def lookup_type(self, path):
         """
@@ -64,11 +122,22 @@ class ConcreteFilesys(Filesys):
     def hash(self, path):
         """
         Transparent implementation of hash() using
-        salve.util.hash_from_path
+        salve.util.hash_from_path, through the HashCache in the
+        ExecutionContext, if there is one
         """
         assert self.exists(path)
+        cache = context_hash_cache()
+        if cache is not None:
+            return cache.hash_from_path(path)
         return hash_from_path(path)
 
+    def store_hashed(self, path, store_dir):
+        """
+        Transparent implementation of store_hashed() using the BackupStore
+        for @store_dir, which shards, packs and compresses what it stores.
+        """
+        return open_store(store_dir).add_file(path)
+
     def copy(self, src, dst):
         """
         Copies the source to the destination on the underlying filesys. Does
@@ -82,17 +151,24 @@ class ConcreteFilesys(Filesys):
             @dst
             The destination path for the copy operation. The ancestors of this
             path must exist so that the file creation will not fail.
+
+        Returns the fastcopy strategy used to copy a file's contents, or
+        None if @src is not a file.
         """
         assert self.exists(src)
 
         src_ty = self.lookup_type(src)
         if src_ty == self.element_types.FILE:
-            shutil.copyfile(src, dst)
+            return copy_file(src, dst)
         # FIXME: copytree is kind of scary. Eventually would like to replace
         # this with a NotImplementedError in order to force explicit creates
         # and file copies
         elif src_ty == self.element_types.DIR:
-            shutil.copytree(src, dst, symlinks=True)
+            if _copytree_takes_copy_function:
+                shutil.copytree(src, dst, symlinks=True,
+                                copy_function=_copy_with_stat)
+            else:  # pragma: no cover
+                shutil.copytree(src, dst, symlinks=True)
         elif src_ty == self.element_types.LINK:
             os.symlink(os.readlink(src), dst)
         else:  # pragma: no cover
@@ -126,6 +202,124 @@ class ConcreteFilesys(Filesys):
         for x in os.walk(path, *args, **kwargs):
             yield x
 
+    def scandir(self, path):
+        """
+        Transparent implementation of scandir() using os.scandir, where it
+        is available
+        """
+        try:
+            if _scandir is None:  # pragma: no cover
+                entries = [_ListdirEntry(path, name)
+                           for name in os.listdir(path)]
+            else:
+                entries = _scandir(path)
+        except OSError:
+            # as in walk(), a missing or unreadable dir has no entries
+            return
+        try:
+            for entry in entries:
+                yield entry
+        finally:
+            # release the directory's file descriptor now, rather than
+            # whenever the iterator is collected
+            if hasattr(entries, 'close'):
+                entries.close()
+
+    def _tree_entries(self, path):
+        """
+        Walk the tree under @path, not following symlinks, yielding a
+        triple (dir_fd, name, lstat) for each entry. Where possible, each
+        directory is opened once and its entries are named relative to its
+        file descriptor, dir_fd, so that no full path is resolved again.
+        Otherwise, dir_fd is None and name is the full path.
+
+        Entries which vanish during the walk, and directories which cannot
+        be read, are passed over, as in walk().
+        """
+        if not _dir_fd_walk:  # pragma: no cover
+            for (d, subdirs, files) in os.walk(path):
+                for name in subdirs + files:
+                    full = os.path.join(d, name)
+                    try:
+                        yield None, full, os.lstat(full)
+                    except OSError:
+                        continue
+            return
+
+        flags = os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0)
+        try:
+            top = os.open(path, flags)
+        except OSError:
+            return
+        # the open directories, innermost last, with their entry iterators
+        stack = [(top, os.scandir(top))]
+        try:
+            while stack:
+                (dir_fd, entries) = stack[-1]
+                entry = next(entries, None)
+                if entry is None:
+                    entries.close()
+                    os.close(dir_fd)
+                    stack.pop()
+                    continue
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                yield dir_fd, entry.name, st
+                if stat.S_ISDIR(st.st_mode):
+                    try:
+                        sub_fd = os.open(entry.name,
+                                         flags | getattr(os, 'O_NOFOLLOW', 0),
+                                         dir_fd=dir_fd)
+                    except OSError:
+                        continue
+                    stack.append((sub_fd, os.scandir(sub_fd)))
+        finally:
+            for (dir_fd, entries) in stack:
+                entries.close()
+                os.close(dir_fd)
+
+    def chmod_tree(self, path, mode):
+        """
+        Implementation of chmod_tree() with one lstat() per entry, plus a
+        chmod() of each entry which needs one
+        """
+        root = ugo.is_root()
+        euid = os.geteuid()
+        changed = skipped = 0
+        for (dir_fd, name, st) in self._tree_entries(path):
+            # a symlink has no mode of its own, and the file it points to
+            # may be outside of the tree
+            if stat.S_ISLNK(st.st_mode) or \
+               stat.S_IMODE(st.st_mode) == mode or \
+               (not root and st.st_uid != euid):
+                skipped += 1
+                continue
+            if dir_fd is None:  # pragma: no cover
+                os.chmod(name, mode)
+            else:
+                os.chmod(name, mode, dir_fd=dir_fd)
+            changed += 1
+        return changed, skipped
+
+    def chown_tree(self, path, uid, gid):
+        """
+        Implementation of chown_tree() with one lstat() per entry, plus an
+        lchown() of each entry which needs one
+        """
+        changed = skipped = 0
+        for (dir_fd, name, st) in self._tree_entries(path):
+            if st.st_uid == uid and st.st_gid == gid:
+                skipped += 1
+                continue
+            if dir_fd is None:  # pragma: no cover
+                os.lchown(name, uid, gid)
+            else:
+                os.chown(name, uid, gid, dir_fd=dir_fd, follow_symlinks=False)
+            changed += 1
+        return changed, skipped
+
     def mkdir(self, path, recursive=True):
         """
         Use os.mkdir or os.makedirs to create the directory desired,
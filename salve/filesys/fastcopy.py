@@ -0,0 +1,112 @@
+import errno
+import os
+import shutil
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+from salve import Enum
+
+# the ways in which a file's contents may be copied, fastest first
+strategies = Enum('REFLINK', 'COPY_FILE_RANGE', 'SENDFILE', 'USERSPACE')
+
+# the FICLONE ioctl from linux/fs.h, which makes the destination share the
+# source's extents, on filesystems like btrfs and XFS
+_FICLONE = 0x40049409
+
+# the errnos which mean that a strategy cannot be used between two
+# filesystems, rather than that the copy failed
+_UNSUPPORTED = frozenset(getattr(errno, name) for name in
+                         ('ENOSYS', 'EXDEV', 'EINVAL', 'ENOTTY', 'EOPNOTSUPP',
+                          'ENOTSUP')
+                         if hasattr(errno, name))
+
+# the strategies which failed as unsupported, with the (st_dev, st_dev) of
+# the source and destination filesystems, so that they are not tried again
+# for every file between the same two filesystems
+_unsupported = set()
+
+# the largest number of bytes to ask the kernel to copy at once
+_CHUNK = 2 ** 30
+
+
+def _reflink(src_fd, dst_fd):
+    if fcntl is None:  # pragma: no cover
+        raise OSError(errno.ENOSYS, 'No fcntl')
+    fcntl.ioctl(dst_fd, _FICLONE, src_fd)
+
+
+def _copy_file_range(src_fd, dst_fd):
+    if not hasattr(os, 'copy_file_range'):  # pragma: no cover
+        raise OSError(errno.ENOSYS, 'No copy_file_range')
+    # copy_file_range advances the offsets of both files
+    while os.copy_file_range(src_fd, dst_fd, _CHUNK):
+        pass
+
+
+def _sendfile(src_fd, dst_fd):
+    if not hasattr(os, 'sendfile'):  # pragma: no cover
+        raise OSError(errno.ENOSYS, 'No sendfile')
+    offset = 0
+    while True:
+        sent = os.sendfile(dst_fd, src_fd, offset, _CHUNK)
+        if sent == 0:
+            return
+        offset += sent
+
+
+# the kernel strategies, in the order in which they are tried
+_kernel_copies = (
+    (strategies.REFLINK, _reflink),
+    (strategies.COPY_FILE_RANGE, _copy_file_range),
+    (strategies.SENDFILE, _sendfile),
+)
+
+
+def copy_file(src, dst):
+    """
+    Copies the contents of the regular file @src to @dst, which is created
+    or truncated, as shutil.copyfile does, but without passing the data
+    through userspace where possible.
+
+    A reflink is tried first, which copies no data at all, then
+    copy_file_range(), which may copy within the kernel or on the storage
+    itself, then sendfile(), and finally a plain read and write. A strategy
+    which is unsupported between two filesystems is not tried again between
+    them.
+
+    Returns the strategy which was used, one of fastcopy.strategies.
+
+    Args:
+        @src
+        The file to copy.
+        @dst
+        The path to copy it to.
+    """
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        raise shutil.Error('{0} and {1} are the same file'.format(src, dst))
+
+    with open(src, 'rb') as fsrc:
+        with open(dst, 'wb') as fdst:
+            devs = (os.fstat(fsrc.fileno()).st_dev,
+                    os.fstat(fdst.fileno()).st_dev)
+            for (strategy, kernel_copy) in _kernel_copies:
+                if (strategy, devs) in _unsupported:
+                    continue
+                try:
+                    kernel_copy(fsrc.fileno(), fdst.fileno())
+                    return strategy
+                # on Python 2, ioctl() raises an IOError, which is not an
+                # OSError there
+                except (IOError, OSError) as e:
+                    if e.errno not in _UNSUPPORTED:
+                        raise
+                    _unsupported.add((strategy, devs))
+                    # a failed strategy may still have copied some data
+                    fsrc.seek(0)
+                    fdst.seek(0)
+                    fdst.truncate()
+            shutil.copyfileobj(fsrc, fdst)
+            return strategies.USERSPACE
@@ -0,0 +1,206 @@
+import json
+import os
+import stat
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import salve
+from salve import util
+from salve.context import ExecutionContext
+
+# bump this whenever the layout of the cache file changes, so that files
+# written by other versions of SALVE are ignored rather than misread
+CACHE_FORMAT_VERSION = 1
+
+# the default for the hash_cache_size global, in entries
+DEFAULT_MAX_ENTRIES = 200000
+
+# a file changed less than this many seconds before it was hashed may
+# change again within the resolution of its timestamps, without changing
+# its key, so its hash is not stored
+RACY_SECONDS = 2
+
+
+def _ns(st, name):
+    """
+    Gets a timestamp of a stat result in integer nanoseconds, which is
+    only provided by Python 3.
+    """
+    try:
+        return getattr(st, name + '_ns')
+    except AttributeError:  # pragma: no cover
+        return int(getattr(st, name) * 10 ** 9)
+
+
+def context_hash_cache():
+    """
+    Get the HashCache in the ExecutionContext, or None if there is none.
+    """
+    ctx = ExecutionContext()
+    if 'hash_cache' in ctx:
+        return ctx['hash_cache']
+    return None
+
+
+class HashCache(object):
+    """
+    A persistent cache of the hashes of files, so that files which have
+    not changed since an earlier run are not read again to be hashed.
+
+    A hash is keyed on the device, inode, size, mtime and ctime of the
+    file, and the hash algorithm. Any write to a file changes its ctime,
+    which cannot be set back, so a file with the same key has the same
+    contents.
+
+    The cache is kept in memory during a run, and written out to a single
+    file by save(), which replaces the old one atomically, so a crash never
+    leaves a partial cache behind. It holds at most @max_entries hashes,
+    evicting the least recently used ones.
+    """
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES, load=True):
+        """
+        HashCache constructor.
+
+        Args:
+            @path
+            The file in which the cache is stored. It, and its directory,
+            are created when the cache is first saved.
+
+        KWArgs:
+            @max_entries
+            The maximum number of hashes to keep.
+            @load
+            When False, the stored hashes are ignored, and replaced with
+            the ones computed in this run when the cache is saved.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        # the digest for each key, least recently used first
+        self.entries = OrderedDict()
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+        if load:
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                stored = json.load(f)
+            if stored['version'] != CACHE_FORMAT_VERSION:
+                return
+            for record in stored['entries']:
+                self.entries[tuple(record[:-1])] = record[-1]
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            # a missing or corrupt cache is just an empty one
+            self.entries = OrderedDict()
+
+    def _key(self, st, algorithm):
+        return (st.st_dev, st.st_ino, st.st_size, _ns(st, 'st_mtime'),
+                _ns(st, 'st_ctime'), algorithm)
+
+    def lookup(self, st):
+        """
+        Get the stored hash name of a regular file, or None if there is
+        none for its current contents.
+
+        Args:
+            @st
+            The result of lstat() on the file.
+        """
+        key = self._key(st, util.configured_hash_algorithm())
+        with self.lock:
+            try:
+                digest = self.entries.pop(key)
+            except KeyError:
+                self.misses += 1
+                return None
+            # reinserting marks the entry as the most recently used
+            self.entries[key] = digest
+            self.hits += 1
+            return digest
+
+    def record(self, path, st, digest, start):
+        """
+        Store the hash name of a regular file, if the file did not change
+        while it was being hashed, and is not too new for its timestamps to
+        show a later change.
+
+        Args:
+            @path
+            The path to the file.
+            @st
+            The result of lstat() on the file, from before it was hashed.
+            @digest
+            The hash name of its contents.
+            @start
+            The time.time() at which hashing began.
+        """
+        key = self._key(st, util.configured_hash_algorithm())
+        if self._key(os.lstat(path), key[-1]) != key or \
+           st.st_ctime >= start - RACY_SECONDS:
+            return
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = digest
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self.dirty = True
+
+    def hash_from_path(self, path):
+        """
+        Get the name of the hash of a file, as util.hash_from_path does,
+        from the cache if the file has not changed since it was stored.
+
+        Args:
+            @path
+            The path to the file.
+        """
+        st = os.lstat(path)
+        # links are hashed by their contents, which costs no more than
+        # looking them up
+        if not stat.S_ISREG(st.st_mode):
+            return util.hash_from_path(path)
+
+        digest = self.lookup(st)
+        if digest is None:
+            start = time.time()
+            digest = util.hash_from_path(path)
+            self.record(path, st, digest, start)
+        return digest
+
+    def save(self):
+        """
+        Write the cache to its file, if it has changed, atomically
+        replacing the old one.
+        """
+        with self.lock:
+            if not self.dirty:
+                return
+            records = [list(key) + [digest]
+                       for (key, digest) in self.entries.items()]
+            self.dirty = False
+
+        cache_dir = os.path.dirname(self.path)
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+        # write to a temporary file and rename it into place, so that a
+        # crash or a concurrent run never leaves a partial cache behind
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'version': CACHE_FORMAT_VERSION,
+                           'entries': records}, f, separators=(',', ':'))
+                f.flush()
+                os.fsync(f.fileno())
+            os.rename(tmp_path, self.path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        salve.logger.debug('Saved {0} file hashes to \"{1}\"'.format(
+            len(records), self.path))
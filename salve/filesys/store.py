@@ -0,0 +1,567 @@
+import errno
+import hashlib
+import io
+import os
+import stat
+import threading
+import time
+import uuid
+import zlib
+
+try:
+    import lzma
+except ImportError:  # pragma: no cover
+    # Python 2 has no lzma, so only zlib compression is available
+    lzma = None
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    # without fcntl, a pack cannot be shared safely, so every run starts
+    # its own
+    fcntl = None
+
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:  # pragma: no cover
+    # without concurrent.futures (Python 2), backups are migrated serially
+    ThreadPoolExecutor = None
+
+from salve import util
+from salve.context import ExecutionContext
+from salve.filesys.hashcache import context_hash_cache
+
+# the suffix of stored objects for each compression
+SUFFIXES = {'none': '', 'zlib': '.z', 'lzma': '.xz'}
+
+# the default for the backup_pack_threshold global, in bytes: files smaller
+# than this are stored in pack files, rather than one file each
+DEFAULT_PACK_THRESHOLD = 16384
+
+# a pack file is closed, and a new one started, once it is this large
+PACK_MAX_SIZE = 2 ** 26
+
+# the directory, within the store, which holds the pack files
+PACKS_DIR = 'packs'
+
+# the packs which stores in this process are appending to, since fcntl
+# locks do not keep a process out of its own packs
+_held_packs = set()
+_held_packs_lock = threading.Lock()
+
+
+def compression_supported(compression):
+    """
+    Checks if @compression names a compression which backups can be
+    stored with, on this Python.
+    """
+    if compression == 'lzma':
+        return lzma is not None
+    return compression in SUFFIXES
+
+
+def _compressor(compression):
+    if compression == 'zlib':
+        return zlib.compressobj()
+    return lzma.LZMACompressor()
+
+
+def _decompressor(compression):
+    if compression == 'zlib':
+        return zlib.decompressobj()
+    return lzma.LZMADecompressor()
+
+
+def _compress(compression, data):
+    if compression == 'none':
+        return data
+    c = _compressor(compression)
+    return c.compress(data) + c.flush()
+
+
+def _decompress(compression, data):
+    if compression == 'none':
+        return data
+    d = _decompressor(compression)
+    result = d.decompress(data)
+    if hasattr(d, 'flush'):
+        result += d.flush()
+    return result
+
+
+class _CompressedWriter(object):
+    """
+    A file object which compresses everything written to it into another
+    one, so that a file can be hashed and compressed in a single pass.
+    """
+    def __init__(self, f, compression):
+        self.f = f
+        self.compressor = _compressor(compression)
+
+    def write(self, data):
+        # hash_copy() writes memoryviews, which Python 2's compressors do
+        # not accept
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        self.f.write(self.compressor.compress(data))
+
+    def finish(self):
+        self.f.write(self.compressor.flush())
+
+
+def _makedirs(path):
+    try:
+        os.makedirs(path)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+
+
+class BackupStore(object):
+    """
+    The store of backed up files, in the files directory of backup_dir.
+    Every object is named by the hash of its contents, as hash_from_path
+    names it, so each distinct content is stored only once.
+
+    Objects are kept in fan-out directories named by the first two
+    characters of their digests, so that no single directory grows to
+    millions of entries. They may be compressed with zlib or LZMA, in which
+    case their names have a .z or .xz suffix. Files smaller than
+    @pack_threshold are appended to pack files in the packs directory
+    instead, each with an index of the objects in it, one per line:
+
+        <name> <offset> <length> <compression>
+
+    A run appends to a pack which is not yet full, rather than starting a
+    new one, so the number of packs grows with the packed data, not with
+    the number of runs. It holds an fcntl lock on the pack while it
+    appends, so concurrent runs never write to the same one. An index line
+    is only written after its object, so a crash leaves at worst an
+    incomplete last line, which is ignored, and removed before the pack is
+    appended to again.
+
+    Objects stored flat in the files directory, as by earlier versions of
+    SALVE, are still found, and migrate() moves them into this layout.
+    """
+    def __init__(self, root, compression='none',
+                 pack_threshold=DEFAULT_PACK_THRESHOLD):
+        """
+        BackupStore constructor.
+
+        Args:
+            @root
+            The files directory of backup_dir.
+
+        KWArgs:
+            @compression
+            The compression of newly stored objects: none, zlib or lzma.
+            @pack_threshold
+            The size in bytes below which files are stored in packs. 0
+            stores every file in a file of its own.
+        """
+        self.root = root
+        self.compression = compression
+        self.pack_threshold = pack_threshold
+        self.lock = threading.Lock()
+        # the location of every packed object, (pack path, offset, length,
+        # compression), keyed on its name, loaded when first needed
+        self.packed = None
+        # the pack and index to which this run appends, and the pack's size
+        self.pack = None
+        self.index = None
+        self.pack_size = 0
+
+    def _shard_path(self, name, suffix=''):
+        # hash names made by other algorithms than the default are prefixed
+        # with the algorithm, which would put them all in one shard
+        digest = name.rsplit('-', 1)[-1]
+        return os.path.join(self.root, digest[:2], name + suffix)
+
+    def _load_packs(self):
+        packed = {}
+        packs_dir = os.path.join(self.root, PACKS_DIR)
+        try:
+            names = os.listdir(packs_dir)
+        except OSError:
+            names = []
+        for idx_name in names:
+            if not idx_name.endswith('.idx'):
+                continue
+            pack_path = os.path.join(packs_dir, idx_name[:-4] + '.pack')
+            try:
+                pack_size = os.path.getsize(pack_path)
+                with open(os.path.join(packs_dir, idx_name)) as f:
+                    lines = f.readlines()
+            except (IOError, OSError):
+                continue
+            for line in lines:
+                fields = line.split()
+                # an incomplete line, or one for an object which is not
+                # all in the pack, was cut short by a crash
+                if not line.endswith('\n') or len(fields) != 4:
+                    continue
+                (name, offset, length, compression) = fields
+                offset, length = int(offset), int(length)
+                if offset + length <= pack_size:
+                    packed[name] = (pack_path, offset, length, compression)
+        return packed
+
+    def _packed(self):
+        with self.lock:
+            if self.packed is None:
+                self.packed = self._load_packs()
+            return self.packed
+
+    def _locate(self, name, flat=True):
+        """
+        Find an object, as ('pack', (path, offset, length, compression)),
+        or ('file', (path, compression)), or None if it is not stored.
+        Objects stored flat are only found if @flat is True.
+        """
+        packed = self._packed()
+        if name in packed:
+            return ('pack', packed[name])
+        for (compression, suffix) in SUFFIXES.items():
+            path = self._shard_path(name, suffix)
+            if os.path.lexists(path):
+                return ('file', (path, compression))
+        # an object stored flat, before there were shards
+        path = os.path.join(self.root, name)
+        if flat and os.path.lexists(path):
+            return ('file', (path, 'none'))
+        return None
+
+    def contains(self, name):
+        """
+        Checks if the object @name is stored, in any layout.
+        """
+        return self._locate(name) is not None
+
+    def names(self):
+        """
+        Get the set of the names of all stored objects.
+        """
+        names = set(self._packed())
+        for entry in os.listdir(self.root):
+            path = os.path.join(self.root, entry)
+            if entry.startswith('.') or entry == PACKS_DIR:
+                continue
+            if os.path.isdir(path) and not os.path.islink(path):
+                for obj in os.listdir(path):
+                    if not obj.startswith('.'):
+                        for suffix in SUFFIXES.values():
+                            if suffix and obj.endswith(suffix):
+                                obj = obj[:-len(suffix)]
+                        names.add(obj)
+            else:
+                names.add(entry)
+        return names
+
+    def _append_to_pack(self, name, data, compression):
+        with self.lock:
+            if self.packed is None:
+                self.packed = self._load_packs()
+            if name in self.packed:
+                return
+            if self.pack is None or self.pack_size >= PACK_MAX_SIZE:
+                self._start_pack()
+            offset = self.pack_size
+            # the object is written before its index line, so that the
+            # index never refers to data which is not there
+            self.pack.write(data)
+            self.pack.flush()
+            self.index.write('{0} {1} {2} {3}\n'.format(
+                name, offset, len(data), compression))
+            self.index.flush()
+            self.pack_size += len(data)
+            self.packed[name] = (self.pack.name, offset, len(data),
+                                 compression)
+
+    def _open_pack(self, base):
+        """
+        Opens the pack @base, with its index, to append to it, unless it is
+        full, or another store is appending to it. Returns True if it was
+        opened.
+        """
+        pack_path = base + '.pack'
+        if os.path.exists(pack_path) and \
+           os.path.getsize(pack_path) >= PACK_MAX_SIZE:
+            return False
+        with _held_packs_lock:
+            if pack_path in _held_packs:
+                return False
+            pack = open(pack_path, 'ab')
+            if fcntl is not None:
+                try:
+                    fcntl.lockf(pack.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except (IOError, OSError):
+                    pack.close()
+                    return False
+            _held_packs.add(pack_path)
+
+        idx_path = base + '.idx'
+        with open(idx_path, 'ab+') as f:
+            # an incomplete last line, left by a crash, would run into the
+            # next one written
+            f.seek(0)
+            lines = f.read()
+            if lines and not lines.endswith(b'\n'):
+                f.truncate(lines.rfind(b'\n') + 1)
+        self.pack = pack
+        self.index = open(idx_path, 'a')
+        self.pack_size = os.fstat(pack.fileno()).st_size
+        return True
+
+    def _start_pack(self):
+        self._close_pack()
+        packs_dir = os.path.join(self.root, PACKS_DIR)
+        _makedirs(packs_dir)
+        if fcntl is not None:
+            for entry in sorted(os.listdir(packs_dir)):
+                if entry.endswith('.pack') and \
+                   self._open_pack(os.path.join(packs_dir, entry[:-5])):
+                    return
+        self._open_pack(os.path.join(packs_dir,
+                                     'pack-' + uuid.uuid4().hex))
+
+    def _close_pack(self):
+        for f in (self.pack, self.index):
+            if f is not None:
+                f.flush()
+                os.fsync(f.fileno())
+        if self.pack is not None:
+            with _held_packs_lock:
+                _held_packs.discard(self.pack.name)
+        # closing the pack releases the lock on it
+        for f in (self.pack, self.index):
+            if f is not None:
+                f.close()
+        self.pack = self.index = None
+
+    def _store_stream(self, name, src, algorithm=None):
+        """
+        Stores the contents of the binary file object @src, with the
+        store's compression, under @name, or under the name of its hash if
+        @algorithm is given. Returns the name.
+        """
+        # created by name rather than with mkstemp, so that the stored file
+        # gets the same umask-based mode that a plain copy would
+        tmp_path = os.path.join(self.root,
+                                '.{0}.tmp'.format(uuid.uuid4().hex))
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL,
+                         0o666)
+            with io.open(fd, 'wb') as fdst:
+                dst = fdst
+                if self.compression != 'none':
+                    dst = _CompressedWriter(fdst, self.compression)
+                if algorithm is None:
+                    util.hash_copy(src, dst)
+                else:
+                    name = util.hash_name(algorithm,
+                                          util.hash_copy(src, dst, algorithm))
+                if self.compression != 'none':
+                    dst.finish()
+            # an object being migrated is still stored flat, so only the
+            # new layout is checked for it
+            if self._locate(name, flat=algorithm is not None) is None:
+                path = self._shard_path(name, SUFFIXES[self.compression])
+                _makedirs(os.path.dirname(path))
+                os.rename(tmp_path, path)
+        finally:
+            if os.path.lexists(tmp_path):
+                os.remove(tmp_path)
+        return name
+
+    def _store_link(self, name, path):
+        target = os.readlink(path)
+        dst = self._shard_path(name)
+        _makedirs(os.path.dirname(dst))
+        try:
+            os.symlink(target, dst)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+    def add_file(self, path):
+        """
+        Stores the file or link at @path, unless its contents are already
+        stored, reading it only once, and returns the name of its hash.
+
+        A file whose hash is in the HashCache, and already stored, is not
+        read at all.
+
+        Args:
+            @path
+            The path to the file.
+        """
+        cache = context_hash_cache()
+        st = os.lstat(path)
+        if not stat.S_ISREG(st.st_mode):
+            name = util.hash_from_path(path)
+            if not self.contains(name):
+                self._store_link(name, path)
+            return name
+
+        if cache is not None:
+            name = cache.lookup(st)
+            if name is not None and self.contains(name):
+                return name
+
+        algorithm = util.configured_hash_algorithm()
+        start = time.time()
+        with io.open(path, 'rb', buffering=0) as f:
+            if st.st_size < self.pack_threshold:
+                data = f.read()
+                name = util.hash_name(
+                    algorithm, hashlib.new(algorithm, data).hexdigest())
+                if not self.contains(name):
+                    self._append_to_pack(
+                        name, _compress(self.compression, data),
+                        self.compression)
+            else:
+                name = self._store_stream(None, f, algorithm)
+
+        if cache is not None:
+            cache.record(path, st, name, start)
+        return name
+
+    def restore(self, name, dst):
+        """
+        Writes the stored object @name to the path @dst, decompressing it,
+        or recreates it there if it is a link.
+
+        Raises a KeyError if the object is not stored.
+
+        Args:
+            @name
+            The name of the object.
+            @dst
+            The path to write it to.
+        """
+        location = self._locate(name)
+        if location is None:
+            raise KeyError(name)
+        (kind, where) = location
+        if kind == 'pack':
+            (pack_path, offset, length, compression) = where
+            with open(pack_path, 'rb') as f:
+                f.seek(offset)
+                data = f.read(length)
+            with open(dst, 'wb') as f:
+                f.write(_decompress(compression, data))
+            return
+
+        (path, compression) = where
+        if os.path.islink(path):
+            os.symlink(os.readlink(path), dst)
+            return
+        with open(path, 'rb') as fsrc:
+            with open(dst, 'wb') as fdst:
+                d = None
+                if compression != 'none':
+                    d = _decompressor(compression)
+                while True:
+                    chunk = fsrc.read(util.HASH_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    fdst.write(d.decompress(chunk) if d else chunk)
+                if d is not None and hasattr(d, 'flush'):
+                    fdst.write(d.flush())
+
+    def _migrate_one(self, name):
+        path = os.path.join(self.root, name)
+        st = os.lstat(path)
+        if stat.S_ISLNK(st.st_mode) or (self.compression == 'none' and
+                                        st.st_size >= self.pack_threshold):
+            # moved as it is, which needs no copy
+            dst = self._shard_path(name)
+            _makedirs(os.path.dirname(dst))
+            os.rename(path, dst)
+            return
+        with io.open(path, 'rb', buffering=0) as f:
+            if st.st_size < self.pack_threshold:
+                self._append_to_pack(
+                    name, _compress(self.compression, f.read()),
+                    self.compression)
+            else:
+                self._store_stream(name, f)
+        os.remove(path)
+
+    def migrate(self, jobs=1):
+        """
+        Moves the objects stored flat in the files directory, by earlier
+        versions of SALVE, into shards and packs, compressing them as new
+        objects are compressed. Returns the number of objects moved.
+
+        Objects are not rehashed, since they are named by their hashes
+        already.
+
+        KWArgs:
+            @jobs
+            The number of objects to move at the same time.
+        """
+        self._packed()
+        flat = [entry for entry in os.listdir(self.root)
+                if not entry.startswith('.') and
+                (os.path.islink(os.path.join(self.root, entry)) or
+                 not os.path.isdir(os.path.join(self.root, entry)))]
+        if ThreadPoolExecutor is not None and jobs > 1:
+            # compression runs outside of the GIL, so objects are
+            # compressed in parallel
+            pool = ThreadPoolExecutor(max_workers=jobs)
+            try:
+                list(pool.map(self._migrate_one, flat))
+            finally:
+                pool.shutdown(wait=True)
+        else:
+            for name in flat:
+                self._migrate_one(name)
+        return len(flat)
+
+    def close(self):
+        """
+        Finish writing the pack to which this store was appending.
+        """
+        with self.lock:
+            self._close_pack()
+
+
+# the open BackupStores, keyed on their roots, so that every backup in a
+# run appends to the same packs
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def open_store(root):
+    """
+    Get the BackupStore for the files directory @root, with the compression
+    and pack threshold of the backup_compression and backup_pack_threshold
+    globals.
+    """
+    with _stores_lock:
+        try:
+            return _stores[root]
+        except KeyError:
+            pass
+        ctx = ExecutionContext()
+        compression = 'none'
+        if 'backup_compression' in ctx:
+            compression = ctx['backup_compression']
+        pack_threshold = DEFAULT_PACK_THRESHOLD
+        if 'backup_pack_threshold' in ctx:
+            pack_threshold = int(ctx['backup_pack_threshold'])
+        store = BackupStore(root, compression=compression,
+                            pack_threshold=pack_threshold)
+        _stores[root] = store
+        return store
+
+
+def close_stores():
+    """
+    Close all open BackupStores, finishing their packs.
+    """
+    with _stores_lock:
+        for store in _stores.values():
+            store.close()
+        _stores.clear()
@@ -0,0 +1,281 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import salve
+from salve import paths
+from salve.context import ExecutionContext, FileContextFactory
+
+from .parse import parse_stream, blocks_to_records, blocks_from_records
+
+# bump this whenever the layout of cache entries changes, so that entries
+# written by other versions of SALVE are ignored rather than misread
+CACHE_FORMAT_VERSION = 1
+
+# the default for the parse_cache_size global, in bytes
+DEFAULT_MAX_SIZE = 64 * 2 ** 20
+
+
+def _parse_processes():
+    """
+    Gets the number of processes with which to parse large manifests, from
+    the parse_processes global.
+    """
+    ctx = ExecutionContext()
+    if 'parse_processes' in ctx:
+        return int(ctx['parse_processes'])
+    return 1
+
+
+def _file_digest(filename):
+    """
+    Computes the sha256 hash of the raw contents of a file.
+
+    Args:
+        @filename
+        The path to the file to hash.
+    """
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        while True:
+            chunk = f.read(2 ** 20)
+            if not chunk:
+                return digest.hexdigest()
+            digest.update(chunk)
+
+
+class ParseCache(object):
+    """
+    A persistent cache of parsed manifests.
+
+    The blocks produced by parsing a manifest are stored on disk in a
+    directory of JSON files, one per manifest version. An entry is keyed on
+    the manifest's absolute path, size, mtime, and the hash of its contents,
+    so that any change to the manifest invalidates it. Loading an entry
+    builds fresh blocks, exactly as the parser would have, without
+    tokenizing the manifest.
+    """
+    def __init__(self, cache_dir, max_size=DEFAULT_MAX_SIZE):
+        """
+        ParseCache constructor.
+
+        Args:
+            @cache_dir
+            The directory in which cache entries are stored. It is created
+            when the first entry is written.
+
+        KWArgs:
+            @max_size
+            The maximum total size, in bytes, of all cache entries. When an
+            entry is written which exceeds this, the least recently used
+            entries are evicted.
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        # the total size of the entries, counted when the first entry is
+        # written, and kept up to date as more are, so that the cache is
+        # only scanned again when it may need to be evicted from
+        self.total = None
+        self.hits = 0
+        self.misses = 0
+
+    def _identity(self, filename):
+        """
+        Gets the identity of the current version of a manifest, as a dict.
+
+        Args:
+            @filename
+            The path to the manifest.
+        """
+        st = os.stat(filename)
+        return {'path': os.path.abspath(filename),
+                'size': st.st_size,
+                'mtime': repr(st.st_mtime),
+                'digest': _file_digest(filename)}
+
+    def _entry_path(self, identity):
+        """
+        Gets the path of the cache entry for a manifest identity.
+
+        Args:
+            @identity
+            A manifest identity, as produced by _identity()
+        """
+        key = hashlib.sha256('\0'.join(
+            [identity['path'], str(identity['size']), identity['mtime'],
+             identity['digest']]).encode('utf-8')).hexdigest()
+        return paths.pjoin(self.cache_dir, key + '.json')
+
+    def _load(self, identity):
+        """
+        Loads the blocks for a manifest identity from the cache, returning
+        None if there is no valid entry for it.
+
+        Args:
+            @identity
+            A manifest identity, as produced by _identity()
+        """
+        entry_path = self._entry_path(identity)
+        try:
+            with open(entry_path) as f:
+                entry = json.load(f)
+            if (entry['version'] != CACHE_FORMAT_VERSION or
+                    entry['salve_version'] != salve.__version__):
+                return None
+            for key in identity:
+                if entry[key] != identity[key]:
+                    return None
+
+            file_contexts = FileContextFactory(
+                paths.clean_path(identity['path'], absolute=True))
+            # JSON may give back unicode strings, where the parser uses str
+            records = [(ident, lineno,
+                        dict((str(k), str(attrs[k])) for k in attrs))
+                       for (ident, lineno, attrs) in entry['blocks']]
+            blocks = blocks_from_records(file_contexts, records)
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            # missing, unreadable, and corrupt entries are all just misses
+            return None
+
+        # mark the entry as recently used, for the sake of eviction
+        try:
+            os.utime(entry_path, None)
+        except OSError:  # pragma: no cover
+            pass
+
+        return blocks
+
+    def _store(self, identity, blocks):
+        """
+        Writes the blocks of a manifest to the cache, atomically replacing
+        any existing entry.
+
+        Args:
+            @identity
+            A manifest identity, as produced by _identity()
+            @blocks
+            The blocks produced by parsing the manifest.
+        """
+        entry = dict(identity)
+        entry['version'] = CACHE_FORMAT_VERSION
+        entry['salve_version'] = salve.__version__
+        entry['blocks'] = blocks_to_records(blocks)
+
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        if self.total is None:
+            self.total = self._scan()[1]
+
+        entry_path = self._entry_path(identity)
+        try:
+            replaced = os.stat(entry_path).st_size
+        except OSError:
+            replaced = 0
+
+        # write to a temporary file and rename it into place, so that a
+        # crash or a concurrent run never leaves a partial entry behind
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entry, f)
+                f.flush()
+                size = os.fstat(f.fileno()).st_size
+            os.rename(tmp_path, entry_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        self.total += size - replaced
+        if self.total > self.max_size:
+            self._evict()
+
+    def _scan(self):
+        """
+        List the entries in the cache, as (mtime, size, path) triples, along
+        with their total size.
+        """
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            path = paths.pjoin(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:  # pragma: no cover
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        return entries, total
+
+    def _evict(self):
+        """
+        Remove the least recently used entries until the cache is no larger
+        than its maximum size.
+        """
+        # other runs may have added or evicted entries, so the cache is
+        # counted again, rather than trusting the running total
+        entries, total = self._scan()
+        entries.sort()
+        for (mtime, size, path) in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:  # pragma: no cover
+                pass
+            total -= size
+        self.total = total
+
+    def parse_file(self, filename):
+        """
+        Parse a manifest file into blocks, using the cached blocks if the
+        file has not changed since they were stored.
+
+        Args:
+            @filename
+            The path to the manifest.
+        """
+        identity = self._identity(filename)
+        blocks = self._load(identity)
+        if blocks is not None:
+            self.hits += 1
+            salve.logger.debug('Parse cache hit for \"%s\"' % filename)
+            return blocks
+
+        self.misses += 1
+        salve.logger.debug('Parse cache miss for \"%s\"' % filename)
+        with open(filename) as man:
+            blocks = parse_stream(man, processes=_parse_processes())
+
+        # only store the result if the file did not change while it was
+        # being parsed, which its size and mtime show without reading it
+        # again
+        try:
+            st = os.stat(filename)
+            if st.st_size == identity['size'] and \
+               repr(st.st_mtime) == identity['mtime']:
+                self._store(identity, blocks)
+        except (IOError, OSError) as e:
+            salve.logger.warn('Could not write parse cache entry for ' +
+                              '\"%s\": %s' % (filename, e))
+
+        return blocks
+
+
+def parse_manifest(filename):
+    """
+    Parse the manifest at @filename into a list of blocks, going through the
+    ParseCache stored in the ExecutionContext if there is one.
+
+    Args:
+        @filename
+        The path to the manifest.
+    """
+    ctx = ExecutionContext()
+    if 'parse_cache' in ctx and ctx['parse_cache'] is not None:
+        return ctx['parse_cache'].parse_file(filename)
+
+    with open(filename) as man:
+        return parse_stream(man, processes=_parse_processes())
@@ -0,0 +1,343 @@
+import collections
+import itertools
+import multiprocessing
+import os
+import re
+
+try:
+    from concurrent.futures import ProcessPoolExecutor
+except ImportError:  # pragma: no cover
+    # without concurrent.futures (Python 2), manifests are parsed serially
+    ProcessPoolExecutor = None
+
+import salve
+from salve import paths
+from salve.context import FileContextFactory
+from salve.exceptions import ParsingException, TokenizationException
+from salve.util import stream_filename
+
+from .parse import Parser, generate_blocks_from_stream, \
+    blocks_to_records, blocks_from_records
+from .tokenize import Tokenizer
+
+# handle Py2 vs. Py3 StringIO change
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+# manifests smaller than this, in bytes, are parsed serially, since starting
+# the worker processes costs more than they save
+# see benchmarks/parallel_parse_bench.py for the measurements behind this
+MIN_PARALLEL_SIZE = 4 * 2 ** 20
+
+# the approximate size, in characters, of the pieces of a manifest which are
+# handed to each worker
+SEGMENT_SIZE = 2 ** 20
+
+# the characters which the pre-scan has to look at: braces, and anything
+# which could hide a brace from the tokenizer
+_event_re = re.compile(r'[{}#"\'\\]')
+_dquote_re = re.compile(r'"((?:[^"\\]|\\.)*)"', re.DOTALL)
+_squote_re = re.compile(r"'([^']*)'")
+
+
+def find_boundary(text, pos=0, depth=0):
+    """
+    Pre-scan @text for top-level block boundaries, i.e. the ends of blocks
+    which are closed with a '}'. A manifest can be cut at any of these
+    points, and each piece tokenized and parsed independently, because the
+    tokenizer and parser are always back in their initial states there.
+
+    This only looks at braces, quotes, escapes, and comments, so it is much
+    faster than tokenizing.
+
+    Returns a tuple (boundary, safe, pos, depth). @boundary is the offset
+    just after the last boundary in @text, or 0 if there is none. @safe is
+    False if the pre-scan found something which it cannot follow reliably
+    (a quoted or escaped brace, which the tokenizer may treat as a real one,
+    or unbalanced braces), in which case there are no boundaries after
+    @boundary. @pos and @depth are where the scan stopped, and the brace
+    depth there, so that it can be resumed once more text is appended.
+
+    Args:
+        @text
+        The text to scan. It should start at a boundary, or at the
+        start of a manifest.
+
+    KWArgs:
+        @pos=0
+        @depth=0
+        The position and brace depth at which to resume scanning, as
+        returned by an earlier call.
+    """
+    search = _event_re.search
+    end = len(text)
+    boundary = 0
+    while True:
+        m = search(text, pos)
+        if m is None:
+            return boundary, True, end, depth
+        char = m.group()
+        start = m.start()
+        if char == '{':
+            depth += 1
+            if depth > 1:
+                return boundary, False, start, depth
+            pos = start + 1
+        elif char == '}':
+            depth -= 1
+            if depth < 0:
+                return boundary, False, start, depth
+            pos = start + 1
+            if depth == 0:
+                boundary = pos
+        elif char == '#':
+            pos = text.find('\n', start)
+            # the comment may continue past the end of @text
+            if pos == -1:
+                return boundary, True, start, depth
+        elif char == '\\':
+            if start + 1 == end:
+                return boundary, True, start, depth
+            if text[start + 1] in '{}':
+                return boundary, False, start, depth
+            pos = start + 2
+        else:
+            quoted = (_dquote_re if char == '"' else _squote_re).match(
+                text, start)
+            # the quote may be closed past the end of @text
+            if quoted is None:
+                return boundary, True, start, depth
+            # a word which unquotes to exactly '{' or '}' is taken as a brace
+            # by the tokenizer, and it must contain a quoted string which is
+            # exactly that brace
+            if quoted.group(1) in ('{', '}'):
+                return boundary, False, start, depth
+            pos = quoted.end()
+
+
+def split_stream(stream, segment_size=SEGMENT_SIZE):
+    """
+    Split a stream into pieces which end at top-level block boundaries, as
+    found by find_boundary().
+
+    Yields (text, lineno) tuples, where @lineno is the line on which @text
+    starts.
+
+    Args:
+        @stream
+        Any file-like object that supports read().
+
+    KWArgs:
+        @segment_size=SEGMENT_SIZE
+        The number of characters to read at a time. Pieces are about this
+        long, unless a single block is longer.
+    """
+    buf = ''
+    lineno = 1
+    safe = True
+    pos = 0
+    depth = 0
+    while True:
+        # once the pre-scan is no longer safe, the rest goes in one piece
+        chunk = stream.read(segment_size if safe else -1)
+        if not chunk:
+            break
+        buf += chunk
+        if not safe:
+            continue
+
+        boundary, safe, pos, depth = find_boundary(buf, pos, depth)
+        if boundary:
+            text = buf[:boundary]
+            buf = buf[boundary:]
+            pos -= boundary
+            yield text, lineno
+            lineno += text.count('\n')
+
+    if buf:
+        yield buf, lineno
+
+
+def _parse_text(filename, text, lineno):
+    """
+    Tokenize and parse a piece of a manifest. This runs in the worker
+    processes, so the result is a picklable tuple, (records, error). When
+    parsing succeeds, @records is the result of blocks_to_records(), and
+    @error is None. Otherwise, @error is (is_tokenization_error, message,
+    lineno) describing the exception, where @lineno is that of its
+    FileContext.
+
+    Args:
+        @filename
+        The (absolute) path of the manifest.
+        @text
+        The text of the piece to parse.
+        @lineno
+        The line on which @text starts.
+    """
+    tokens = Tokenizer(filename).generate(StringIO(text), lineno=lineno)
+    try:
+        try:
+            return blocks_to_records(Parser().generate(tokens)), None
+        except TokenizationException:
+            raise
+        except ParsingException:
+            # errors in the token stream take precedence over parsing
+            # errors, as in generate_blocks_from_stream()
+            for token in tokens:
+                pass
+            raise
+    except ParsingException as e:
+        return None, (isinstance(e, TokenizationException), e.message,
+                      e.file_context.lineno)
+
+
+def _stream_size(stream):
+    """
+    Gets the size in bytes of the file underlying @stream, or None if it
+    does not have one.
+
+    Args:
+        @stream
+        A file-like object.
+    """
+    try:
+        return os.fstat(stream.fileno()).st_size
+    except Exception:
+        return None
+
+
+def _init_worker(log_level):
+    """
+    Sets up a worker process to log at the same level as its parent.
+
+    Args:
+        @log_level
+        The level of salve.logger in the parent.
+    """
+    salve.logger.setLevel(log_level)
+
+
+def _make_pool(processes):
+    """
+    Start a pool of @processes worker processes.
+
+    Manifests may be parsed in several threads at once (see ManifestBlock),
+    and forking a multithreaded process is unsafe, so the workers are
+    started from a fork server where that is available.
+
+    Args:
+        @processes
+        The number of worker processes.
+    """
+    try:
+        mp_context = multiprocessing.get_context('forkserver')
+        return ProcessPoolExecutor(max_workers=processes,
+                                   mp_context=mp_context,
+                                   initializer=_init_worker,
+                                   initargs=(salve.logger.level,))
+    except (AttributeError, ValueError, TypeError):  # pragma: no cover
+        # older Pythons, and platforms without fork servers, where the
+        # workers are forked and so inherit the logger as it is
+        return ProcessPoolExecutor(max_workers=processes)
+
+
+def _pool_results(pool, processes, filename, pieces):
+    """
+    Parse @pieces in @pool, yielding the results of _parse_text() in order.
+    Only a bounded number of pieces are in flight at once, so that a huge
+    manifest is never held in memory all at once.
+
+    Args:
+        @pool
+        The executor in which to parse.
+        @processes
+        The number of processes in @pool.
+        @filename
+        The (absolute) path of the manifest.
+        @pieces
+        An iterator of (text, lineno) pieces, as from split_stream().
+    """
+    pending = collections.deque()
+    for (text, lineno) in pieces:
+        pending.append(pool.submit(_parse_text, filename, text, lineno))
+        if len(pending) >= 2 * processes:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def generate_blocks_parallel(stream, processes,
+                             min_size=MIN_PARALLEL_SIZE,
+                             segment_size=SEGMENT_SIZE):
+    """
+    Lazily parse a stream into blocks, using a pool of worker processes.
+
+    The stream is split at top-level block boundaries, and the pieces are
+    tokenized and parsed in the workers. The blocks are yielded in order,
+    with the same line numbers and errors as generate_blocks_from_stream().
+    Small inputs, and all inputs on platforms without process pools, are
+    parsed serially.
+
+    Args:
+        @stream
+        Any file-like object that supports read().
+        @processes
+        The number of worker processes to use.
+
+    KWArgs:
+        @min_size=MIN_PARALLEL_SIZE
+        The size in bytes below which a file is parsed serially.
+        @segment_size=SEGMENT_SIZE
+        The approximate size of the pieces handed to workers.
+    """
+    size = _stream_size(stream)
+    if (ProcessPoolExecutor is None or processes <= 1 or
+            (size is not None and size < min_size)):
+        for block in generate_blocks_from_stream(stream):
+            yield block
+        return
+
+    filename = paths.clean_path(stream_filename(stream), absolute=True)
+    file_contexts = FileContextFactory(filename)
+
+    pieces = split_stream(stream, segment_size=segment_size)
+    first_pieces = list(itertools.islice(pieces, 2))
+
+    pool = None
+    if len(first_pieces) < 2:
+        # there is nothing to split, so there is nothing to be gained from
+        # the workers
+        results = (_parse_text(filename, text, lineno)
+                   for (text, lineno) in first_pieces)
+    else:
+        salve.logger.info('Beginning Parallel Parse of \"%s\" ' % filename +
+                          'with %d processes' % processes)
+        pool = _make_pool(processes)
+        results = _pool_results(pool, processes, filename,
+                                itertools.chain(first_pieces, pieces))
+
+    try:
+        parsing_error = None
+        for (records, error) in results:
+            if error is not None:
+                is_tokenization_error, message, lineno = error
+                if is_tokenization_error:
+                    raise TokenizationException(message,
+                                                file_contexts(lineno))
+                # as in the serial parse, a later tokenization error takes
+                # precedence, so keep going to look for one
+                if parsing_error is None:
+                    parsing_error = ParsingException(message,
+                                                     file_contexts(lineno))
+            elif parsing_error is None:
+                for block in blocks_from_records(file_contexts, records):
+                    yield block
+
+        if parsing_error is not None:
+            raise parsing_error
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True)
@@ -1,194 +1,303 @@
 import salve
 
+from salve import Enum
 from salve.context import ExecutionContext
-from salve.exceptions import ParsingException, BlockException
+from salve.exceptions import ParsingException, TokenizationException, \
+    BlockException
 from salve.block import identifier
-from salve.parser.tokenize import Token, tokenize_stream
-
-
-def check_for_unexpected_token(token):
-    """
-    Checks the current token to see if it matches the currently expected types.
-    If it doesn't, raise a ParsingException with a nicely formatted message.
-
-    Args:
-        @token
-        The token to check against expected types
+from salve.parser.tokenize import Token, generate_tokens
+
+
+"""
+State definitions
+    FREE: Waiting for a block identifier or the end of the tokens
+
+    IDENTIFIER_FOUND: Got a block identifier, waiting for a { or primary
+    attr
+
+    PRIMARY_ATTR_FOUND: Got a primary attr, waiting for a { or the next
+    block identifier
+
+    BLOCK: Inside of a block, waiting for an attribute identifier or }
+
+    ATTR_FOUND: Inside of a block, got an attribute identifier, waiting
+    for its value
+"""
+parsing_states = Enum('FREE', 'IDENTIFIER_FOUND', 'PRIMARY_ATTR_FOUND',
+                      'BLOCK', 'ATTR_FOUND')
+
+# the things that the parser does with a token, once it is accepted
+parsing_actions = Enum('NEW_BLOCK', 'OPEN_BLOCK', 'PRIMARY_ATTR',
+                       'CLOSE_BLOCK', 'ATTR', 'ATTR_VALUE')
+
+# The parser's transition table. For each state, this maps the Token types
+# which are valid in that state to an action and the next state.
+_transitions = {
+    parsing_states.FREE: {
+        Token.types.IDENTIFIER: (parsing_actions.NEW_BLOCK,
+                                 parsing_states.IDENTIFIER_FOUND)},
+    parsing_states.IDENTIFIER_FOUND: {
+        Token.types.BLOCK_START: (parsing_actions.OPEN_BLOCK,
+                                  parsing_states.BLOCK),
+        Token.types.TEMPLATE: (parsing_actions.PRIMARY_ATTR,
+                               parsing_states.PRIMARY_ATTR_FOUND)},
+    parsing_states.PRIMARY_ATTR_FOUND: {
+        Token.types.BLOCK_START: (parsing_actions.OPEN_BLOCK,
+                                  parsing_states.BLOCK),
+        # a block which was not closed with a '}' (i.e. one given only a
+        # primary attr) is complete once the next one begins
+        Token.types.IDENTIFIER: (parsing_actions.NEW_BLOCK,
+                                 parsing_states.IDENTIFIER_FOUND)},
+    parsing_states.BLOCK: {
+        Token.types.BLOCK_END: (parsing_actions.CLOSE_BLOCK,
+                                parsing_states.FREE),
+        Token.types.IDENTIFIER: (parsing_actions.ATTR,
+                                 parsing_states.ATTR_FOUND)},
+    parsing_states.ATTR_FOUND: {
+        Token.types.TEMPLATE: (parsing_actions.ATTR_VALUE,
+                               parsing_states.BLOCK)},
+}
+
+# the expected token types in each state, as they are reported in errors
+_expected_types = {
+    parsing_states.FREE: [Token.types.IDENTIFIER],
+    parsing_states.IDENTIFIER_FOUND: [Token.types.BLOCK_START,
+                                      Token.types.TEMPLATE],
+    parsing_states.PRIMARY_ATTR_FOUND: [Token.types.BLOCK_START,
+                                        Token.types.IDENTIFIER],
+    parsing_states.BLOCK: [Token.types.BLOCK_END, Token.types.IDENTIFIER],
+    parsing_states.ATTR_FOUND: [Token.types.TEMPLATE],
+}
+
+# the states in which the parser may reach the end of the tokens, i.e. when
+# it is not inside of a block and a TEMPLATE could not come next
+_end_states = (parsing_states.FREE, parsing_states.PRIMARY_ATTR_FOUND)
+
+
+class Parser(object):
     """
-    expected = ExecutionContext()['parsing']['expected_token_types']
-
-    # if the token is unexpected, throw an exception and fail
-    if token.ty not in expected:
-        raise ParsingException(
-            'Invalid token.' +
-            'Expected a token of types ' + str(expected) +
-            ' but got token ' + token.value + ' of type ' + token.ty +
-            ' instead.', token.file_context)
+    The parser state machine for a single stream of Tokens.
 
-
-def check_parsing_end_state():
-    """
-    Validates that the parsing state is a safe one for the parser to exit.
-    For example, if we're in the middle of a block and the parser attempts to
-    exit, this is an error condition and a ParsingException should be raised.
+    All of the parser's state lives on the Parser itself, so any number of
+    token streams can be parsed at once, each by its own Parser.
     """
-    parsing_context = ExecutionContext()['parsing']
-    # if the token list terminates and there is still a block in
-    # progress or a TEMPLATE could come next, it means that the block was not
-    # teminated properly
-    if (parsing_context['in_block'] or
-            Token.types.TEMPLATE in parsing_context['expected_token_types']):
-        # this PE carries no token because it is the absence of a token
-        # that triggers it
-        raise ParsingException('Incomplete block in token stream!',
-                               parsing_context['current_block'].file_context)
-
-
-def handle_token_noblock(token):
+    __slots__ = ('state', 'current_block', 'current_attr')
+
+    def __init__(self):
+        """
+        Parser constructor.
+        """
+        self.state = parsing_states.FREE
+        # the current_block and current_attr are used to build blocks
+        # before they are handed off to the caller
+        self.current_block = None
+        self.current_attr = None
+
+    def _save(self, state, current_block, current_attr):
+        """
+        Store the state of generate(), which is kept in locals while it
+        runs, back onto the Parser.
+        """
+        self.state = state
+        self.current_block = current_block
+        self.current_attr = current_attr
+
+    def generate(self, tokens):
+        """
+        Lazily convert @tokens into Blocks, yielding each Block as soon as
+        it is complete.
+
+        Args:
+            @tokens
+            An iterable of Tokens to parse into Blocks.
+        """
+        transitions = _transitions
+        state = self.state
+        current_block = self.current_block
+        current_attr = self.current_attr
+
+        for token in tokens:
+            try:
+                action, next_state = transitions[state][token.ty]
+            except KeyError:
+                self._save(state, current_block, current_attr)
+                raise ParsingException(
+                    'Invalid token.' +
+                    'Expected a token of types ' +
+                    str(_expected_types[state]) +
+                    ' but got token ' + token.value + ' of type ' +
+                    token.ty + ' instead.', token.file_context)
+
+            if action is parsing_actions.ATTR:
+                current_attr = token.value.lower()
+            elif action is parsing_actions.ATTR_VALUE:
+                current_block[current_attr] = token.value
+                current_attr = None
+            elif action is parsing_actions.NEW_BLOCK:
+                try:
+                    block = identifier.block_from_identifier(token)
+                except BlockException:
+                    self._save(state, current_block, current_attr)
+                    raise ParsingException('Invalid block id ' +
+                                           token.value, token.file_context)
+                if current_block is not None:
+                    yield current_block
+                current_block = block
+            elif action is parsing_actions.PRIMARY_ATTR:
+                current_block[current_block.primary_attr] = token.value
+            elif action is parsing_actions.CLOSE_BLOCK:
+                yield current_block
+                current_block = None
+            # OPEN_BLOCK needs nothing beyond the state change
+
+            state = next_state
+
+        self._save(state, current_block, current_attr)
+
+        # if the token list terminates and there is still a block in
+        # progress or a TEMPLATE could come next, it means that the block
+        # was not teminated properly
+        if state not in _end_states:
+            # this PE carries no token because it is the absence of a token
+            # that triggers it
+            raise ParsingException('Incomplete block in token stream!',
+                                   current_block.file_context)
+
+        # the last block may be one with only a primary attr, which is not
+        # complete until the token stream ends
+        if current_block is not None:
+            yield current_block
+
+    def context_dict(self):
+        """
+        Describes the state of the Parser as a dict, in the form stored in
+        the ExecutionContext by earlier versions of SALVE.
+        """
+        return {'expected_token_types': _expected_types[self.state],
+                'in_block': self.state in (parsing_states.BLOCK,
+                                           parsing_states.ATTR_FOUND),
+                'current_block': self.current_block,
+                'current_attr': self.current_attr}
+
+
+def generate_blocks(tokens):
     """
-    Handler for parsing a token outside of a block context. (i.e. not in curly
-    braces)
-
-    Looking either for an ID, a primary block attr, or a block start
+    Lazily converts a token iterable to Blocks, yielding each Block as soon as
+    it is complete.
 
     Args:
-        @token
-        The current token being parsed
-    """
-    parsing_context = ExecutionContext()['parsing']
-    # if the token is an identifier found outside of a block, it is the
-    # beginning of a new block
-    if token.ty == Token.types.IDENTIFIER:
-        try:
-            current_block = identifier.block_from_identifier(token)
-            parsing_context['blocks'].append(current_block)
-            parsing_context['current_block'] = current_block
-        except BlockException:
-            raise ParsingException('Invalid block id ' +
-                                   token.value, token.file_context)
-        parsing_context['expected_token_types'] = [
-            Token.types.BLOCK_START, Token.types.TEMPLATE]
-
-    # not in a block, and not an identifier, so look for a primary attr or {
-    else:
-        # token.ty not in (BLOCK_END, IDENTIFIER)
-        # if the token is a block start, set in_block
-        if token.ty == Token.types.BLOCK_START:
-            parsing_context['in_block'] = True
-            parsing_context['expected_token_types'] = [Token.types.BLOCK_END,
-                                                       Token.types.IDENTIFIER]
-        # if the token is a template string, assign it to the
-        # primary attr
-        elif token.ty == Token.types.TEMPLATE:
-            parsing_context['expected_token_types'] = [Token.types.BLOCK_START,
-                                                       Token.types.IDENTIFIER]
-            current_block = parsing_context['current_block']
-            current_block[current_block.primary_attr] = token.value
-
-
-def handle_token_in_block(token):
+        @tokens
+        An iterable of Tokens to parse into Blocks. It is consumed
+        incrementally, so it may be a generator. Unordered iterables won't
+        work here, as parsing is very sensitive to token ordering.
     """
-    Handler for parsing a token inside of a block context. (i.e. in curly
-    braces)
-    Looks for a block attribute, an attribute value, or a block end.
+    salve.logger.info('Beginning Parse of Token Stream')
 
-    Args:
-        @token
-        The current token being parsed
-    """
-    # look for block attribute,value pairs, or }
-    parsing_context = ExecutionContext()['parsing']
-
-    # if the token is a block end, set current_block to None and
-    # set state to not be in block
-    if token.ty == Token.types.BLOCK_END:
-        parsing_context['in_block'] = False
-        parsing_context['expected_token_types'] = [Token.types.IDENTIFIER]
-    # if the token is an identifier, it is the name of an attr
-    # (because we're in a block)
-    elif token.ty == Token.types.IDENTIFIER:
-        parsing_context['current_attr'] = token.value.lower()
-        parsing_context['expected_token_types'] = [Token.types.TEMPLATE]
-    # if the token is a template string, assign it to the
-    # current attr
-    elif token.ty == Token.types.TEMPLATE:
-        parsing_context['expected_token_types'] = [Token.types.BLOCK_END,
-                                                   Token.types.IDENTIFIER]
-        parsing_context['current_block'][
-            parsing_context['current_attr']] = token.value
-        parsing_context['current_attr'] = None
-
-
-def handle_token(token):
-    """
-    Handles the parsing of a single token.
-    Overall, takes the following two steps:
-    - Check that the token is one of the expected types
-    - Check if parsing is in the middle of building a block, and hand the token
-      to the appropriate handler
+    parser = Parser()
+    for block in parser.generate(tokens):
+        yield block
 
-    Args:
-        @token
-        The token from tokenization being parsed
-    """
-    check_for_unexpected_token(token)
+    # the final state is kept in the exec context for the sake of
+    # compatibility
+    ExecutionContext()['parsing'] = parser.context_dict()
 
-    # handling looks very different depending on whether or not we're in a
-    # block
-    if not ExecutionContext()['parsing']['in_block']:
-        handle_token_noblock(token)
-    else:
-        handle_token_in_block(token)
+    salve.logger.info('Finished Parsing Token Stream')
 
 
 def parse_tokens(tokens):
     """
     Converts a token list to a block list.
-    This is not entirely stateless, but unlike the tokenizer,
-    there are no explicit states.
 
     Args:
         @tokens
         An iterable (generally a list) of Tokens to parse into Blocks.
-        Unordered iterables won't work here, as parsing is very
-        sensitive to token ordering.
+        See generate_blocks()
     """
-    salve.logger.info('Beginning Parse of Token Stream')
+    blocks = list(generate_blocks(tokens))
+    ExecutionContext()['parsing']['blocks'] = blocks
+    return blocks
 
-    # use the exec context to store parsing state as a dict
-    ExecutionContext()['parsing'] = {}
-    parsing_context = ExecutionContext()['parsing']
 
-    parsing_context['blocks'] = []
+def blocks_to_records(blocks):
+    """
+    Converts blocks to a list of plain (identifier, lineno, attrs) records,
+    which can be serialized and later turned back into the same blocks by
+    blocks_from_records().
 
-    # track the expected next token(s)
-    parsing_context['expected_token_types'] = [Token.types.IDENTIFIER]
-    # tracks whether or not parsing is inside of a "{" "}" delimited block
-    parsing_context['in_block'] = False
+    Args:
+        @blocks
+        An iterable of Blocks, as produced by the parser.
+    """
+    return [(b.block_type.lower(), b.file_context.lineno, dict(b.attrs))
+            for b in blocks]
 
-    # the current_block and current_attr are used to build blocks
-    # before they are appended to the blocks list
-    parsing_context['current_block'] = None
-    parsing_context['current_attr'] = None
 
-    for token in tokens:
-        handle_token(token)
+def blocks_from_records(file_contexts, records):
+    """
+    Builds fresh blocks from records produced by blocks_to_records(),
+    exactly as the parser would have built them.
 
-    check_parsing_end_state()
+    Args:
+        @file_contexts
+        The FileContextFactory for the file from which the records came.
+        @records
+        An iterable of (identifier, lineno, attrs) records.
+    """
+    blocks = []
+    for (ident, lineno, attrs) in records:
+        block = identifier.identifier_map[ident](file_contexts(lineno))
+        for k in attrs:
+            block[k] = attrs[k]
+        blocks.append(block)
+    return blocks
 
-    salve.logger.info('Finished Parsing Token Stream')
 
-    return parsing_context['blocks']
+def generate_blocks_from_stream(stream):
+    """
+    Lazily parse a stream or file object into blocks.
 
+    Tokenizing and parsing run as a single pipeline: every token is handed to
+    the parser as soon as it is scanned, and every block is yielded as soon
+    as it is complete, so no more than one block's worth of tokens is ever
+    held in memory.
 
-def parse_stream(stream):
+    Args:
+        @stream
+        any file-like object that supports read()
+    """
+    tokens = generate_tokens(stream)
+    try:
+        for block in generate_blocks(tokens):
+            yield block
+    except TokenizationException:
+        raise
+    except ParsingException:
+        # tokenization used to run to completion before parsing began, so
+        # errors in the token stream take precedence over parsing errors
+        # drain the remaining tokens (without storing them) to preserve that
+        for token in tokens:
+            pass
+        raise
+
+
+def parse_stream(stream, processes=1):
     """
     Parse a stream or file object into blocks.
 
     Args:
         @stream
-        any file-like object that supports read() or readlines()
+        any file-like object that supports read()
         Parsing a stream is just tokenizing it, and then handing those
         tokens to the parser.
+
+    KWArgs:
+        @processes=1
+        When greater than 1, a large stream is split up and parsed by this
+        many worker processes. See salve.parser.parallel
     """
-    return parse_tokens(tokenize_stream(stream))
+    if processes > 1:
+        # this import must take place inside of the function because the
+        # parallel parser is built on top of this module
+        from .parallel import generate_blocks_parallel
+        return list(generate_blocks_parallel(stream, processes))
+    return list(generate_blocks_from_stream(stream))
@@ -0,0 +1,192 @@
+import re
+import string
+
+# Basically, everything other than BLOCK_START or BLOCK_END
+# is okay here, we'll let the os library handle it later wrt
+# whether or not a path is valid
+# '#' and '\' are listed for historical reasons, but a '#' always starts a
+# comment and a '\' always escapes the following character
+WORDCHARS = (string.ascii_letters + string.digits +
+             '_-+=^&@`/\\|~$()[].,<>*?!%#')
+WHITESPACE = ' \t\r\n'
+COMMENTERS = '#'
+QUOTES = '\'"'
+ESCAPE = '\\'
+
+# the number of characters read from a stream at a time
+CHUNK_SIZE = 2 ** 16
+
+
+def _charclass(chars):
+    """
+    Build the body of a regex character class matching exactly @chars.
+    """
+    return ''.join(re.escape(c) for c in chars)
+
+
+_word_class = _charclass(c for c in WORDCHARS
+                         if c not in COMMENTERS and c not in ESCAPE)
+
+# A word is a run of word characters, quoted strings, and escaped characters
+# with no whitespace between them, exactly as shlex builds a token in posix
+# mode. Anything which is not whitespace, a comment, or the start of a word is
+# a single character token (notably, '{' and '}').
+_token_re = re.compile(
+    r'[' + _charclass(WHITESPACE) + r']*' +
+    r'(?:(?P<comment>#[^\n]*\n?)' +
+    r'|(?P<word>(?:[' + _word_class + r']+' +
+    r'|"(?:[^"\\]|\\.)*"' +
+    r"|'[^']*'" +
+    r'|\\.)+)' +
+    r'|(?P<char>[^' + _charclass(WHITESPACE) + r']))',
+    re.DOTALL)
+
+_unterminated_chars = QUOTES + ESCAPE
+# characters which, when they terminate a word, are counted into its lineno
+_lineno_terminators = '\n' + COMMENTERS
+# group numbers in _token_re, since comparing these is cheaper than names
+_COMMENT = _token_re.groupindex['comment']
+_WORD = _token_re.groupindex['word']
+
+# used to take apart words which contain quotes or escapes
+_segment_re = re.compile(
+    r'"((?:[^"\\]|\\.)*)"' +
+    r"|'([^']*)'" +
+    r'|\\(.)' +
+    r'|([^"\'\\]+)',
+    re.DOTALL)
+# inside of double quotes, only a quote or the escape character itself can be
+# escaped -- any other backslash is kept literally
+_dquote_escape_re = re.compile(r'\\(["\\])')
+
+
+def _unquote(word):
+    """
+    Strip the quotes and escapes out of a word, using posix shlex semantics.
+
+    Args:
+        @word
+        The raw text of a word, as matched by the scanner.
+    """
+    parts = []
+    for m in _segment_re.finditer(word):
+        dquoted, squoted, escaped, plain = m.groups()
+        if dquoted is not None:
+            parts.append(_dquote_escape_re.sub(r'\1', dquoted))
+        elif squoted is not None:
+            parts.append(squoted)
+        elif escaped is not None:
+            parts.append(escaped)
+        else:
+            parts.append(plain)
+    return ''.join(parts)
+
+
+def _unterminated_error(text, pos):
+    """
+    Build the error shlex would raise for an unterminated quote or escape
+    starting at @pos in @text.
+
+    Args:
+        @text
+        The full text being scanned.
+        @pos
+        The offset of the opening quote or escape character.
+    """
+    # a trailing escape, or an escape at the end of a double quoted string
+    # runs out of characters before the quote does
+    if text[pos] == '"':
+        body = text[pos + 1:]
+        trailing = len(body) - len(body.rstrip('\\'))
+        if trailing % 2 == 1:
+            return ValueError('No escaped character')
+        return ValueError('No closing quotation')
+    elif text[pos] == '\'':
+        return ValueError('No closing quotation')
+    return ValueError('No escaped character')
+
+
+def scan(stream, chunk_size=CHUNK_SIZE, lineno=1):
+    """
+    Split a stream into raw token strings, annotated with line numbers.
+
+    This is a drop-in replacement for driving shlex.shlex(posix=True) with
+    SALVE's WORDCHARS one get_token() call at a time. It matches tokens in
+    bulk with a single compiled pattern and reproduces shlex's results
+    exactly, including its line numbering, which reports the line on which
+    the character that terminated a token was read.
+
+    The stream is read in chunks, so only the token currently being matched
+    and the unscanned part of the current chunk are held in memory.
+
+    Yields (value, lineno) tuples.
+
+    Args:
+        @stream
+        Any file-like object that supports read().
+
+    KWArgs:
+        @chunk_size=CHUNK_SIZE
+        The number of characters to read from @stream at a time.
+        @lineno=1
+        The line number on which @stream begins, for streams which are
+        part of a larger file.
+    """
+    buf = ''
+    pos = 0
+    eof = False
+    while not eof:
+        chunk = stream.read(chunk_size)
+        if chunk:
+            buf = buf[pos:] + chunk
+        else:
+            buf = buf[pos:]
+            eof = True
+        pos = 0
+        buflen = len(buf)
+
+        for m in _token_re.finditer(buf):
+            kind = m.lastindex
+            end = m.end()
+            # a match which runs up to the end of the chunk, or stops at a
+            # quote or escape, may continue into the next chunk, so it can
+            # only be trusted once the stream is exhausted
+            if not eof:
+                if end == buflen:
+                    break
+                elif kind == _WORD:
+                    if buf[end] in _unterminated_chars:
+                        break
+                elif kind != _COMMENT and buf[end - 1] in _unterminated_chars:
+                    break
+
+            lineno += buf.count('\n', pos, end)
+            pos = end
+
+            if kind == _WORD:
+                nxt = buf[end:end + 1]
+                tok_lineno = lineno
+                if nxt:
+                    # an unclosed quote or dangling escape immediately after
+                    # a word belongs to that word, and makes it invalid
+                    if nxt in _unterminated_chars:
+                        raise _unterminated_error(buf, end)
+                    # the terminating character is consumed along with the
+                    # word
+                    if nxt in _lineno_terminators:
+                        tok_lineno += 1
+
+                word = m.group(kind)
+                if '"' in word or '\'' in word or '\\' in word:
+                    word = _unquote(word)
+                yield word, tok_lineno
+            elif kind == _COMMENT:
+                # shlex counts a comment as exactly one line, even if it is
+                # terminated by EOF rather than a newline
+                if not buf.endswith('\n', 0, end):
+                    lineno += 1
+            else:
+                char = m.group(kind)
+                if char in _unterminated_chars:
+                    raise _unterminated_error(buf, end - 1)
+                yield char, lineno
@@ -1,13 +1,12 @@
-import string
-import shlex
-
 import salve
 from salve import paths, Enum
-from salve.context import FileContext, ExecutionContext
+from salve.context import FileContextFactory, ExecutionContext
 from salve.exceptions import TokenizationException
 
 from salve.util import stream_filename
 
+from .scanner import scan
+
 
 class Token(object):
     """
@@ -20,6 +19,9 @@ class Token(object):
     # these are the valid token types
     types = Enum('IDENTIFIER', 'BLOCK_START', 'BLOCK_END', 'TEMPLATE')
 
+    # there is one Token per word of a manifest, so keep them small
+    __slots__ = ('value', 'ty', 'file_context')
+
     def __init__(self, value, ty, file_context):
         """
         Token constructor
@@ -76,142 +78,156 @@ state_map = {
 }
 
 
-def add_token(tok, ty):
-    """
-    Add a token to the list in progress.
+# The tokenizer's transition table. For each state, this gives the Token type
+# and next state for a '{', a '}', and any other token string, in that order.
+# None means that the token is invalid in that state.
+_transitions = {
+    tokenizing_states.FREE: (
+        None, None,
+        (Token.types.IDENTIFIER, tokenizing_states.IDENTIFIER_FOUND)),
+    tokenizing_states.IDENTIFIER_FOUND: (
+        (Token.types.BLOCK_START, tokenizing_states.BLOCK), None,
+        (Token.types.TEMPLATE, tokenizing_states.PRIMARY_ATTR_FOUND)),
+    tokenizing_states.PRIMARY_ATTR_FOUND: (
+        (Token.types.BLOCK_START, tokenizing_states.BLOCK), None,
+        (Token.types.IDENTIFIER, tokenizing_states.IDENTIFIER_FOUND)),
+    tokenizing_states.BLOCK: (
+        None, (Token.types.BLOCK_END, tokenizing_states.FREE),
+        (Token.types.IDENTIFIER, tokenizing_states.IDENTIFIER_FOUND_BLOCK)),
+    tokenizing_states.IDENTIFIER_FOUND_BLOCK: (
+        None, None,
+        (Token.types.TEMPLATE, tokenizing_states.BLOCK)),
+}
 
-    Args:
-        @tok
-        The string that was tokenized.
-        @ty
-        The Token type of @tok
-    """
-    ExecutionContext()['tokenizing']['tokens'].append(
-        Token(tok, ty, ExecutionContext()['tokenizing']['filectx']))
+# the states in which the tokenizer may reach the end of a file, i.e. after
+# a '}' or after a '<block_id> <attr_val>'
+_end_states = (tokenizing_states.FREE, tokenizing_states.PRIMARY_ATTR_FOUND)
 
 
-def validate_end_state():
+class Tokenizer(object):
     """
-    Verify that the tokenizer is exiting in a non-failure state.
+    The tokenizer state machine for a single manifest.
+
+    All of the tokenizer's state lives on the Tokenizer itself, so any
+    number of manifests can be tokenized at once, each by its own
+    Tokenizer.
     """
-    # we can either be FREE (i.e. last saw a '}') or PRIMARY_ATTR_FOUND (i.e.
-    # last saw a '<block_id> <attr_val>') at the end of the file
-    tokenizing_ctx = ExecutionContext()['tokenizing']
-    state = tokenizing_ctx['state']
-    if state not in (tokenizing_states.FREE,
-                     tokenizing_states.PRIMARY_ATTR_FOUND):
-        raise TokenizationException('Tokenizer ended in state ' +
-                                    state, tokenizing_ctx['filectx'])
-
-
-def process_token(token_str, shlexer):
-    tokenizing_ctx = ExecutionContext()['tokenizing']
-
-    def _reject_unexpected(reject_start=False, reject_end=False):
-        def _reject():
-            raise TokenizationException(
-                'Unexpected token: ' + token_str +
-                ' Expected ' + str(tokenizing_ctx['expected_types']) +
-                ' instead.', tokenizing_ctx['filectx'])
-
-        if reject_start and token_str == '{':
-            _reject()
-        elif reject_end and token_str == '}':
-            _reject()
-
-    def _add_token(ty, target_state):
-        add_token(token_str, ty)
-        tokenizing_ctx['state'] = target_state
-
-    def _add_delim_or_fallback(delim_state, fallback_ty, fallback_state):
-        if token_str == '{':
-            _add_token(Token.types.BLOCK_START, delim_state)
-        elif token_str == '}':
-            _add_token(Token.types.BLOCK_END, delim_state)
-        else:
-            _add_token(fallback_ty, fallback_state)
-
-    # generate a new FileContext
-    ctx = FileContext(tokenizing_ctx['filename'], lineno=shlexer.lineno)
-    tokenizing_ctx['filectx'] = ctx
-
-    tokenizing_ctx['expected_types'] = state_map[tokenizing_ctx['state']]
-
-    # if we have not found a block, the expectation is that we will
-    # find a block identifier as the first token
-    if tokenizing_ctx['state'] is tokenizing_states.FREE:
-        _reject_unexpected(reject_start=True, reject_end=True)
-        _add_token(Token.types.IDENTIFIER, tokenizing_states.IDENTIFIER_FOUND)
-
-    # if we have found a block identifier, the next token must be
-    # a block start, '{', or the primary attr
-    elif tokenizing_ctx['state'] is tokenizing_states.IDENTIFIER_FOUND:
-        _reject_unexpected(reject_end=True)
-        _add_delim_or_fallback(tokenizing_states.BLOCK, Token.types.TEMPLATE,
-                               tokenizing_states.PRIMARY_ATTR_FOUND)
-
-    elif tokenizing_ctx['state'] is tokenizing_states.PRIMARY_ATTR_FOUND:
-        _reject_unexpected(reject_end=True)
-        _add_delim_or_fallback(tokenizing_states.BLOCK, Token.types.IDENTIFIER,
-                               tokenizing_states.IDENTIFIER_FOUND)
-
-    # if we are in a block, the next token is either a block end,
-    # '}', or an attribute identifier
-    elif tokenizing_ctx['state'] is tokenizing_states.BLOCK:
-        _reject_unexpected(reject_start=True)
-        _add_delim_or_fallback(tokenizing_states.FREE, Token.types.IDENTIFIER,
-                               tokenizing_states.IDENTIFIER_FOUND_BLOCK)
-
-    # if we are in a block and have found an attribute identifier,
-    # then the next token must be the template string for that
-    # attribute's value
-    elif tokenizing_ctx['state'] is tokenizing_states.IDENTIFIER_FOUND_BLOCK:
-        _reject_unexpected(reject_start=True, reject_end=True)
-        _add_token(Token.types.TEMPLATE, tokenizing_states.BLOCK)
+    __slots__ = ('filename', 'file_contexts', 'state', 'filectx')
 
+    def __init__(self, filename):
+        """
+        Tokenizer constructor.
 
-def tokenize_stream(stream):
+        Args:
+            @filename
+            The (absolute) path of the manifest being tokenized, used to
+            build the FileContexts of its Tokens.
+        """
+        self.filename = filename
+        self.file_contexts = FileContextFactory(filename)
+        self.state = tokenizing_states.FREE
+        self.filectx = None
+
+    def generate(self, stream, lineno=1):
+        """
+        Lazily convert @stream into Tokens, validating the token order.
+
+        Args:
+            @stream
+            Any file-like object that supports read().
+
+        KWArgs:
+            @lineno=1
+            The line number on which @stream begins, for streams which are
+            part of a larger file.
+        """
+        transitions = _transitions
+        file_contexts = self.file_contexts
+        state = self.state
+        filectx = self.filectx
+        last_lineno = None
+
+        for token_str, token_lineno in scan(stream, lineno=lineno):
+            # consecutive tokens are usually on the same line
+            if token_lineno != last_lineno:
+                last_lineno = token_lineno
+                filectx = file_contexts(token_lineno)
+
+            on_start, on_end, on_other = transitions[state]
+            if token_str == '{':
+                transition = on_start
+            elif token_str == '}':
+                transition = on_end
+            else:
+                transition = on_other
+
+            if transition is None:
+                self.state = state
+                self.filectx = filectx
+                raise TokenizationException(
+                    'Unexpected token: ' + token_str +
+                    ' Expected ' + str(state_map[state]) +
+                    ' instead.', filectx)
+
+            ty, state = transition
+            yield Token(token_str, ty, filectx)
+
+        self.state = state
+        self.filectx = filectx
+
+        if state not in _end_states:
+            raise TokenizationException('Tokenizer ended in state ' +
+                                        state, filectx)
+
+    def context_dict(self):
+        """
+        Describes the state of the Tokenizer as a dict, in the form stored in
+        the ExecutionContext by earlier versions of SALVE.
+        """
+        return {'state': self.state,
+                'filename': self.filename,
+                'filectx': self.filectx,
+                'expected_types': state_map[self.state]}
+
+
+def generate_tokens(stream):
     """
-    Convert an input stream into a list of Tokens.
+    Lazily convert an input stream into Tokens, yielding each one as soon as
+    it has been scanned and validated.
 
     Args:
-        @stream is actually any file-like object that supports read() or
-        readlines(). We need one of these attributes in order to hand
-        the stream off to shlex for basic tokenization.
-        In addition to the shlex tokenization, we do some basic
+        @stream is actually any file-like object that supports read(). We
+        need this attribute in order to hand the stream off to the scanner
+        for basic tokenization.
+        In addition to the scanner's tokenization, we do some basic
         validation that the token order is valid, and tag tokens with
         their types.
     """
     filename = paths.clean_path(stream_filename(stream), absolute=True)
-
-    # use the exec context to store parsing state as a dict
-    ExecutionContext()['tokenizing'] = {}
-    tokenizing_ctx = ExecutionContext()['tokenizing']
-
-    tokenizing_ctx['tokens'] = []
-    tokenizing_ctx['state'] = tokenizing_states.FREE
-    tokenizing_ctx['filename'] = filename
-    tokenizing_ctx['expected_types'] = Token.types.IDENTIFIER
+    tokenizer = Tokenizer(filename)
 
     salve.logger.info('Beginning Tokenization of \"%s\"' % filename)
-    shlexer = shlex.shlex(stream, posix=True)
-    # Basically, everything other than BLOCK_START or BLOCK_END
-    # is okay here, we'll let the os library handle it later wrt
-    # whether or not a path is valid
-    shlexer.wordchars = (string.ascii_letters + string.digits +
-                         '_-+=^&@`/\|~$()[].,<>*?!%#')
 
     # The tokenizer acts as a state machine, reading tokens and making
     # state transitions based on the token values
-    # get the first Maybe(Token)
-    current = shlexer.get_token()
-    while current is not None:
-        process_token(current, shlexer)
-        # get the next Maybe(Token)
-        current = shlexer.get_token()
+    for token in tokenizer.generate(stream):
+        yield token
 
-    validate_end_state()
+    # the final state is kept in the exec context for the sake of
+    # compatibility
+    ExecutionContext()['tokenizing'] = tokenizer.context_dict()
 
     salve.logger.info('Finished Tokenization of \"%s\"' % filename)
 
-    return tokenizing_ctx['tokens']
+
+def tokenize_stream(stream):
+    """
+    Convert an input stream into a list of Tokens.
+
+    Args:
+        @stream
+        Any file-like object that supports read(). See generate_tokens()
+    """
+    tokens = list(generate_tokens(stream))
+    ExecutionContext()['tokenizing']['tokens'] = tokens
+    return tokens
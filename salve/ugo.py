@@ -5,6 +5,53 @@ import grp
 import pwd
 
 
+class _NameCache(object):
+    """
+    Remembers the results of looking up names in one of the NSS databases,
+    which may be slow, as when users come from LDAP, so that each name is
+    only looked up once per run. A failed lookup is remembered too, and the
+    same KeyError is raised again without looking it up.
+    """
+    def __init__(self, lookup):
+        """
+        _NameCache constructor.
+
+        Args:
+            @lookup
+            A function which gets the ID for a name, raising a KeyError if
+            there is none.
+        """
+        self.lookup = lookup
+        # the ID for each name, or the KeyError raised when looking it up
+        self.results = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, name):
+        try:
+            result = self.results[name]
+            self.hits += 1
+        except KeyError:
+            self.misses += 1
+            try:
+                result = self.lookup(name)
+            except KeyError as e:
+                result = e
+            self.results[name] = result
+        if isinstance(result, KeyError):
+            raise KeyError(*result.args)
+        return result
+
+    def clear(self):
+        self.results = {}
+        self.hits = 0
+        self.misses = 0
+
+
+_uids = _NameCache(lambda username: pwd.getpwnam(username).pw_uid)
+_gids = _NameCache(lambda groupname: grp.getgrnam(groupname).gr_gid)
+
+
 def get_group_from_username(username):
     """
     Gets the primary group of a user based on NIS.
@@ -25,24 +72,63 @@ def is_root():
 
 def name_to_uid(username):
     """
-    Gets the UID for a user, based on NIS.
+    Gets the UID for a user, based on NIS. The result is cached, as is a
+    KeyError for an unknown user.
 
     Args:
         @username
         The user whose UID is desired.
     """
-    return pwd.getpwnam(username).pw_uid
+    return _uids(username)
 
 
 def name_to_gid(groupname):
     """
-    Gets the GID for a group, based on NIS.
+    Gets the GID for a group, based on NIS. The result is cached, as is a
+    KeyError for an unknown group.
 
     Args:
         @groupname
         The group whose GID is desired.
     """
-    return grp.getgrnam(groupname).gr_gid
+    return _gids(groupname)
+
+
+def prefetch(users=(), groups=()):
+    """
+    Looks up a number of users and groups at once, ahead of their use, so
+    that name_to_uid and name_to_gid find them in the cache. Unknown names
+    are not an error here, but are remembered as unknown.
+
+    KWArgs:
+        @users
+        The usernames to look up.
+        @groups
+        The groupnames to look up.
+    """
+    for (cache, names) in ((_uids, users), (_gids, groups)):
+        for name in set(names) - set(cache.results):
+            try:
+                cache(name)
+            except KeyError:
+                pass
+
+
+def clear_cache():
+    """
+    Forgets every cached UID and GID, and resets the cache counters, so
+    that changes to the users and groups on the host are seen.
+    """
+    _uids.clear()
+    _gids.clear()
+
+
+def cache_stats():
+    """
+    Gets the number of UID and GID lookups which were answered from the
+    cache, and the number which were not, as a (hits, misses) pair.
+    """
+    return (_uids.hits + _gids.hits, _uids.misses + _gids.misses)
 
 
 def is_owner(path):
@@ -1,7 +1,22 @@
 #!/usr/bin/python
 
+import io
 import os
 import hashlib
+import mmap
+
+from salve.context import ExecutionContext
+
+# the hash algorithm used when none is configured, which names backups by
+# bare hex digests, as every version before hash_algorithm did
+DEFAULT_HASH_ALGORITHM = 'sha512'
+
+# the size of the chunks in which files are read to be hashed
+HASH_CHUNK_SIZE = 2 ** 20
+
+# files at least this large are hashed through mmap, rather than read in
+# chunks, so that the hash reads the page cache directly
+MMAP_THRESHOLD = 2 ** 24
 
 
 def stream_filename(stream):
@@ -24,21 +39,151 @@ def sha512(stream):
 
     Args:
         @stream
-        A file like object whose sha512 has is desired.
+        A file like object whose sha512 has is desired. May be opened in
+        text mode, in which case its contents are hashed as UTF-8.
     """
     hash = hashlib.sha512()
     while True:
-        string = stream.read(2 ** 20).encode('utf-8')
-        if string:
-            hash.update(string)
-        else:
+        string = stream.read(HASH_CHUNK_SIZE)
+        if not string:
+            return hash.hexdigest()
+        if not isinstance(string, bytes):
+            string = string.encode('utf-8')
+        hash.update(string)
+
+
+def hash_algorithm_supported(algorithm):
+    """
+    Checks if @algorithm is the name of a hash algorithm which hashlib
+    provides, with a digest of fixed length. Variable length ones, like
+    shake_128, need a length for hexdigest(), so they are not supported.
+    """
+    try:
+        hashlib.new(algorithm).hexdigest()
+    except (ValueError, TypeError):
+        return False
+    return True
+
+
+def configured_hash_algorithm():
+    """
+    Gets the hash algorithm set by the hash_algorithm global, or the
+    default one.
+    """
+    ctx = ExecutionContext()
+    if 'hash_algorithm' in ctx:
+        return ctx['hash_algorithm']
+    return DEFAULT_HASH_ALGORITHM
+
+
+def hash_name(algorithm, digest):
+    """
+    Gets the name of a hash, as used for the names of backups. Hashes made
+    by the default algorithm are named by their hex digests alone, and any
+    others by the algorithm and the digest, so that the names made by
+    different algorithms never clash.
+
+    Args:
+        @algorithm
+        The name of the hash algorithm.
+        @digest
+        The hex digest.
+    """
+    if algorithm == DEFAULT_HASH_ALGORITHM:
+        return digest
+    return algorithm + '-' + digest
+
+
+def hash_file(path, algorithm=DEFAULT_HASH_ALGORITHM):
+    """
+    Computes the hex digest of the contents of a file, read in binary.
+    Small files are read into a single reused buffer, and large ones are
+    hashed through mmap, so that no chunk is copied more than once.
+
+    Args:
+        @path
+        The path to the file.
+
+    KWArgs:
+        @algorithm
+        The name of the hash algorithm, as given to hashlib.new().
+    """
+    hash = hashlib.new(algorithm)
+    with io.open(path, 'rb', buffering=0) as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            try:
+                m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (mmap.error, ValueError, OverflowError):
+                m = None
+            if m is not None:
+                try:
+                    hash.update(m)
+                finally:
+                    m.close()
+                return hash.hexdigest()
+
+        buf = bytearray(min(max(size, 1), HASH_CHUNK_SIZE))
+        view = memoryview(buf)
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                return hash.hexdigest()
+            hash.update(view[:n])
+
+
+def hash_copy(src, dst, algorithm=DEFAULT_HASH_ALGORITHM):
+    """
+    Copies the contents of one binary file object to another, hashing them
+    as they pass, so that they are read only once. Returns the hex digest.
+
+    Args:
+        @src
+        The file object to read, which must support readinto().
+        @dst
+        The file object to write.
+
+    KWArgs:
+        @algorithm
+        The name of the hash algorithm, as given to hashlib.new().
+    """
+    hash = hashlib.new(algorithm)
+    # a small file gets a buffer of its own size, not a whole chunk
+    try:
+        size = os.fstat(src.fileno()).st_size
+    except (AttributeError, io.UnsupportedOperation, OSError):
+        size = HASH_CHUNK_SIZE
+    buf = bytearray(min(max(size, 1), HASH_CHUNK_SIZE))
+    view = memoryview(buf)
+    while True:
+        n = src.readinto(buf)
+        if not n:
             return hash.hexdigest()
+        hash.update(view[:n])
+        dst.write(view[:n])
 
 
-def hash_from_path(path):
+def hash_from_path(path, algorithm=None):
+    """
+    Get the name of the hash of a file, as used for the names of backups.
+    A symlink is hashed by its contents, the path it points to.
+
+    Args:
+        @path
+        The path to the file or symlink.
+
+    KWArgs:
+        @algorithm
+        The name of the hash algorithm. When None, the hash_algorithm
+        global is used.
+    """
+    if algorithm is None:
+        algorithm = configured_hash_algorithm()
     if os.path.islink(path):
         link_contents = os.readlink(path).encode('utf-8')
-        return hashlib.sha256(link_contents).hexdigest()
-    else:
-        with open(path) as f:
-            return sha512(f)
+        # links were always hashed with sha256, which the default keeps
+        if algorithm == DEFAULT_HASH_ALGORITHM:
+            return hashlib.sha256(link_contents).hexdigest()
+        return hash_name(algorithm,
+                         hashlib.new(algorithm, link_contents).hexdigest())
+    return hash_name(algorithm, hash_file(path, algorithm))
@@ -13,7 +13,7 @@ setup(
     version=salve.__version__,
 
     install_requires=['argparse'],
-    packages=find_packages(exclude=['tests']),
+    packages=find_packages(exclude=['tests', 'tests.*', 'benchmarks']),
     package_data={'': ['*.ini']},
     entry_points={'console_scripts': ['salve = salve.cli:main']},
 
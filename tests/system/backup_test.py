@@ -4,6 +4,8 @@ import os
 import shlex
 from nose.tools import istest
 
+from salve.action.backup.catalog import BackupCatalog
+
 from tests import system
 
 
@@ -33,10 +35,28 @@ class TestWithScratchdir(system.RunScratchContainer):
         ss = shlex.split(s)
         assert len(ss) == 4
         assert ss[3] == self.get_fullname('f1')
-        backup_path = self.get_backup_path(backup_dir)
-        backup_path = os.path.join(backup_path, ss[2])
-        s = self.read_file(backup_path)
-        assert s == ''
+        assert self.read_backup(backup_dir, ss[2]) == ''
+
+    @istest
+    def copy_file_backup_cataloged(self):
+        """
+        System: Copy File Backup Cataloged
+
+        Runs a manifest which copies over a file, and verifies that its
+        backup is indexed in the backup catalog once the run ends.
+        """
+        self.write_file('f1', 'old')
+        self.write_file('1.man',
+                        'file { action copy source 1.man target f1 }\n')
+        self.run_on_manifest('1.man')
+
+        catalog = BackupCatalog(
+            self.get_fullname('home/user1/backups/catalog.db'),
+            self.get_fullname('home/user1/backup.log'))
+        versions = catalog.versions(self.get_fullname('f1'))
+        catalog.close()
+        assert len(versions) == 1
+        assert self.read_backup('home/user1/backups', versions[0][1]) == 'old'
 
     @istest
     def copy_file_triggers_backup_implicit_dir(self):
@@ -61,10 +81,7 @@ class TestWithScratchdir(system.RunScratchContainer):
         ss = shlex.split(s)
         assert len(ss) == 4
         assert ss[3] == self.get_fullname('f1')
-        backup_path = self.get_backup_path(backup_dir)
-        backup_path = os.path.join(backup_path, ss[2])
-        s = self.read_file(backup_path)
-        assert s == ''
+        assert self.read_backup(backup_dir, ss[2]) == ''
 
     @istest
     def copy_dir_triggers_backup(self):
@@ -98,12 +115,10 @@ class TestWithScratchdir(system.RunScratchContainer):
 
         assert self.exists('home/user1/backup.log')
         assert self.exists('home/user1/backups')
-        backup = self.get_backup_path('home/user1/backups')
-        assert self.exists(backup)
-        backup_files = self.listdir(backup)
-        assert len(backup_files) == 1
-        backup_file = os.path.join(backup, backup_files[0])
-        s = self.read_file(backup_file).strip()
+        assert self.exists(self.get_backup_path('home/user1/backups'))
+        backups = self.list_backups('home/user1/backups')
+        assert len(backups) == 1
+        s = self.read_backup('home/user1/backups', backups.pop()).strip()
         assert s == 'old'
 
     @istest
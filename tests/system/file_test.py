@@ -265,3 +265,26 @@ class TestWithScratchdir(system.RunScratchContainer):
         assert self.exists('a/gamma')
         s = self.read_file('a/gamma')
         assert s == '', s
+
+    @istest
+    def copy_many_files_in_parallel(self):
+        """
+        System: Copy Many Files In Parallel
+
+        Runs a manifest which copies files into directories it creates, with
+        several jobs, and verifies the contents and modes of the files.
+        """
+        content = ''
+        for i in range(20):
+            self.write_file('f%d' % i, 'content %d\n' % i)
+            content += 'directory { action create target d%d }\n' % (i % 4)
+            content += ('file { source f%d target d%d/f%d mode 640 }\n' %
+                        (i, i % 4, i))
+        self.write_file('1.man', content)
+        self.run_on_manifest('1.man', argv=['-d', self.scratch_dir,
+                                            '--jobs', '4'])
+
+        for i in range(20):
+            name = 'd%d/f%d' % (i % 4, i)
+            assert self.read_file(name) == 'content %d\n' % i
+            assert self.get_mode(name) == int('640', 8)
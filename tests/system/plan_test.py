@@ -0,0 +1,31 @@
+import os
+from nose.tools import istest
+
+from tests import system
+
+
+class TestWithScratchdir(system.RunScratchContainer):
+    @istest
+    def compile_then_deploy_plan(self):
+        """
+        System: Compile a Plan and Deploy It
+
+        Compiles a manifest which copies a file into a plan, and checks that
+        the copy only happens once the plan is deployed, even after the
+        manifest has been removed.
+        """
+        self.write_file('1.man', 'file { source f1 target f2 }\n')
+        plan_path = self.get_fullname('1.plan')
+        self.run_on_args(['./salve.py', 'compile',
+                          '-m', self.get_fullname('1.man'),
+                          '-d', self.scratch_dir, '-o', plan_path])
+        assert self.exists('1.plan')
+        assert not self.exists('f2')
+
+        os.remove(self.get_fullname('1.man'))
+        content = 'alpha beta\n'
+        self.write_file('f1', content)
+        self.run_on_args(['./salve.py', 'deploy', '--plan', plan_path])
+        assert self.exists('f2')
+        s = self.read_file('f2')
+        assert s == content, '%s' % s
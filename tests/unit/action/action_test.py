@@ -7,6 +7,7 @@ from tests.util import ensure_except, scratch
 from tests.unit.action import dummy_file_context
 
 from salve.exceptions import ActionException
+from salve import action
 from salve.action import Action, DynamicAction, ActionList
 from salve.filesys import ConcreteFilesys
 
@@ -140,3 +141,57 @@ class TestWithScratchdir(scratch.ScratchContainer):
         verify_code = a.verify_can_exec(ConcreteFilesys())
 
         assert verify_code == a.verification_codes.OK
+
+    @istest
+    def action_list_prepend_append(self):
+        """
+        Unit: Action List Prepend And Append
+        Verifies that actions prepended and appended to an ActionList are
+        executed in the resulting order.
+        """
+        done_actions = []
+
+        class DummyAction(Action):
+            def execute(self, filesys):
+                done_actions.append(self)
+
+        a, b, c, d = [DummyAction(dummy_file_context) for i in range(4)]
+        al = ActionList([b], dummy_file_context)
+        al.append(c)
+        al.prepend(a)
+        al.append(d)
+        al(ConcreteFilesys())
+
+        assert done_actions == [a, b, c, d]
+        assert list(al) == [a, b, c, d]
+
+    @istest
+    def actions_are_slotted(self):
+        """
+        Unit: Actions Have No Instance Dicts
+        Verifies that every concrete Action class, including those with
+        several Action base classes, stores its fields in slots.
+        """
+        from salve.context import ExecutionContext
+        ExecutionContext()['backup_dir'] = '/m/n'
+        ExecutionContext()['backup_log'] = '/m/n.log'
+
+        ctx = dummy_file_context
+        actions = [
+            action.ActionList([], ctx),
+            action.ShellAction('true', ctx),
+            action.FileCopyAction('/a', '/b', ctx),
+            action.DirCopyAction('/a', '/b', ctx),
+            action.DirTreeCopyAction('/a', '/b', ctx, mode='755'),
+            action.FileBackupAction('/a', ctx),
+            action.DirBackupAction('/a', ctx),
+            action.FileCreateAction('/a', ctx),
+            action.DirCreateAction('/a', ctx),
+            action.FileChmodAction('/a', '644', ctx),
+            action.DirChmodAction('/a', '755', ctx, recursive=True),
+            action.FileChownAction('/a', 'user1', 'group1', ctx),
+            action.DirChownAction('/a', 'user1', 'group1', ctx,
+                                  recursive=True),
+        ]
+        for act in actions:
+            assert not hasattr(act, '__dict__'), type(act).__name__
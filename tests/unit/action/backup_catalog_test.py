@@ -0,0 +1,146 @@
+#!/usr/bin/python
+
+import os
+
+import mock
+from nose.tools import istest
+
+from salve.action.backup import catalog
+
+from tests.util import scratch
+
+
+def log_line(when, hash_val, path):
+    return '2026-01-0{0} 10:00:00 {1} {2}\n'.format(when, hash_val, path)
+
+
+class TestWithScratchdir(scratch.ScratchContainer):
+    def setUp(self):
+        scratch.ScratchContainer.setUp(self)
+        self.catalog = catalog.BackupCatalog(
+            self.get_fullname('catalog.db'), self.get_fullname('backup.log'))
+
+    def tearDown(self):
+        self.catalog.close()
+        scratch.ScratchContainer.tearDown(self)
+
+    def append(self, content):
+        with open(self.get_fullname('backup.log'), 'a') as f:
+            f.write(content)
+
+    @istest
+    def catalog_versions(self):
+        """
+        Unit: Backup Catalog Finds Versions Of A File
+        Checks that the versions of a file are found, oldest first, and
+        that those of other files are not.
+        """
+        self.write_file('backup.log',
+                        log_line(2, 'h2', '/a/f') +
+                        log_line(1, 'h1', '/a/f') +
+                        log_line(1, 'hg', '/a/g') +
+                        log_line(3, 'h3', '/a/f with spaces'))
+
+        assert self.catalog.sync() == 4
+        assert self.catalog.versions('/a/f') == [
+            ('2026-01-01 10:00:00', 'h1'), ('2026-01-02 10:00:00', 'h2')]
+        assert self.catalog.versions('/a/f with spaces') == [
+            ('2026-01-03 10:00:00', 'h3')]
+        assert self.catalog.versions('/a/h') == []
+
+    @istest
+    def catalog_sync_appended(self):
+        """
+        Unit: Backup Catalog Syncs Only Appended Lines
+        Checks that a sync reads only the lines appended since the last
+        one, and that an incomplete last line waits for the next sync.
+        """
+        self.write_file('backup.log', log_line(1, 'h1', '/f'))
+        assert self.catalog.sync() == 1
+        assert self.catalog.sync() == 0
+
+        self.append(log_line(2, 'h2', '/f') + '2026-01-03 10:00:00 h3 /')
+        assert self.catalog.sync() == 1
+        self.append('f\n')
+        assert self.catalog.sync() == 1
+
+        assert [h for (_, h) in self.catalog.versions('/f')] == \
+            ['h1', 'h2', 'h3']
+
+    @istest
+    def catalog_sync_persists(self):
+        """
+        Unit: Backup Catalog Persists Across Opens
+        Checks that a reopened catalog keeps its index, and does not read
+        the log again.
+        """
+        self.write_file('backup.log', log_line(1, 'h1', '/f'))
+        self.catalog.sync()
+        self.catalog.close()
+
+        self.catalog = catalog.BackupCatalog(
+            self.get_fullname('catalog.db'), self.get_fullname('backup.log'))
+        with mock.patch.object(self.catalog, '_ingest') as ingest:
+            assert self.catalog.sync() == 0
+        assert not ingest.called
+        assert self.catalog.count() == 1
+
+    @istest
+    def catalog_log_replaced(self):
+        """
+        Unit: Backup Catalog Rebuilt When Log Replaced
+        Checks that the catalog is rebuilt from the whole log when the log
+        is truncated, or replaced by another file.
+        """
+        self.write_file('backup.log', log_line(1, 'h1', '/f') +
+                        log_line(2, 'h2', '/f'))
+        self.catalog.sync()
+
+        self.write_file('backup.log', log_line(3, 'h3', '/f'))
+        assert self.catalog.sync() == 1
+        assert self.catalog.versions('/f') == [('2026-01-03 10:00:00', 'h3')]
+
+        self.write_file('new.log', log_line(4, 'h4', '/f') +
+                        log_line(5, 'h5', '/f'))
+        os.rename(self.get_fullname('new.log'),
+                  self.get_fullname('backup.log'))
+        assert self.catalog.sync() == 2
+        assert self.catalog.count() == 2
+
+    @istest
+    def catalog_rebuild(self):
+        """
+        Unit: Backup Catalog Rebuild
+        Checks that a rebuild indexes the whole log again, without keeping
+        duplicates of the lines indexed before.
+        """
+        self.write_file('backup.log', log_line(1, 'h1', '/f') +
+                        log_line(2, 'h2', '/g'))
+        self.catalog.sync()
+
+        assert self.catalog.rebuild() == 2
+        assert self.catalog.count() == 2
+        assert self.catalog.versions('/g') == [('2026-01-02 10:00:00', 'h2')]
+
+    @istest
+    def catalog_malformed_lines(self):
+        """
+        Unit: Backup Catalog Skips Malformed Lines
+        Checks that lines which are not backups are skipped, rather than
+        stopping the sync.
+        """
+        self.write_file('backup.log', '\n' + 'garbage\n' +
+                        log_line(1, 'h1', '/f'))
+
+        assert self.catalog.sync() == 1
+        assert self.catalog.versions('/f') == [('2026-01-01 10:00:00', 'h1')]
+
+    @istest
+    def catalog_missing_log(self):
+        """
+        Unit: Backup Catalog Without A Log
+        Checks that syncing with a log which does not exist indexes
+        nothing.
+        """
+        assert self.catalog.sync() == 0
+        assert self.catalog.count() == 0
@@ -0,0 +1,124 @@
+#!/usr/bin/python
+
+import os
+import signal
+import threading
+
+from nose.tools import istest
+
+from salve.action.backup import log
+
+from tests.util import ensure_except, scratch
+
+
+def write_lines(path, prefix, count):
+    backup_log = log.BackupLog(path, max_lines=7)
+    for i in range(count):
+        backup_log.write('{0} {1} {2}'.format(prefix, i, 'x' * 200))
+    backup_log.close()
+
+
+class TestWithScratchdir(scratch.ScratchContainer):
+    def read_lines(self):
+        return self.read_file('backup.log').splitlines()
+
+    @istest
+    def backup_log_batches(self):
+        """
+        Unit: Backup Log Writes Lines In Batches
+        Checks that lines are buffered until there are max_lines of them,
+        and that closing the log writes out the rest.
+        """
+        backup_log = log.BackupLog(self.get_fullname('backup.log'),
+                                   max_lines=3)
+        backup_log.write('a')
+        backup_log.write('b')
+        assert self.read_file('backup.log') == ''
+
+        backup_log.write('c')
+        backup_log.write('d')
+        assert self.read_lines() == ['a', 'b', 'c']
+
+        backup_log.close()
+        assert self.read_lines() == ['a', 'b', 'c', 'd']
+
+    @istest
+    def backup_log_reopens(self):
+        """
+        Unit: Backup Log Reopens After Close
+        Checks that a line written after the log was closed is still
+        written out when the log is flushed.
+        """
+        backup_log = log.BackupLog(self.get_fullname('backup.log'))
+        backup_log.close()
+        backup_log.write('late')
+        backup_log.flush()
+
+        assert self.read_lines() == ['late']
+
+    @istest
+    def backup_log_threads(self):
+        """
+        Unit: Backup Log Shared By Threads
+        Checks that lines written from many threads through the same log
+        are all written, whole.
+        """
+        path = self.get_fullname('backup.log')
+        threads = [threading.Thread(target=lambda n=n: [
+                       log.open_log(path).write('{0} {1}'.format(n, i))
+                       for i in range(500)])
+                   for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        log.close_logs()
+
+        lines = self.read_lines()
+        assert sorted(lines) == sorted('{0} {1}'.format(n, i)
+                                       for n in range(8)
+                                       for i in range(500))
+
+    @istest
+    def backup_log_processes(self):
+        """
+        Unit: Backup Log Shared By Processes
+        Checks that batches written by concurrent processes to the same log
+        are never interleaved.
+        """
+        if not hasattr(os, 'fork'):  # pragma: no cover
+            return
+        path = self.get_fullname('backup.log')
+        pids = []
+        for n in range(4):
+            pid = os.fork()
+            if pid == 0:  # pragma: no cover
+                # the child must not return into the test runner
+                status = 1
+                try:
+                    write_lines(path, n, 300)
+                    status = 0
+                finally:
+                    os._exit(status)
+            pids.append(pid)
+        for pid in pids:
+            assert os.waitpid(pid, 0)[1] == 0
+
+        lines = self.read_lines()
+        assert len(lines) == 1200
+        for line in lines:
+            assert line.split(' ')[2] == 'x' * 200, line
+
+    @istest
+    def exit_cleanly_on_signals(self):
+        """
+        Unit: Backup Log Exit Cleanly On Signals
+        Checks that SIGTERM raises SystemExit within the context, so that
+        the run unwinds, and that the old handler is restored after it.
+        """
+        old_handler = signal.getsignal(signal.SIGTERM)
+        with log.exit_cleanly_on_signals():
+            e = ensure_except(SystemExit, os.kill, os.getpid(),
+                              signal.SIGTERM)
+        assert e.code == 128 + signal.SIGTERM
+        assert signal.getsignal(signal.SIGTERM) == old_handler
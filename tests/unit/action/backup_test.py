@@ -28,54 +28,97 @@ class TestWithScratchdir(scratch.ScratchContainer):
 
     @istest
     @patch_filebackup_autoverify_nolog
-    @mock.patch('salve.filesys.ConcreteFilesys.mkdir')
     @mock.patch('salve.action.copy.FileCopyAction.execute')
-    def file_target_name(self, mock_cp, mock_mkdir):
+    def file_target_name(self, mock_cp):
         """
         Unit: File Backup Action Destination File
         Verifies that a file's abspath followed by its SHA512 hash is its
-        destination file when backed up.
+        destination file when backed up, and that it is stored under that
+        name in a single pass, without a separate copy.
         """
+        ExecutionContext()['backup_dir'] = self.get_fullname('backup')
         self.write_file('file1.txt', 'Hashing target.\n')
         filename = self.get_fullname('file1.txt')
 
         act = backup.FileBackupAction(filename, dummy_file_context)
         act(ConcreteFilesys())
 
-        mock_mkdir.assert_called_once_with('/etc/salve/backup/files')
-
         assert os.path.basename(act.dst) == ('9bfabef5ffd7f5df84171393643' +
                                              'e7ceeba916e64876ace612ca8d2' +
                                              '0ad0ffd69e0ecd284ca7899f4ba' +
                                              'b6805c06f881296d20f619e714b' +
                                              'efb255e23fdf09ef0eed'), act.dst
+        assert not mock_cp.called
+        assert self.list_backups('backup') == set([act.hash_val])
+        assert self.read_backup('backup', act.hash_val) == \
+            'Hashing target.\n'
+
+    @istest
+    @patch_filebackup_autoverify_nolog
+    def file_target_exists(self):
+        """
+        Unit: File Backup Action Keeps Existing Backup
+        Verifies that a file whose contents are already backed up leaves the
+        existing backup in place, and no temporary file behind.
+        """
+        ExecutionContext()['backup_dir'] = self.get_fullname('backup')
+        ExecutionContext()['backup_pack_threshold'] = '0'
+        self.write_file('file1.txt', 'Hashing target.\n')
+        filename = self.get_fullname('file1.txt')
+        act = backup.FileBackupAction(filename, dummy_file_context)
+        act(ConcreteFilesys())
+        shard = 'backup/files/' + act.hash_val[:2]
+        inode = os.stat(self.get_fullname(shard + '/' + act.hash_val)).st_ino
 
-        cp_act = mock_cp.call_args[0][0]
-        assert (cp_act.src, cp_act.dst) == (filename, act.dst)
+        act = backup.FileBackupAction(filename, dummy_file_context)
+        act(ConcreteFilesys())
+
+        assert self.listdir('backup/files') == [act.hash_val[:2]]
+        assert self.listdir(shard) == [act.hash_val]
+        assert os.stat(self.get_fullname(
+            shard + '/' + act.hash_val)).st_ino == inode
 
     @istest
     @patch_filebackup_autoverify_nolog
-    @mock.patch('salve.filesys.ConcreteFilesys.mkdir')
     @mock.patch('salve.action.copy.FileCopyAction.execute')
-    def file_symlink_target_name(self, mock_cp, mock_mkdir):
+    def file_skip_unchanged(self, mock_cp):
+        """
+        Unit: File Backup Action Skips Unchanged File
+        Verifies that a file which is identical to the file about to be
+        copied over it is not backed up.
+        """
+        self.write_file('file1.txt', 'Hashing target.\n')
+        self.write_file('file2.txt', 'Hashing target.\n')
+
+        act = backup.FileBackupAction(self.get_fullname('file1.txt'),
+                                      dummy_file_context,
+                                      source=self.get_fullname('file2.txt'))
+        act(ConcreteFilesys())
+
+        assert not mock_cp.called
+        assert not act.write_log.called
+
+    @istest
+    @patch_filebackup_autoverify_nolog
+    def file_symlink_target_name(self):
         """
         Unit: File Backup Action Symlink Destination File
         Verifies that a symlink's abspath followed by its SHA256 hash is its
-        destination file when backed up.
+        destination file when backed up, and that the link is stored as a
+        link.
         """
+        ExecutionContext()['backup_dir'] = self.get_fullname('backup')
         linkname = self.get_fullname('file_link1')
         os.symlink('file1.txt', linkname)
 
         act = backup.FileBackupAction(linkname, dummy_file_context)
         act(ConcreteFilesys())
 
-        mock_mkdir.assert_called_once_with('/etc/salve/backup/files')
         assert os.path.basename(act.dst) == ('55ae75d991c770d8f3ef07cbfde' +
                                              '124ffce9c420da5db6203afab70' +
                                              '0b27e10cf9')
-
-        cp_act = mock_cp.call_args[0][0]
-        assert (cp_act.src, cp_act.dst) == (linkname, act.dst)
+        stored = self.get_fullname('backup/files/55/' + act.hash_val)
+        assert os.readlink(stored) == 'file1.txt'
 
     @istest
     def backupaction_is_abstract(self):
@@ -112,9 +155,8 @@ class TestWithScratchdir(scratch.ScratchContainer):
              ',context=' + str(dummy_file_context) + ')')
 
     @istest
-    @mock.patch('salve.action.backup.file.print', create=True)
-    @mock.patch('salve.action.backup.file.open', create=True)
-    def file_write_log(self, mock_open, mock_print):
+    @mock.patch('salve.action.backup.file.open_log')
+    def file_write_log(self, mock_open_log):
         """
         Unit: File Backup Action Write Log
         Verifies that on a successful backup action, the logfile is written
@@ -127,8 +169,9 @@ class TestWithScratchdir(scratch.ScratchContainer):
         with mock.patch('time.strftime', lambda s: 'NOW'):
             act.write_log()
 
-        mock_open.assert_called_once_with('/etc/salve/backup.log', 'a')
-        assert mock_print.call_args[0][0] == ('NOW abc ' + filename)
+        mock_open_log.assert_called_once_with('/etc/salve/backup.log')
+        mock_open_log.return_value.write.assert_called_once_with(
+            'NOW abc ' + filename)
 
     @istest
     @mock.patch('salve.action.ActionList.execute')
@@ -7,6 +7,7 @@ from nose.tools import istest
 from salve.context import ExecutionContext, FileContext
 
 from salve.action import copy
+from salve.action.backup.log import close_logs
 from salve.filesys import ConcreteFilesys
 from tests.util import scratch, assert_substr
 
@@ -171,3 +172,122 @@ class TestWithScratchdir(scratch.ScratchContainer):
         expected = ('EXECUTION [WARNING] no such file: ' +
                     'DirCopy: Non-Writable target directory "b/c"\n')
         assert_substr(expected, err)
+
+    @istest
+    def dir_tree_copy_execute(self):
+        """
+        Unit: Directory Tree Copy Action Execution
+        Verifies that executing a DirTreeCopyAction creates every
+        subdirectory with the given mode, and backs up and copies every file,
+        treating links as os.walk does.
+        """
+        ExecutionContext()['backup_dir'] = self.get_fullname('backups')
+        ExecutionContext()['backup_log'] = self.get_fullname('backup.log')
+
+        self.make_dir('a/s1/s3')
+        self.make_dir('a/s2')
+        self.write_file('a/f1', 'f1 content')
+        self.write_file('a/s1/f2', 'f2 content')
+        self.write_file('a/s1/s3/f3', 'f3 content')
+        os.symlink(self.get_fullname('a/s1'), self.get_fullname('a/dlink'))
+        os.symlink('f1', self.get_fullname('a/flink'))
+        self.make_dir('b')
+        self.write_file('b/f1', 'old f1 content')
+
+        act = copy.DirTreeCopyAction(self.get_fullname('a'),
+                                     self.get_fullname('b'),
+                                     self.dummy_file_context, mode='750')
+        act(ConcreteFilesys())
+
+        assert self.read_file('b/f1') == 'f1 content'
+        assert self.read_file('b/s1/f2') == 'f2 content'
+        assert self.read_file('b/s1/s3/f3') == 'f3 content'
+        for d in ('b/s1', 'b/s1/s3', 'b/s2'):
+            assert os.path.isdir(self.get_fullname(d)), d
+            assert self.get_mode(d) == 0o750, d
+        # a link to a dir is created as a dir, but its contents are not
+        # copied
+        assert not os.path.islink(self.get_fullname('b/dlink'))
+        assert self.listdir('b/dlink') == []
+        assert os.readlink(self.get_fullname('b/flink')) == 'f1'
+
+        # the overwritten file was backed up
+        close_logs()
+        assert_substr(self.read_file('backup.log'),
+                      self.get_fullname('b/f1'))
+        assert len(self.list_backups('backups')) == 1
+
+    @istest
+    def dir_tree_copy_unreadable_source(self):
+        """
+        Unit: Directory Tree Copy Action Unreadable Source
+        Verifies that a DirTreeCopyAction with an unreadable source warns and
+        copies nothing.
+        """
+        self.make_dir('b')
+        act = copy.DirTreeCopyAction(self.get_fullname('a'),
+                                     self.get_fullname('b'),
+                                     self.dummy_file_context)
+        act(ConcreteFilesys())
+
+        assert self.listdir('b') == []
+        assert_substr(self.stderr.getvalue(),
+                      'DirTreeCopy: Non-Readable source directory')
+
+    @istest
+    @mock.patch('salve.filesys.ConcreteFilesys.copy')
+    def filecopy_skip_identical(self, mock_copy):
+        """
+        Unit: File Copy Action Skips Identical Target
+        Verifies that a file is not copied over a target with the same
+        contents, and that the bytes not written are counted.
+        """
+        self.write_file('rw_dir_1/c', 'file with R and W perms')
+        fcp = copy.FileCopyAction(self.get_fullname('rw_file_1'),
+                                  self.get_fullname('rw_dir_1/c'),
+                                  self.dummy_file_context)
+        copy.file.reset_skipped_copies()
+        fcp(ConcreteFilesys())
+
+        assert not mock_copy.called
+        assert copy.file.skipped_copies() == (1, 23)
+        assert_substr(self.stderr.getvalue(),
+                      'FileCopy: Skipping identical target')
+
+    @istest
+    def filecopy_same_size_different(self):
+        """
+        Unit: File Copy Action Same Size Different Contents
+        Verifies that a target of the same size as its source, but with
+        different contents, is copied over.
+        """
+        self.write_file('rw_dir_1/c', 'FILE WITH R AND W PERMS')
+        fcp = copy.FileCopyAction(self.get_fullname('rw_file_1'),
+                                  self.get_fullname('rw_dir_1/c'),
+                                  self.dummy_file_context)
+        fcp(ConcreteFilesys())
+
+        assert self.read_file('rw_dir_1/c') == 'file with R and W perms'
+
+    @istest
+    @mock.patch('salve.filesys.ConcreteFilesys.hash')
+    @mock.patch('salve.filesys.ConcreteFilesys.copy')
+    def filecopy_trust_mtime(self, mock_copy, mock_hash):
+        """
+        Unit: File Copy Action Trusts Mtime
+        Verifies that with trust_mtime, a target of the same size as its
+        source, and no older, is not hashed or copied over.
+        """
+        self.write_file('rw_dir_1/c', 'FILE WITH R AND W PERMS')
+        src = self.get_fullname('rw_file_1')
+        os.utime(src, (1000, 1000))
+        fcp = copy.FileCopyAction(src, self.get_fullname('rw_dir_1/c'),
+                                  self.dummy_file_context)
+        ExecutionContext()['trust_mtime'] = True
+        try:
+            fcp(ConcreteFilesys())
+        finally:
+            ExecutionContext()['trust_mtime'] = False
+
+        assert not mock_hash.called
+        assert not mock_copy.called
@@ -0,0 +1,104 @@
+import mock
+from nose.tools import istest
+
+from salve.context import ExecutionContext, FileContext
+
+from salve.action import ensure
+from salve.filesys import ConcreteFilesys
+from tests.util import scratch
+
+dummy_file_context = FileContext('no such file')
+
+
+class TestWithScratchdir(scratch.ScratchContainer):
+    def setUp(self):
+        scratch.ScratchContainer.setUp(self)
+        ExecutionContext()['backup_dir'] = self.get_fullname('backups')
+        ExecutionContext()['backup_log'] = self.get_fullname('backup.log')
+
+    @istest
+    def file_ensure_create_with_mode(self):
+        """
+        Unit: File Ensure Action Create With Mode
+        Checks that a FileEnsureAction with no source creates the file and
+        chmods it.
+        """
+        act = ensure.FileEnsureAction(self.get_fullname('a'),
+                                      dummy_file_context, mode='640')
+        act(ConcreteFilesys())
+
+        assert self.exists('a')
+        assert self.get_mode('a') == 0o640
+
+    @istest
+    def file_ensure_copy_with_backup(self):
+        """
+        Unit: File Ensure Action Copy With Backup
+        Checks that a FileEnsureAction with a source backs up the target,
+        copies over it, and chmods it.
+        """
+        self.write_file('src', 'new\n')
+        self.write_file('dst', 'old\n')
+        act = ensure.FileEnsureAction(self.get_fullname('dst'),
+                                      dummy_file_context,
+                                      source=self.get_fullname('src'),
+                                      backup=True, mode='600')
+        act(ConcreteFilesys())
+
+        assert self.read_file('dst') == 'new\n'
+        assert self.get_mode('dst') == 0o600
+        assert self.exists('backup.log')
+
+    @istest
+    def dir_ensure_create_with_mode(self):
+        """
+        Unit: Directory Ensure Action Create With Mode
+        Checks that a DirEnsureAction creates the directory and chmods it.
+        """
+        act = ensure.DirEnsureAction(self.get_fullname('a/b'),
+                                     dummy_file_context, mode='750')
+        act(ConcreteFilesys())
+
+        assert self.get_mode('a/b') == 0o750
+
+    @istest
+    def ensure_skips_unneeded_chmod(self):
+        """
+        Unit: Ensure Action Skips Unneeded Chmod
+        Checks that an EnsureAction does not chmod a target which already
+        has the right mode.
+        """
+        self.make_dir('a')
+        filesys = ConcreteFilesys()
+        filesys.chmod(self.get_fullname('a'), 0o750)
+        act = ensure.DirEnsureAction(self.get_fullname('a'),
+                                     dummy_file_context, mode='750')
+        with mock.patch.object(filesys, 'chmod') as mock_chmod:
+            act(filesys)
+        assert not mock_chmod.called
+
+
+@istest
+def file_ensure_to_str():
+    """
+    Unit: File Ensure Action String Conversion
+    """
+    act = ensure.FileEnsureAction('a', dummy_file_context, source='b',
+                                  backup=True, mode='644', user='user1',
+                                  group='group1')
+
+    assert str(act) == ('FileEnsureAction(target=a,source=b,backup=True,' +
+                        'mode=644,user=user1,group=group1,context=' +
+                        repr(dummy_file_context) + ')')
+
+
+@istest
+def dir_ensure_to_str():
+    """
+    Unit: Directory Ensure Action String Conversion
+    """
+    act = ensure.DirEnsureAction('a', dummy_file_context)
+
+    assert str(act) == ('DirEnsureAction(target=a,mode=None,user=None,' +
+                        'group=None,context=' + repr(dummy_file_context) +
+                        ')')
@@ -345,51 +345,88 @@ class TestWithScratchdir(scratch.ScratchContainer):
 
         mock_chmod.assert_called_once_with('a', int('600', 8))
 
+    def make_tree(self):
+        """
+        Make the same tree in the scratch dir as mock_os_walk describes.
+        """
+        for d in ['a/b', 'a/c/x']:
+            self.make_dir(d)
+        for f in ['a/1', 'a/c/2', 'a/c/3', 'a/c/x/4']:
+            self.write_file(f, '')
+
     @istest
     @mock_uid_and_gid(1, 2)
+    @mock.patch('os.chown')
     @mock.patch('os.lchown')
     @mock.patch('salve.action.modify.DirChownAction.verify_can_exec')
-    @mock.patch('salve.action.modify.FileChownAction.verify_can_exec')
-    def dirchown_execute(self, file_verify, dir_verify, mock_lchown):
+    def dirchown_execute(self, dir_verify, mock_lchown, mock_chown):
         """
         Unit: Directory Chown Action Execute
         """
-        act = modify.DirChownAction('a', 'user1', 'nogroup', self.file_context,
+        self.make_tree()
+        act = modify.DirChownAction(self.get_fullname('a'), 'user1',
+                                    'nogroup', self.file_context,
                                     recursive=True)
 
         dir_verify.return_value = modify.DirChownAction.verification_codes.OK
-        file_verify.return_value = modify.FileChownAction.verification_codes.OK
 
         act(ConcreteFilesys())
 
-        lchown_args = arglist_from_mock(mock_lchown)
-        assert len(lchown_args) == 8
-        for name in ['a', 'a/b', 'a/c', 'a/1', 'a/c/2', 'a/c/3', 'a/c/x',
-                     'a/c/x/4']:
-            assert (name, 1, 2) in lchown_args
+        # the contents may be chowned relative to their directory
+        chowned = [(os.path.basename(args[0][0]),) + args[0][1:]
+                   for args in (mock_lchown.call_args_list +
+                                mock_chown.call_args_list)]
+        assert len(chowned) == 8
+        for name in ['a', 'b', 'c', '1', '2', '3', 'x', '4']:
+            assert (name, 1, 2) in chowned
+        assert_substr(self.stderr.getvalue(),
+                      'DirChown: Changed 7, skipped 0 entries under')
 
     @istest
-    @mock.patch('os.chmod')
     @mock.patch('salve.action.modify.DirChmodAction.verify_can_exec')
-    @mock.patch('salve.action.modify.FileChmodAction.verify_can_exec')
-    def dirchmod_recursive_execute(self, file_verify, dir_verify, mock_chmod):
+    def dirchmod_recursive_execute(self, dir_verify):
         """
         Unit: Directory Chmod Action Recursive Execute
         """
-        act = modify.DirChmodAction('a', '755', self.file_context,
-                                    recursive=True)
-
-        dir_verify.return_code = modify.DirChmodAction.verification_codes.OK
-        file_verify.return_code = modify.FileChmodAction.verification_codes.OK
+        self.make_tree()
+        act = modify.DirChmodAction(self.get_fullname('a'), '700',
+                                    self.file_context, recursive=True)
+        dir_verify.return_value = modify.DirChmodAction.verification_codes.OK
 
         act(ConcreteFilesys())
 
-        chmod_args = arglist_from_mock(mock_chmod)
-        assert len(chmod_args) == 8
-        mode = int('755', 8)
         for name in ['a', 'a/b', 'a/c', 'a/1', 'a/c/2', 'a/c/3', 'a/c/x',
                      'a/c/x/4']:
-            assert (name, mode) in chmod_args
+            assert self.get_mode(name) == 0o700, name
+        assert_substr(self.stderr.getvalue(),
+                      'DirChmod: Changed 7, skipped 0 entries under')
+
+    @istest
+    @mock.patch('salve.action.modify.DirChmodAction.verify_can_exec')
+    def dirchmod_recursive_skips_unchanged(self, dir_verify):
+        """
+        Unit: Directory Chmod Action Recursive Execute Skips Unchanged
+
+        Checks that entries which already have the mode, and symlinks, are
+        not chmoded, and that the file a symlink points to is left alone.
+        """
+        self.make_tree()
+        self.write_file('outside', '')
+        os.chmod(self.get_fullname('outside'), 0o644)
+        os.symlink(self.get_fullname('outside'), self.get_fullname('a/link'))
+        act = modify.DirChmodAction(self.get_fullname('a'), '700',
+                                    self.file_context, recursive=True)
+        dir_verify.return_value = modify.DirChmodAction.verification_codes.OK
+
+        act(ConcreteFilesys())
+        with mock.patch('os.chmod') as mock_chmod:
+            act(ConcreteFilesys())
+
+        # only the root dir is chmoded again
+        assert mock_chmod.call_count == 1
+        assert self.get_mode('outside') == 0o644
+        assert_substr(self.stderr.getvalue(),
+                      'DirChmod: Changed 0, skipped 8 entries under')
 
     @istest
     @mock_uid_and_gid(1, 2)
@@ -0,0 +1,192 @@
+from nose.tools import istest
+
+from salve import action
+from salve.action.optimize import optimize
+from salve.block import DirBlock
+from salve.context import ExecutionContext, FileContext
+
+from tests.util import MockedGlobals
+
+ctx = FileContext('/m/root.man', 3)
+
+
+def types(act):
+    return [type(a) for a in act]
+
+
+class TestWithBackupGlobals(MockedGlobals):
+    def setUp(self):
+        MockedGlobals.setUp(self)
+        ExecutionContext()['backup_dir'] = '/etc/salve/backup'
+        ExecutionContext()['backup_log'] = '/etc/salve/backup.log'
+
+    @istest
+    def optimize_fuses_file_copy(self):
+        """
+        Unit: Optimizer Fuses File Copy, Chmod And Chown
+        Checks that the actions compiled from a file block are fused into a
+        single FileEnsureAction, and that the eliminated actions are logged.
+        """
+        tree = action.ActionList([
+            action.FileBackupAction('/b/c', ctx),
+            action.FileCopyAction('/a/c', '/b/c', ctx),
+            action.FileChmodAction('/b/c', '640', ctx),
+            action.FileChownAction('/b/c', 'user1', 'group1', ctx),
+        ], ctx)
+        opt = optimize(tree)
+
+        assert types(opt) == [action.FileEnsureAction]
+        ens = list(opt)[0]
+        assert (ens.target, ens.source, ens.backup) == ('/b/c', '/a/c', True)
+        assert (ens.mode, ens.user, ens.group) == (0o640, 'user1', 'group1')
+        assert 'eliminated 3 of 4 actions' in self.stderr.getvalue()
+
+    @istest
+    def optimize_chown_before_chmod(self):
+        """
+        Unit: Optimizer Keeps A Chmod After A Chown
+        Checks that a chmod which follows a chown is not fused into an
+        EnsureAction, which would chmod first, so that setuid set by the
+        chmod is not cleared by the chown.
+        """
+        tree = action.ActionList([
+            action.FileCopyAction('/a/c', '/b/c', ctx),
+            action.FileChownAction('/b/c', 'user1', 'group1', ctx),
+            action.FileChmodAction('/b/c', '4755', ctx),
+        ], ctx)
+        opt = list(optimize(tree))
+
+        assert types(opt) == [action.FileEnsureAction,
+                              action.FileChmodAction]
+        assert (opt[0].mode, opt[0].user) == (None, 'user1')
+        assert opt[1].mode == 0o4755
+
+    @istest
+    def optimize_dir_copy(self):
+        """
+        Unit: Optimizer Keeps Chmods Made Before A Directory Copy
+        Checks that a directory copy still chmods its target, and the
+        directories it creates, before copying into them, even though the
+        whole tree is chmoded afterwards.
+        """
+        tree = action.ActionList([
+            action.ActionList([
+                action.DirCreateAction('/b', ctx),
+                action.DirChmodAction('/b', '755', ctx)], ctx),
+            action.DirTreeCopyAction('/a', '/b', ctx, mode='755'),
+            action.DirChmodAction('/b', '755', ctx, recursive=True),
+            action.DirChownAction('/b', 'user1', 'group1', ctx,
+                                  recursive=True),
+        ], ctx)
+        opt = list(optimize(tree))
+
+        assert types(opt) == [action.DirEnsureAction,
+                              action.DirTreeCopyAction,
+                              action.DirChmodAction, action.DirChownAction]
+        assert opt[0].mode == 0o755
+        assert opt[1].mode == '755'
+
+    @istest
+    def optimize_dir_block_copy(self):
+        """
+        Unit: Optimizer Keeps Chmod Of An Existing Copy Target
+        Checks that the chmod of the target of a directory block copy, which
+        may make an existing, unwritable target writable, still comes
+        before the copy into it.
+        """
+        block = DirBlock(ctx)
+        block['action'] = 'copy'
+        block['source'] = '/a'
+        block['target'] = '/b'
+        block['mode'] = '755'
+        opt = list(optimize(block.compile()))
+
+        assert types(opt) == [action.DirEnsureAction,
+                              action.DirTreeCopyAction,
+                              action.DirChmodAction]
+        assert (opt[0].target, opt[0].mode) == ('/b', 0o755)
+        assert opt[1].mode == '755'
+        assert opt[2].recursive
+
+    @istest
+    def optimize_modify_between_chmods(self):
+        """
+        Unit: Optimizer Keeps A Chmod Another Action Depends On
+        Checks that a chmod is not removed in favor of a later one when an
+        action in between touches the same path, or one inside of it.
+        """
+        tree = action.ActionList([
+            action.DirChmodAction('/a', '755', ctx),
+            action.FileCreateAction('/a/f', ctx),
+            action.DirChmodAction('/a', '555', ctx),
+            action.DirChmodAction('/c', '755', ctx),
+            action.FileCreateAction('/d/f', ctx),
+            action.DirChmodAction('/c', '555', ctx),
+        ], ctx)
+        opt = list(optimize(tree))
+
+        assert [str(a) for a in opt] == [str(a) for a in
+                                         [list(tree)[i]
+                                          for i in (0, 1, 2, 4, 5)]]
+
+    @istest
+    def optimize_keeps_last_chmod(self):
+        """
+        Unit: Optimizer Keeps The Last Chmod Of A Path
+        Checks that only the last of several chmods of a path is kept, and
+        that chmods of other paths are not affected.
+        """
+        tree = action.ActionList([
+            action.FileChmodAction('/a', '644', ctx),
+            action.FileChmodAction('/b', '644', ctx),
+            action.FileChmodAction('/a', '600', ctx),
+        ], ctx)
+        opt = list(optimize(tree))
+
+        assert [(a.target, a.mode) for a in opt] == [('/b', 0o644),
+                                                     ('/a', 0o600)]
+
+    @istest
+    def optimize_removes_duplicates(self):
+        """
+        Unit: Optimizer Removes Duplicate Actions
+        Checks that an action which repeats an earlier one is removed, unless
+        an action in between touches the same paths.
+        """
+        tree = action.ActionList([
+            action.FileCopyAction('/a/c', '/b/c', ctx),
+            action.DirCreateAction('/d', ctx),
+            action.FileCopyAction('/a/c', '/b/c', ctx),
+            action.FileCreateAction('/b/e', ctx),
+            action.DirCreateAction('/d', ctx),
+            action.FileCreateAction('/a/c/f', ctx),
+            action.FileCopyAction('/a/c', '/b/c', ctx),
+        ], ctx)
+        opt = list(optimize(tree))
+
+        assert [str(a) for a in opt] == [str(a) for a in
+                                         [list(tree)[i]
+                                          for i in (0, 1, 3, 5, 6)]]
+
+    @istest
+    def optimize_stops_at_shell(self):
+        """
+        Unit: Optimizer Does Not Optimize Across Shell Actions
+        Checks that no action is removed or fused across a ShellAction, which
+        may touch any file.
+        """
+        tree = action.ActionList([
+            action.FileCreateAction('/a', ctx),
+            action.FileChmodAction('/a', '644', ctx),
+            action.ShellAction('chmod 600 /a', ctx),
+            action.FileChmodAction('/a', '644', ctx),
+            action.FileCreateAction('/b', ctx),
+            action.ShellAction('rm /b', ctx),
+            action.FileChmodAction('/b', '644', ctx),
+        ], ctx)
+        opt = list(optimize(tree))
+
+        assert types(opt) == [action.FileEnsureAction, action.ShellAction,
+                              action.FileChmodAction,
+                              action.FileCreateAction, action.ShellAction,
+                              action.FileChmodAction]
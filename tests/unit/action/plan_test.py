@@ -0,0 +1,156 @@
+from nose.tools import istest
+
+from salve import action
+from salve.action import plan
+from salve.context import ExecutionContext, FileContext
+from salve.exceptions import SALVEException
+
+from tests.util import ensure_except, MockedGlobals
+
+# handle Py2 vs. Py3 StringIO change
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+
+def plan_text(content):
+    return ('{"format":"salve-plan","version":1,"files":["/a.man"],' +
+            '"action":' + content + '}')
+
+
+class TestWithBackupGlobals(MockedGlobals):
+    def setUp(self):
+        MockedGlobals.setUp(self)
+        ExecutionContext()['backup_dir'] = '/etc/salve/backup'
+        ExecutionContext()['backup_log'] = '/etc/salve/backup.log'
+
+    def make_tree(self):
+        ctx1 = FileContext('/m/root.man', 3)
+        ctx2 = FileContext('/m/sub.man', 7)
+        inner = action.ActionList([
+            action.FileBackupAction('/b/c', ctx2),
+            action.FileCopyAction('/a/c', '/b/c', ctx2),
+            action.FileChmodAction('/b/c', '640', ctx2),
+            action.FileChownAction('/b/c', 'user1', 'group1', ctx2),
+        ], ctx2)
+        return action.ActionList([
+            action.DirCreateAction('/b', ctx1),
+            action.DirChmodAction('/b', '755', ctx1, recursive=True),
+            action.DirChownAction('/b', 'user1', 'group1', ctx1),
+            inner,
+            action.FileCreateAction('/b/d', ctx1),
+            action.DirCopyAction('/a/e', '/b/e', ctx1),
+            action.DirTreeCopyAction('/a/f', '/b/f', ctx1, mode='750'),
+            action.DirBackupAction('/b/e', ctx1),
+            action.ShellAction('echo hi', ctx1),
+            action.FileEnsureAction('/b/g', ctx2, source='/a/g', backup=True,
+                                    mode='600', user='user1',
+                                    group='group1'),
+            action.DirEnsureAction('/b/h', ctx2, mode='700'),
+        ], FileContext('no such file'))
+
+    @istest
+    def plan_roundtrip(self):
+        """
+        Unit: Plan Round Trip
+        Checks that an action tree which is written to a plan and loaded
+        again is the same as the original.
+        """
+        tree = self.make_tree()
+        stream = StringIO()
+        plan.dump_plan(tree, stream)
+        stream.seek(0)
+        loaded = plan.load_plan(stream)
+
+        assert str(loaded) == str(tree)
+        assert list(loaded)[6].mode == '750'
+
+        def types(act):
+            if type(act) is action.ActionList:
+                return [types(a) for a in act]
+            return type(act)
+        assert types(loaded) == types(tree)
+
+    @istest
+    def plan_stores_filenames_once(self):
+        """
+        Unit: Plan Stores Each Filename Once
+        Checks that the manifest filenames in a plan are not repeated for
+        every action.
+        """
+        stream = StringIO()
+        plan.dump_plan(self.make_tree(), stream)
+        assert stream.getvalue().count('/m/sub.man') == 1
+
+    @istest
+    def plan_uses_local_backup_dir(self):
+        """
+        Unit: Plan Backups Use The Executing Host's Backup Dir
+        Checks that backups loaded from a plan go to the backup_dir where the
+        plan is loaded, not the one where it was compiled.
+        """
+        stream = StringIO()
+        plan.dump_plan(self.make_tree(), stream)
+        stream.seek(0)
+        ExecutionContext()['backup_dir'] = '/var/backup'
+        loaded = plan.load_plan(stream)
+        backup = list(list(loaded)[3])[0]
+        assert backup.dst == '/var/backup/files'
+
+    @istest
+    def plan_backup_without_source(self):
+        """
+        Unit: Plan Backups Without A Source
+        Checks that a backup stored without the file copied over it, as by
+        earlier versions, loads with no source.
+        """
+        stream = StringIO(plan_text('["file_backup",0,1,"/b"]'))
+        loaded = plan.load_plan(stream)
+        assert loaded.src == '/b'
+        assert loaded.source is None
+
+    @istest
+    def plan_unsupported_version(self):
+        """
+        Unit: Plan Rejects Unknown Versions
+        Checks that loading a plan in a newer format raises a SALVEException.
+        """
+        stream = StringIO(plan_text('["list",0,1]').replace(
+            '"version":1', '"version":2'))
+        e = ensure_except(SALVEException, plan.load_plan, stream)
+        assert e.message == 'Unsupported plan version 2, expected 1'
+
+    @istest
+    def plan_malformed(self):
+        """
+        Unit: Plan Rejects Malformed Plans
+        Checks that loading something other than a plan, or a plan with an
+        unknown action in it, raises a SALVEException.
+        """
+        for content in ['{"a":1}', 'not json', '[]']:
+            e = ensure_except(SALVEException, plan.load_plan,
+                              StringIO(content))
+            assert e.message == 'Not a SALVE plan'
+        for act in ['["foo",0,1]', '["file_copy",0,1,"/a"]',
+                    '["list",3,1]', 'null']:
+            e = ensure_except(SALVEException, plan.load_plan,
+                              StringIO(plan_text(act)))
+            assert e.message.startswith('Malformed plan action')
+
+    @istest
+    def plan_unsupported_action(self):
+        """
+        Unit: Plan Rejects Unknown Action Types
+        Checks that writing an action which cannot be stored in a plan raises
+        a SALVEException.
+        """
+        class UnknownAction(action.Action):
+            def execute(self, filesys):
+                pass
+
+        tree = action.ActionList([UnknownAction(FileContext('/a.man', 2))],
+                                 FileContext('/a.man'))
+        e = ensure_except(SALVEException, plan.dump_plan, tree, StringIO())
+        assert e.message == 'Cannot store UnknownAction in a plan'
+        assert str(e.file_context) == '/a.man, line 2'
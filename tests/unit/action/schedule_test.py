@@ -0,0 +1,118 @@
+import os
+
+from nose.tools import istest
+
+from salve import action
+from salve.action.backup.log import close_logs
+from salve.action.schedule import build_dependencies, execute_parallel
+from salve.context import ExecutionContext, FileContext
+from salve.exceptions import ActionException
+from salve.filesys import ConcreteFilesys
+
+from tests.util import ensure_except, scratch
+
+dummy_file_context = FileContext('no such file')
+
+
+class TestWithScratchdir(scratch.ScratchContainer):
+    def setUp(self):
+        scratch.ScratchContainer.setUp(self)
+        ExecutionContext()['backup_dir'] = self.get_fullname('backups')
+        ExecutionContext()['backup_log'] = self.get_fullname('backup.log')
+
+    @istest
+    def dependencies_follow_paths(self):
+        """
+        Unit: Scheduler Dependencies Follow Related Paths
+        Checks that actions depend on the last earlier action on the same
+        path, an ancestor, or a descendant, and that shell actions depend on
+        everything before them.
+        """
+        ctx = dummy_file_context
+        acts = [
+            action.DirCreateAction(self.get_fullname('a'), ctx),
+            action.FileCreateAction(self.get_fullname('a/b'), ctx),
+            action.FileCreateAction(self.get_fullname('c'), ctx),
+            action.FileChmodAction(self.get_fullname('a/b'), '600', ctx),
+            action.DirChmodAction(self.get_fullname('a'), '700', ctx,
+                                  recursive=True),
+            action.ShellAction('true', ctx),
+            action.FileCreateAction(self.get_fullname('d'), ctx),
+        ]
+        deps = build_dependencies(acts)
+
+        assert deps == [set(), set([0]), set(), set([0, 1]), set([0, 1, 3]),
+                        set([0, 1, 2, 3, 4]), set([5])], deps
+
+    @istest
+    def dependencies_follow_symlinks(self):
+        """
+        Unit: Scheduler Dependencies Follow Symlinks
+        Checks that actions on the same file through a symlink depend on one
+        another.
+        """
+        self.make_dir('a')
+        os.symlink(self.get_fullname('a'), self.get_fullname('link'))
+        acts = [
+            action.FileCreateAction(self.get_fullname('a/b'),
+                                    dummy_file_context),
+            action.FileChmodAction(self.get_fullname('link/b'), '600',
+                                   dummy_file_context),
+        ]
+        assert build_dependencies(acts) == [set(), set([0])]
+
+    @istest
+    def parallel_matches_serial(self):
+        """
+        Unit: Parallel Execution Matches Serial Execution
+        Checks that executing a tree of copies, with backups and chmods, on
+        several threads gives the same files as executing it serially.
+        """
+        ctx = dummy_file_context
+        self.make_dir('src')
+        for i in range(50):
+            self.write_file('src/f%d' % i, 'new %d\n' % i)
+        self.make_dir('dst/sub')
+        for i in range(0, 50, 2):
+            self.write_file('dst/sub/f%d' % i, 'old %d\n' % i)
+
+        tree = action.ActionList([], ctx)
+        for i in range(50):
+            src = self.get_fullname('src/f%d' % i)
+            dst = self.get_fullname('dst/sub/f%d' % i)
+            tree.append(action.ActionList([
+                action.FileBackupAction(dst, ctx),
+                action.FileCopyAction(src, dst, ctx),
+                action.FileChmodAction(dst, '640', ctx)], ctx))
+        tree.append(action.DirChmodAction(self.get_fullname('dst'), '750',
+                                          ctx, recursive=True))
+
+        execute_parallel(tree, ConcreteFilesys(), 8)
+
+        for i in range(50):
+            assert self.read_file('dst/sub/f%d' % i) == 'new %d\n' % i
+            assert self.get_mode('dst/sub/f%d' % i) == 0o750
+        assert self.get_mode('dst/sub') == 0o750
+        close_logs()
+        with open(self.get_fullname('backup.log')) as f:
+            assert len(f.readlines()) == 25
+
+    @istest
+    def parallel_raises_errors(self):
+        """
+        Unit: Parallel Execution Raises Action Errors
+        Checks that an exception raised by an action executed on a thread is
+        raised by execute_parallel, and that the actions which depend on the
+        failed one are not executed.
+        """
+        ctx = dummy_file_context
+        tree = action.ActionList([
+            action.FileCreateAction(self.get_fullname('a'), ctx),
+            action.ShellAction('false', ctx),
+            action.FileCreateAction(self.get_fullname('b'), ctx),
+        ], ctx)
+
+        ensure_except(ActionException, execute_parallel, tree,
+                      ConcreteFilesys(), 4)
+        assert self.exists('a')
+        assert not self.exists('b')
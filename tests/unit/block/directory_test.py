@@ -13,8 +13,7 @@ from tests.unit.block import dummy_file_context, ScratchWithExecCtx
 from .helpers import (
     check_list_act, check_dir_create_act,
     check_dir_chown_act, check_dir_chmod_act,
-
-    check_file_backup_act, check_file_copy_act,
+    check_dir_tree_copy_act,
     assign_block_attrs
 )
 
@@ -88,52 +87,37 @@ class TestWithScratchdir(ScratchWithExecCtx):
         Unit: Directory Block Copy Compile (Empty Dir)
         Verifies the result of converting a Dir Block to an Action.
         """
-        with mock.patch('os.walk', lambda d: []):
-            act = make_dir_block(action='copy', mode=None, user=None,
-                                 group=None).compile()
+        act = make_dir_block(action='copy', mode=None, user=None,
+                             group=None).compile()
 
-        check_list_act(act, 1)
+        check_list_act(act, 2)
         check_actions_against_defaults(create=act.actions[0])
+        check_dir_tree_copy_act(act.actions[1], '/a/b/c', '/p/q/r')
 
     @istest
     def nested_dir_copy_compile(self):
         """
-        Unit: Directory Block Copy Compile (Nested Dirs)
-        Verifies the result of converting a Dir Block to an Action.
+        Unit: Directory Block Copy Compile Does Not Walk Source
+        Verifies that converting a Dir Block to an Action produces a single
+        action for the contents of the source, without walking it.
         """
-        def mock_os_walk(dirname):
-            return [
-                (dirname, ['subdir1', 'subdir2'], ['file1']),
-                (os.path.join(dirname, 'subdir1'), ['subdir3'], ['file2']),
-                (os.path.join(dirname, 'subdir2'), [], []),
-                (os.path.join(dirname, 'subdir1', 'subdir3'), [], ['file3'])
-                ]
-
-        def _check_file_act(fileact, fpath):
-            src = os.path.join('/a/b/c', fpath)
-            dst = os.path.join('/p/q/r', fpath)
-            check_list_act(fileact, 2)
-            check_file_backup_act(fileact.actions[0], dst, '/m/n', '/m/n.log')
-            check_file_copy_act(fileact.actions[1], src, dst)
-
-        with mock.patch('os.walk', mock_os_walk):
-            act = make_dir_block(mode=None, user=None, group=None).compile()
-
-        # there should be seven component actions in all: four for each of the
-        # directories (counting the containing dir) and three for the three
-        # files
-        check_list_act(act, 7)
-        check_dir_create_act(act.actions[0], '/p/q/r')
-        check_dir_create_act(act.actions[1], '/p/q/r/subdir1')
-        check_dir_create_act(act.actions[2], '/p/q/r/subdir2')
-        _check_file_act(act.actions[3], 'file1')
-        check_dir_create_act(act.actions[4], '/p/q/r/subdir1/subdir3')
-        _check_file_act(act.actions[5], 'subdir1/file2')
-        _check_file_act(act.actions[6], 'subdir1/subdir3/file3')
+        with mock.patch('os.walk') as mock_walk:
+            with mock.patch('os.scandir') as mock_scandir:
+                act = make_dir_block().compile()
+        assert not mock_walk.called
+        assert not mock_scandir.called
+
+        check_list_act(act, 5)
+        check_actions_against_defaults(create=act.actions[0],
+                                       chmod=act.actions[1])
+        check_dir_tree_copy_act(act.actions[2], '/a/b/c', '/p/q/r',
+                                mode='755')
+        check_actions_against_defaults(chmod=act.actions[3],
+                                       chown=act.actions[4])
+        assert act.actions[3].recursive and act.actions[4].recursive
 
     @istest
     @mock.patch('salve.ugo.is_root', lambda: True)
-    @mock.patch('os.walk', lambda d: [])
     def dir_copy_chown_as_root(self):
         """
         Unit: Directory Block Copy Compile (As Root)
@@ -141,9 +125,10 @@ class TestWithScratchdir(ScratchWithExecCtx):
         """
         act = make_dir_block(mode=None).compile()
 
-        check_list_act(act, 2)
+        check_list_act(act, 3)
         check_actions_against_defaults(create=act.actions[0],
-                                       chown=act.actions[1])
+                                       chown=act.actions[2])
+        check_dir_tree_copy_act(act.actions[1], '/a/b/c', '/p/q/r')
 
     @istest
     def dir_copy_fails_nosource(self):
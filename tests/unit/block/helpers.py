@@ -54,6 +54,11 @@ def check_file_copy_act(act, src, dst):
     _generic_check_act(act, copy.FileCopyAction, {'src': src, 'dst': dst})
 
 
+def check_dir_tree_copy_act(act, src, dst, mode=None):
+    _generic_check_act(act, copy.DirTreeCopyAction,
+                       {'src': src, 'dst': dst, 'mode': mode})
+
+
 def check_file_chmod_act(act, mode, target):
     _generic_check_act(act, modify.FileChmodAction, {'target': target})
     assert '{0:o}'.format(act.mode) == mode, str(act.mode)
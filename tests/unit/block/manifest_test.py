@@ -4,7 +4,7 @@ from tests.util import ensure_except, full_path
 
 from salve import paths
 from salve.context import ExecutionContext
-from salve.exceptions import BlockException
+from salve.exceptions import BlockException, ParsingException
 
 from salve.block import ManifestBlock, FileBlock
 
@@ -97,3 +97,129 @@ class TestWithScratchdir(ScratchWithExecCtx):
         check_list_act(act, 2)
         check_list_act(act.actions[0], 0)
         check_list_act(act.actions[1], 4)
+
+    def _write_manifest_tree(self):
+        """
+        Writes a tree of manifests with several siblings at each level and
+        relative paths throughout, returning the root manifest's path.
+        """
+        if not self.exists('a/b'):
+            self.make_dir('a/b')
+            self.make_dir('b')
+        self.write_file('root.manifest',
+                        'manifest a/one.manifest\n' +
+                        'file { source f1 target t1 }\n' +
+                        'manifest a/two.manifest\n' +
+                        'manifest { source a/four.manifest }\n')
+        self.write_file('a/one.manifest',
+                        'file { source f2 target t2 }\n' +
+                        'manifest b/three.manifest\n')
+        self.write_file('a/two.manifest',
+                        'directory { source d1 target t3 }\n')
+        self.write_file('a/four.manifest',
+                        'file { source f3 target t4 }\n')
+        # v2 paths resolve against the root dir, v3 against each manifest
+        self.write_file('b/three.manifest',
+                        'file { source f4 target t5 }\n')
+        self.write_file('a/b/three.manifest',
+                        'file { source f5 target t6 }\n')
+        return self.get_fullname('root.manifest')
+
+    def _expanded_tree(self, workers, v3_relpaths):
+        ExecutionContext()['parse_workers'] = str(workers)
+        root = ManifestBlock(dummy_file_context,
+                             source=self._write_manifest_tree())
+        root.expand_blocks(self.scratch_dir, v3_relpaths)
+
+        def describe(block):
+            desc = (block.block_type, block.file_context.lineno,
+                    sorted(block.attrs.items()))
+            if isinstance(block, ManifestBlock):
+                return desc + ([describe(b) for b in block.sub_blocks],)
+            return desc
+        return describe(root)
+
+    @istest
+    def parallel_expand_matches_serial(self):
+        """
+        Unit: Manifest Block Parallel Expand Matches Serial
+        Verifies that expanding sibling manifests concurrently produces the
+        same block tree, in the same order, as expanding them one at a time,
+        with both v2 and v3 relative paths.
+        """
+        for v3_relpaths in (False, True):
+            serial = self._expanded_tree(1, v3_relpaths)
+            parallel = self._expanded_tree(4, v3_relpaths)
+            assert parallel == serial, (parallel, serial)
+
+        # the two modes really do resolve different manifests
+        assert (self._expanded_tree(4, False) !=
+                self._expanded_tree(4, True))
+
+    @istest
+    def parallel_expand_errors_in_order(self):
+        """
+        Unit: Manifest Block Parallel Expand Errors In Order
+        Verifies that when several sibling manifests are invalid, expanding
+        them concurrently raises the error of the first one, just as serial
+        expansion would.
+        """
+        ExecutionContext()['parse_workers'] = '4'
+        self.write_file('root.manifest',
+                        'manifest loop.manifest\n' +
+                        'manifest broken.manifest\n')
+        self.write_file('loop.manifest', 'manifest root.manifest\n')
+        self.write_file('broken.manifest', 'file { source x\n')
+
+        b = ManifestBlock(dummy_file_context,
+                          source=self.get_fullname('root.manifest'))
+        e = ensure_except(BlockException, b.expand_blocks, self.scratch_dir,
+                          False)
+        assert 'includes itself' in e.message
+
+        # with the loop removed, the sibling's parse error is raised
+        self.write_file('root.manifest', 'manifest broken.manifest\n')
+        b = ManifestBlock(dummy_file_context,
+                          source=self.get_fullname('root.manifest'))
+        ensure_except(ParsingException, b.expand_blocks, self.scratch_dir,
+                      False)
+
+    @istest
+    def repeated_include_parsed_once(self):
+        """
+        Unit: Manifest Block Repeated Include Parsed Once
+        Verifies that a manifest which is included from several places, but
+        does not include itself, is parsed only once, and that each include
+        gets its own blocks.
+        """
+        from salve.parser import cache
+        self.write_file('root.manifest',
+                        'manifest a.manifest\n' +
+                        'manifest b.manifest\n' +
+                        'manifest base.manifest\n')
+        self.write_file('a.manifest', 'manifest base.manifest\n')
+        self.write_file('b.manifest', 'manifest base.manifest\n')
+        self.write_file('base.manifest', 'file { source f target t }\n')
+
+        for workers in ('1', '4'):
+            ExecutionContext()['parse_workers'] = workers
+            b = ManifestBlock(dummy_file_context,
+                              source=self.get_fullname('root.manifest'))
+            with mock.patch('salve.parser.cache.parse_manifest',
+                            side_effect=cache.parse_manifest) as parse:
+                b.expand_blocks(self.scratch_dir, False)
+            parsed = sorted(c[0][0] for c in parse.call_args_list)
+            assert parsed == [self.get_fullname(name) for name in
+                              ['a.manifest', 'b.manifest', 'base.manifest',
+                               'root.manifest']], parsed
+
+            bases = [b.sub_blocks[0].sub_blocks[0],
+                     b.sub_blocks[1].sub_blocks[0],
+                     b.sub_blocks[2]]
+            fblocks = [base.sub_blocks[0] for base in bases]
+            assert len(set(id(fb) for fb in fblocks)) == 3
+            for fb in fblocks:
+                assert isinstance(fb, FileBlock)
+                assert fb['target'] == self.get_fullname('t')
+                assert fb.file_context.lineno == 1
+            assert 'saved 2 parses' in self.stderr.getvalue()
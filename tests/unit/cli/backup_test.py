@@ -0,0 +1,160 @@
+import os
+
+import mock
+from nose.tools import istest
+
+from salve import ugo
+from salve.cli import backup
+from salve.action.backup import FileBackupAction
+from salve.action.backup.log import close_logs
+from salve.context import ExecutionContext, FileContext
+from salve.filesys import ConcreteFilesys
+
+from tests.util import ensure_SystemExit_with_code, scratch, assert_substr
+
+
+class TestWithScratchdir(scratch.ScratchContainer):
+    def setUp(self):
+        scratch.ScratchContainer.setUp(self)
+        ExecutionContext()['backup_dir'] = self.get_fullname('backups')
+        ExecutionContext()['backup_log'] = self.get_fullname('backup.log')
+        self.make_dir('backups')
+        self.target = self.get_fullname('f')
+
+    def back_up(self, content):
+        self.write_file('f', content)
+        FileBackupAction(self.target, FileContext('no such file')).execute(
+            ConcreteFilesys())
+        close_logs()
+
+    def run_backup(self, **kwargs):
+        fake_args = mock.Mock()
+        fake_args.filename = self.target
+        fake_args.recover = False
+        fake_args.generation = None
+        fake_args.rebuild_catalog = False
+        for (name, value) in kwargs.items():
+            setattr(fake_args, name, value)
+        backup.main(fake_args)
+
+    def shown_versions(self):
+        self.stdout.seek(0)
+        self.stdout.truncate()
+        self.run_backup(show_versions=True)
+        return [line.split() for line in self.stdout.getvalue().splitlines()]
+
+    @istest
+    def backup_show_versions(self):
+        """
+        Unit: Backup Command Show Versions
+        Checks that the backup main function lists the backups of a file,
+        numbered oldest first, from the catalog.
+        """
+        self.back_up('v1')
+        self.back_up('v2')
+
+        versions = self.shown_versions()
+        assert [v[0] for v in versions] == ['1', '2']
+        assert self.read_backup('backups', versions[0][3]) == 'v1'
+        assert self.read_backup('backups', versions[1][3]) == 'v2'
+        assert self.exists('backups/catalog.db')
+
+    @istest
+    def backup_show_no_versions(self):
+        """
+        Unit: Backup Command Show Versions Of Unknown File
+        Checks that the backup main function reports that there are no
+        backups of a file which was never backed up.
+        """
+        self.run_backup(show_versions=True)
+
+        assert_substr(self.stdout.getvalue(), 'No backups of')
+
+    @istest
+    def backup_recover(self):
+        """
+        Unit: Backup Command Recover Generation
+        Checks that recovering a generation restores its content from the
+        backup store, and backs up the file as it was before.
+        """
+        self.back_up('v1')
+        self.back_up('v2')
+        self.write_file('f', 'v3')
+
+        self.run_backup(recover=True, generation=1)
+
+        assert self.read_file('f') == 'v1'
+        # the version was restored beside the file, and renamed over it
+        assert sorted(self.listdir('.')) == \
+            ['backup.log', 'backups', 'f', 'home']
+        versions = self.shown_versions()
+        assert len(versions) == 3
+        assert self.read_backup('backups', versions[2][3]) == 'v3'
+
+    @istest
+    def backup_recover_owner_mode(self):
+        """
+        Unit: Backup Command Recover Keeps Owner And Mode
+        Checks that a recovered file keeps the mode, and, when running as
+        root, the owner and group, of the file it replaces.
+        """
+        self.back_up('v1')
+        self.write_file('f', 'v2')
+        os.chmod(self.target, 0o640)
+        if ugo.is_root():
+            os.chown(self.target, 1234, 5678)
+
+        self.run_backup(recover=True)
+
+        st = os.stat(self.target)
+        assert self.read_file('f') == 'v1'
+        assert st.st_mode & 0o7777 == 0o640
+        if ugo.is_root():
+            assert (st.st_uid, st.st_gid) == (1234, 5678)
+
+    @istest
+    def backup_recover_hard_link(self):
+        """
+        Unit: Backup Command Recover Keeps Hard Links
+        Checks that a file with other links is recovered in place, so that
+        the other links see the recovered version.
+        """
+        self.back_up('v1')
+        self.write_file('f', 'v2')
+        os.link(self.target, self.get_fullname('g'))
+
+        self.run_backup(recover=True)
+
+        assert self.read_file('f') == 'v1'
+        assert self.read_file('g') == 'v1'
+        assert os.path.samefile(self.target, self.get_fullname('g'))
+
+    @istest
+    def backup_recover_latest(self):
+        """
+        Unit: Backup Command Recover Latest
+        Checks that recovering without a generation restores the latest
+        backup, even when the file no longer exists.
+        """
+        self.back_up('v1')
+        self.back_up('v2')
+        os.remove(self.target)
+
+        self.run_backup(recover=True)
+
+        assert self.read_file('f') == 'v2'
+
+    @istest
+    def backup_recover_bad_generation(self):
+        """
+        Unit: Backup Command Recover Missing Generation
+        Checks that recovering a generation which does not exist fails,
+        and leaves the file alone.
+        """
+        self.back_up('v1')
+
+        ensure_SystemExit_with_code(1, self.run_backup, recover=True,
+                                    generation=2)
+
+        assert_substr(self.stderr.getvalue(), 'No generation 2, there are 1')
+        assert self.read_file('f') == 'v1'
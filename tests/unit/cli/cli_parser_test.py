@@ -3,7 +3,7 @@ from nose.tools import istest
 
 import logging
 import salve
-from salve.cli import parser, deploy
+from salve.cli import parser, deploy, compile, migrate, backup
 from tests.util import (ensure_except, ensure_SystemExit_with_code,
                         MockedGlobals)
 
@@ -116,3 +116,101 @@ class TestsWithMockedIO(MockedGlobals):
         p = parser.get_parser()
 
         ensure_SystemExit_with_code(0, p.parse_args)
+
+    @istest
+    @mock.patch('sys.argv',
+                ['./salve.py', 'deploy', '-m', 'root.man', '--no-parse-cache'])
+    def parse_cmd_no_parse_cache(self):
+        """
+        Unit: Command Line Parse Disable Parse Cache
+        Checks that the parse cache is on by default, and that it can be
+        turned off with --no-parse-cache
+        """
+        p = parser.get_parser()
+        args = p.parse_args()
+        assert not args.parse_cache
+
+        with mock.patch('sys.argv', ['./salve.py', 'deploy', '-m', 'r.man']):
+            args = p.parse_args()
+        assert args.parse_cache
+
+    @istest
+    @mock.patch('sys.argv',
+                ['./salve.py', 'compile', '-m', 'root.man', '-o', 'a.plan',
+                 '--no-optimize'])
+    def parse_cmd_no_optimize(self):
+        """
+        Unit: Command Line Parse Disable Optimizer
+        Checks that compiled actions are optimized by default, and that the
+        optimizer can be turned off with --no-optimize
+        """
+        p = parser.get_parser()
+        args = p.parse_args()
+        assert not args.optimize
+
+        with mock.patch('sys.argv', ['./salve.py', 'deploy', '-m', 'r.man']):
+            args = p.parse_args()
+        assert args.optimize
+
+    @istest
+    @mock.patch('sys.argv', ['./salve.py', 'deploy', '--plan', 'a.plan'])
+    def parse_cmd_deploy_plan(self):
+        """
+        Unit: Command Line Parse Deploy Plan
+        Checks that deploy can be given a plan instead of a manifest, but not
+        both.
+        """
+        p = parser.get_parser()
+        args = p.parse_args()
+        assert args.plan == 'a.plan'
+        assert args.manifest is None
+        assert args.func is deploy.main
+
+        with mock.patch('sys.argv', ['./salve.py', 'deploy', '--plan',
+                                     'a.plan', '-m', 'root.man']):
+            ensure_except(SystemExit, p.parse_args)
+
+    @istest
+    @mock.patch('sys.argv', ['./salve.py', 'compile', '-m', 'root.man',
+                             '-o', 'a.plan', '--ver3'])
+    def parse_cmd_compile(self):
+        """
+        Unit: Command Line Parse Compile
+        Checks that the compile subcommand takes the manifest options of
+        deploy, along with a required output file.
+        """
+        args = parser.load_args()
+        assert args.manifest == 'root.man'
+        assert args.output == 'a.plan'
+        assert args.v3_relpath
+        assert args.func is compile.main
+
+        with mock.patch('sys.argv', ['./salve.py', 'compile', '-m', 'r.man']):
+            ensure_except(SystemExit, parser.get_parser().parse_args)
+
+    @istest
+    @mock.patch('sys.argv', ['./salve.py', 'migrate-backups', '-j', '4'])
+    def parse_cmd_migrate(self):
+        """
+        Unit: Command Line Parse Migrate Backups
+        Checks that the migrate-backups subcommand takes a number of jobs.
+        """
+        args = parser.get_parser().parse_args()
+        assert args.jobs == 4
+        assert args.func is migrate.main
+
+    @istest
+    @mock.patch('sys.argv', ['./salve.py', 'backup', '-r', '-g', '2',
+                             '-f', 'a/b'])
+    def parse_cmd_backup(self):
+        """
+        Unit: Command Line Parse Backup Recover
+        Checks that the backup subcommand takes a file, and a generation of
+        it to recover.
+        """
+        args = parser.get_parser().parse_args()
+        assert args.recover
+        assert not args.show_versions
+        assert args.generation == 2
+        assert args.filename == 'a/b'
+        assert args.func is backup.main
@@ -0,0 +1,50 @@
+import mock
+from nose.tools import istest
+
+from salve.cli import compile as salve_compile
+
+from tests.util import ensure_except, scratch
+
+
+class TestWithScratchdir(scratch.ScratchContainer):
+    def setUp(self):
+        scratch.ScratchContainer.setUp(self)
+        self.write_file('1.plan', 'old plan')
+        self.fake_args = mock.Mock()
+        self.fake_args.manifest = self.get_fullname('1.man')
+        self.fake_args.output = self.get_fullname('1.plan')
+
+    @istest
+    @mock.patch('salve.cli.compile.compile_manifest')
+    def compile_writes_plan(self, mock_compile):
+        """
+        Unit: Compile Command Writes Plan
+        Checks that the compile main function replaces the plan with the
+        dumped actions, leaving no temporary file behind.
+        """
+        def dump(action, f):
+            f.write('new plan')
+
+        with mock.patch('salve.cli.compile.dump_plan', side_effect=dump):
+            salve_compile.main(self.fake_args)
+
+        assert self.read_file('1.plan') == 'new plan'
+        assert sorted(self.listdir('.')) == ['1.plan', 'home']
+
+    @istest
+    @mock.patch('salve.cli.compile.compile_manifest')
+    def compile_failed_dump_keeps_plan(self, mock_compile):
+        """
+        Unit: Compile Command Failed Dump Keeps Plan
+        Checks that when dumping the plan fails partway, the old plan is
+        left as it was, and the partial one is removed.
+        """
+        def dump(action, f):
+            f.write('partial')
+            raise IOError('disk full')
+
+        with mock.patch('salve.cli.compile.dump_plan', side_effect=dump):
+            ensure_except(IOError, salve_compile.main, self.fake_args)
+
+        assert self.read_file('1.plan') == 'old plan'
+        assert sorted(self.listdir('.')) == ['1.plan', 'home']
@@ -36,6 +36,9 @@ class TestWithScratchdir(scratch.ScratchContainer):
         fake_args = mock.Mock()
         fake_args.manifest = 'root.manifest'
         fake_args.directory = '.'
+        fake_args.jobs = 1
+        fake_args.trust_mtime = False
+        fake_args.rehash = False
 
         mock_action = mock.Mock()
         mock_man_instance = mock.Mock()
@@ -47,6 +50,28 @@ class TestWithScratchdir(scratch.ScratchContainer):
         assert mock_action.called
         assert mock_man_instance.expand_blocks.called
 
+    @istest
+    @mock.patch('salve.cli.deploy.ManifestBlock')
+    def deploy_logs_filesys_report(self, mock_man):
+        """
+        Unit: Deploy Command Logs Filesys Cache Report
+        Checks that the syscalls saved by the filesys cache are logged at the
+        end of a deploy, even though the report contains a percent sign.
+        """
+        fake_args = mock.Mock()
+        fake_args.manifest = 'root.manifest'
+        fake_args.directory = '.'
+        fake_args.jobs = 1
+        fake_args.trust_mtime = False
+        fake_args.rehash = False
+        mock_man.return_value.compile.return_value = mock.Mock()
+
+        deploy.main(fake_args)
+
+        assert_substr(self.stderr.getvalue(),
+                      'Filesys cache saved 0 of 0 lookup syscalls (0%)')
+        assert 'Logging error' not in self.stderr.getvalue()
+
     @istest
     def deploy_salve_exception(self):
         """
@@ -165,3 +190,39 @@ class TestWithScratchdir(scratch.ScratchContainer):
 
         with mock.patch('salve.cli.deploy.run_on_manifest', mock_run):
             ensure_except(Exception, deploy.main, fake_args)
+
+    @istest
+    @mock.patch('salve.cli.deploy.ManifestBlock')
+    @mock.patch('salve.cli.deploy.load_plan')
+    def deploy_plan(self, mock_load, mock_man):
+        """
+        Unit: Deploy Command Runs Plan Without Parsing
+        Checks that running the deploy main function with a plan executes the
+        plan's actions, and never reads a manifest.
+        """
+        self.write_file('a.plan', '')
+        fake_args = mock.Mock()
+        fake_args.manifest = None
+        fake_args.plan = self.get_fullname('a.plan')
+        fake_args.jobs = 1
+        fake_args.trust_mtime = False
+        fake_args.rehash = False
+
+        deploy.main(fake_args)
+
+        assert mock_load.return_value.called
+        assert not mock_man.called
+
+    @istest
+    def deploy_missing_plan(self):
+        """
+        Unit: Deploy Command Missing Plan
+        Checks that running the deploy main function on a plan which does not
+        exist gives a SALVE error.
+        """
+        fake_args = mock.Mock()
+        fake_args.manifest = None
+        fake_args.plan = self.get_fullname('a.plan')
+
+        ensure_SystemExit_with_code(1, deploy.main, fake_args)
+        assert_substr(self.stderr.getvalue(), 'Could not read plan')
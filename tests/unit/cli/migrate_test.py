@@ -0,0 +1,49 @@
+import hashlib
+
+import mock
+from nose.tools import istest
+
+from salve.cli import migrate
+from salve.context import ExecutionContext
+from salve.filesys.store import BackupStore
+
+from tests.util import scratch
+
+
+class TestWithScratchdir(scratch.ScratchContainer):
+    @istest
+    def migrate_flat_backups(self):
+        """
+        Unit: Migrate Command Moves Flat Backups
+        Checks that the migrate-backups main function moves the backups in
+        backup_dir out of the flat files directory, and that they are still
+        readable.
+        """
+        name = hashlib.sha512(b'abc').hexdigest()
+        self.make_dir('backups/files')
+        self.write_file('backups/files/' + name, 'abc')
+        ExecutionContext()['backup_dir'] = self.get_fullname('backups')
+        fake_args = mock.Mock()
+        fake_args.jobs = 1
+
+        migrate.main(fake_args)
+
+        assert name not in self.listdir('backups/files')
+        assert BackupStore(self.get_backup_path('backups')).names() == \
+            set([name])
+        assert self.read_backup('backups', name) == 'abc'
+
+    @istest
+    def migrate_no_backups(self):
+        """
+        Unit: Migrate Command Without Backups
+        Checks that the migrate-backups main function does nothing when
+        there is no files directory in backup_dir.
+        """
+        ExecutionContext()['backup_dir'] = self.get_fullname('backups')
+        fake_args = mock.Mock()
+        fake_args.jobs = 1
+
+        migrate.main(fake_args)
+
+        assert not self.exists('backups')
@@ -252,3 +252,106 @@ def template_sub():
     assert conf.template('$HOME') == full_path('user1_homedir')
     assert (conf.template('$HOME/bin/program') ==
             paths.pjoin(full_path('user1_homedir'), 'bin/program'))
+
+
+@istest
+@with_setup(setup_os1, teardown_patches)
+def template_sub_env_modified():
+    """
+    Unit: Configuration Variable Substitution After Environment Change
+    Tests that substitutions reflect changes to the environment, whether it
+    is modified or replaced, even when they have been made before.
+    """
+    conf = config.SALVEConfig()
+    assert conf.template('$USER/x') == 'user1/x'
+
+    conf.env['USER'] = 'user2'
+    assert conf.template('$USER/x') == 'user2/x'
+
+    conf.env.update(USER='user3')
+    assert conf.template('$USER/x') == 'user3/x'
+
+    del conf.env['USER']
+    ensure_except(KeyError, conf.template, '$USER/x')
+
+    conf.env = {'USER': 'user4'}
+    assert conf.template('$USER/x') == 'user4/x'
+
+
+@istest
+@with_setup(setup_os1, teardown_patches)
+def template_cache_bounded():
+    """
+    Unit: Configuration Substitution Cache Is Bounded
+    Tests that the cache of substitutions never holds more than
+    TEMPLATE_CACHE_SIZE of them.
+    """
+    conf = config.SALVEConfig()
+    for i in range(config.salveconfig.TEMPLATE_CACHE_SIZE + 10):
+        assert conf.template('$USER/%d' % i) == 'user1/%d' % i
+        assert (len(conf._template_cache) <=
+                config.salveconfig.TEMPLATE_CACHE_SIZE)
+
+
+@istest
+@with_setup(setup_os1, teardown_patches)
+def apply_to_block_precedence():
+    """
+    Unit: Configuration Apply To Block
+    Tests that block attributes take precedence over those for the block's
+    type, which take precedence over the defaults, and that every value is
+    templated exactly once.
+    """
+    conf = config.SALVEConfig(
+        filename=full_path('block_precedence.ini'))
+    conf.env['DOLLAR'] = '$USER'
+
+    block = mock.Mock()
+    block.block_type = 'FILE'
+    block.attrs = {'target': '$HOME/x', 'source': '$DOLLAR'}
+    block.__setitem__ = lambda self, k, v: self.attrs.__setitem__(k, v)
+
+    conf.apply_to_block(block)
+
+    assert block.attrs['target'] == full_path('user1_homedir') + '/x'
+    assert block.attrs['source'] == '$USER'
+    assert block.attrs['mode'] == '644'
+    assert block.attrs['user'] == 'user1'
+
+
+@istest
+@with_setup(setup_os1, teardown_patches)
+def unsupported_hash_algorithm():
+    """
+    Unit: Configuration Unsupported Hash Algorithm
+    Checks that a hash_algorithm which hashlib does not provide is an
+    error when the config is loaded, rather than when a file is hashed.
+    """
+    e = ensure_except(SALVEException, config.SALVEConfig,
+                      filename=full_path('bad_hash_algorithm.ini'))
+    assert e.message == 'Unsupported hash_algorithm "nosuchhash"'
+
+
+@istest
+@with_setup(setup_os1, teardown_patches)
+def variable_length_hash_algorithm():
+    """
+    Unit: Configuration Variable Length Hash Algorithm
+    Checks that a hash_algorithm whose digests have no fixed length, and so
+    cannot name backups, is an error when the config is loaded.
+    """
+    e = ensure_except(SALVEException, config.SALVEConfig,
+                      filename=full_path('shake_hash_algorithm.ini'))
+    assert e.message == 'Unsupported hash_algorithm "shake_128"'
+
+
+@istest
+def unsupported_backup_compression():
+    """
+    Unit: Configuration Unsupported Backup Compression
+    Checks that a backup_compression which the backup store cannot write is
+    an error when the config is loaded.
+    """
+    e = ensure_except(SALVEException, config.SALVEConfig,
+                      filename=full_path('bad_backup_compression.ini'))
+    assert e.message == 'Unsupported backup_compression "bzip2"'
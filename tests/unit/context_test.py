@@ -71,3 +71,19 @@ def execctx_contains():
         startphase=context.ExecutionContext.phases.STARTUP)
     ctx['x'] = 1
     assert 'x' in ctx
+
+
+@istest
+def filectx_factory_shares_contexts():
+    """
+    Unit: FileContextFactory Shares FileContexts
+    Tests that a FileContextFactory returns one FileContext per line, which
+    is indistinguishable from one built directly.
+    """
+    factory = context.FileContextFactory('/a/b/c')
+    ctx = factory(10)
+    assert factory(10) is ctx
+    assert factory(11) is not ctx
+    assert factory(11).filename is ctx.filename
+    assert repr(ctx) == repr(context.FileContext('/a/b/c', lineno=10))
+    assert str(factory()) == '/a/b/c', str(factory())
@@ -0,0 +1,180 @@
+#!/usr/bin/python
+
+import os
+
+import mock
+
+from nose.tools import istest
+from tests.util import ensure_except, scratch
+
+from salve.action import ShellAction
+from salve.context import FileContext
+from salve.filesys import CachingFilesys, access_codes
+
+
+class TestWithScratchdir(scratch.ScratchContainer):
+    @istest
+    def stat_cached(self):
+        """
+        Unit: Filesys Caching Stat Is Cached
+        Checks that repeated lookups of the same path make a single lstat()
+        call, and that they are counted as saved syscalls.
+        """
+        self.write_file('a', 'abc')
+        name = self.get_fullname('a')
+        fs = CachingFilesys()
+
+        with mock.patch('os.lstat', side_effect=os.lstat) as mock_lstat:
+            assert fs.stat(name).st_size == 3
+            assert fs.exists(name)
+            assert fs.access(name, access_codes.F_OK)
+            assert fs.lookup_type(name) is fs.element_types.FILE
+        assert mock_lstat.call_count == 1
+        # lookup_type would have made three calls
+        assert (fs.syscalls, fs.saved) == (1, 5)
+        assert 'saved 5 of 6 lookup syscalls' in fs.report()
+
+    @istest
+    def missing_cached(self):
+        """
+        Unit: Filesys Caching Missing Path Is Cached
+        Checks that a path which does not exist is remembered as missing,
+        and that stat() still raises an OSError for it.
+        """
+        name = self.get_fullname('a')
+        fs = CachingFilesys()
+
+        assert not fs.exists(name)
+        e = ensure_except(OSError, fs.stat, name)
+        assert e.errno == 2
+        assert fs.lookup_type(name) is None
+        assert fs.syscalls == 1
+
+    @istest
+    def create_invalidates(self):
+        """
+        Unit: Filesys Caching Creation Invalidates
+        Checks that creating a file, directory or link forgets that it, and
+        its ancestors, were missing.
+        """
+        fs = CachingFilesys()
+        for name in ['a', 'b', 'b/c', 'd', 'e']:
+            assert not fs.exists(self.get_fullname(name))
+
+        fs.touch(self.get_fullname('a'))
+        fs.mkdir(self.get_fullname('b/c'))
+        fs.symlink(self.get_fullname('a'), self.get_fullname('d'))
+        with fs.open(self.get_fullname('e'), 'w') as f:
+            f.write('abc')
+
+        for name in ['a', 'b', 'b/c', 'd']:
+            assert fs.exists(self.get_fullname(name)), name
+        assert fs.lookup_type(self.get_fullname('d')) is fs.element_types.LINK
+        assert fs.stat(self.get_fullname('e')).st_size == 3
+
+    @istest
+    def modify_invalidates(self):
+        """
+        Unit: Filesys Caching Chmod And Copy Invalidate
+        Checks that chmod() and copy() forget the stat() of their targets,
+        and of other links to the same file.
+        """
+        self.write_file('a', 'abc')
+        self.write_file('b', 'abcdef')
+        os.link(self.get_fullname('a'), self.get_fullname('a2'))
+        fs = CachingFilesys()
+        a, a2 = self.get_fullname('a'), self.get_fullname('a2')
+
+        assert fs.stat(a2).st_size == 3
+        fs.chmod(a, 0o600)
+        assert fs.stat(a2).st_mode & 0o777 == 0o600
+        fs.copy(self.get_fullname('b'), a)
+        assert fs.stat(a).st_size == 6
+        assert fs.stat(a2).st_size == 6
+
+    @istest
+    def shell_invalidates(self):
+        """
+        Unit: Filesys Caching Shell Action Invalidates
+        Checks that a ShellAction makes the filesys forget everything, since
+        the command may change any file.
+        """
+        name = self.get_fullname('a')
+        fs = CachingFilesys()
+        assert not fs.exists(name)
+
+        ShellAction('touch ' + name, FileContext('no such file'))(fs)
+
+        assert fs.exists(name)
+
+    @istest
+    def tree_invalidates_subtree(self):
+        """
+        Unit: Filesys Caching Tree Changes Forget Only The Tree
+        Checks that chmoding a tree forgets the paths in it, and other links
+        to the files in it, but keeps what is known about other paths.
+        """
+        self.make_dir('t')
+        self.write_file('t/a', 'abc')
+        self.write_file('tt', 'abc')
+        self.write_file('other', 'abc')
+        os.link(self.get_fullname('t/a'), self.get_fullname('link'))
+        names = [self.get_fullname(n) for n in ['t/a', 'tt', 'other', 'link']]
+        fs = CachingFilesys()
+        for name in names:
+            fs.stat(name)
+            fs.access(name, access_codes.R_OK)
+
+        fs.chmod_tree(self.get_fullname('t'), 0o700)
+
+        with mock.patch('os.lstat', side_effect=os.lstat) as mock_lstat:
+            for name in names:
+                fs.stat(name)
+        assert [c[0][0] for c in mock_lstat.call_args_list] == \
+            [names[0], names[3]]
+        assert fs.stat(names[3]).st_mode & 0o777 == 0o700
+        assert names[2] in fs.access_results
+
+    @istest
+    def store_keeps_cache(self):
+        """
+        Unit: Filesys Caching Backups Keep Other Paths
+        Checks that storing a backup forgets only what is inside of the
+        store, not the file backed up or the store directory itself.
+        """
+        self.make_dir('store')
+        self.write_file('a', 'abc')
+        a, store = self.get_fullname('a'), self.get_fullname('store')
+        fs = CachingFilesys()
+        fs.stat(a)
+        fs.stat(store)
+
+        fs.store_hashed(a, store)
+
+        with mock.patch('os.lstat', side_effect=os.lstat) as mock_lstat:
+            fs.stat(a)
+            fs.stat(store)
+        assert mock_lstat.call_count == 0
+
+    @istest
+    def write_keeps_access_results(self):
+        """
+        Unit: Filesys Caching Writes Keep Other Access Results
+        Checks that writing a file forgets only the access() results of it,
+        its ancestors and symlinks, rather than all of them.
+        """
+        self.write_file('a', 'abc')
+        self.write_file('b', 'abc')
+        os.symlink(self.get_fullname('b'), self.get_fullname('c'))
+        a, b, c = [self.get_fullname(n) for n in ['a', 'b', 'c']]
+        fs = CachingFilesys()
+        for name in [a, b, c]:
+            fs.stat(name)
+            assert fs.access(name, access_codes.W_OK)
+
+        with fs.open(b, 'w') as f:
+            f.write('def')
+
+        assert a in fs.access_results
+        assert b not in fs.access_results
+        assert c not in fs.access_results
@@ -118,6 +118,25 @@ class TestWithScratchdir(scratch.ScratchContainer):
         assert os.path.isfile(self.get_fullname('z/a/b/f1'))
         assert content == self.read_file('z/a/b/f1')
 
+    @istest
+    def scandir_entries(self):
+        """
+        Unit: Filesys Concrete Scandir
+        Scanning a directory must give its entries, with links to dirs as
+        dirs, and scanning a missing directory must give nothing.
+        """
+        self.make_dir('a/b')
+        self.write_file('a/f1', '')
+        os.symlink(self.get_fullname('a/b'), self.get_fullname('a/l1'))
+
+        fs = ConcreteFilesys()
+        entries = dict((e.name, (e.is_dir(), e.is_symlink()))
+                       for e in fs.scandir(self.get_fullname('a')))
+        assert entries == {'b': (True, False), 'f1': (False, False),
+                           'l1': (True, True)}, entries
+
+        assert list(fs.scandir(self.get_fullname('nonexistent'))) == []
+
     @istest
     def create_file(self):
         """
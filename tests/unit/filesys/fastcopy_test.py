@@ -0,0 +1,121 @@
+#!/usr/bin/python
+
+import errno
+import os
+import shutil
+
+import mock
+
+from nose.tools import istest
+from tests.util import ensure_except, scratch
+
+from salve.filesys import fastcopy
+
+
+def unsupported(*args, **kwargs):
+    raise OSError(errno.EXDEV, 'Invalid cross-device link')
+
+
+class TestWithScratchdir(scratch.ScratchContainer):
+    def setUp(self):
+        scratch.ScratchContainer.setUp(self)
+        fastcopy._unsupported.clear()
+
+    def tearDown(self):
+        scratch.ScratchContainer.tearDown(self)
+        fastcopy._unsupported.clear()
+
+    @istest
+    def copy_file_contents(self):
+        """
+        Unit: Fastcopy Copies File Contents
+        Checks that a file is copied over an existing, longer file by one of
+        the strategies.
+        """
+        self.write_file('a', 'abc' * 1000)
+        self.write_file('b', 'x' * 5000)
+
+        strategy = fastcopy.copy_file(self.get_fullname('a'),
+                                      self.get_fullname('b'))
+
+        assert strategy in fastcopy.strategies
+        assert self.read_file('b') == 'abc' * 1000
+
+    @istest
+    def copy_file_falls_back(self):
+        """
+        Unit: Fastcopy Falls Back To Sendfile
+        Checks that a strategy which is unsupported is not used, and not
+        tried again between the same filesystems.
+        """
+        if not hasattr(os, 'sendfile'):  # pragma: no cover
+            return
+        self.write_file('a', 'abc')
+
+        with mock.patch('fcntl.ioctl', side_effect=unsupported) as ioctl:
+            with mock.patch('os.copy_file_range', side_effect=unsupported,
+                            create=True):
+                for name in ['b', 'c']:
+                    strategy = fastcopy.copy_file(self.get_fullname('a'),
+                                                  self.get_fullname(name))
+                    assert strategy is fastcopy.strategies.SENDFILE
+                    assert self.read_file(name) == 'abc'
+
+        assert ioctl.call_count == 1
+
+    @istest
+    def copy_file_reflink_ioerror(self):
+        """
+        Unit: Fastcopy Falls Back When Reflink Raises IOError
+        Checks that an unsupported reflink is skipped when the ioctl raises
+        an IOError, as it does on Python 2, rather than failing the copy.
+        """
+        self.write_file('a', 'abc')
+
+        def ioctl_unsupported(*args, **kwargs):
+            raise IOError(errno.EOPNOTSUPP, 'Operation not supported')
+
+        with mock.patch('fcntl.ioctl', side_effect=ioctl_unsupported):
+            strategy = fastcopy.copy_file(self.get_fullname('a'),
+                                          self.get_fullname('b'))
+
+        assert strategy is not fastcopy.strategies.REFLINK
+        assert self.read_file('b') == 'abc'
+
+    @istest
+    def copy_file_userspace(self):
+        """
+        Unit: Fastcopy Falls Back To Userspace
+        Checks that a file is copied by reading and writing it when no
+        kernel strategy is supported, even after one copied part of it.
+        """
+        self.write_file('a', 'abc')
+
+        def partial_sendfile(out_fd, in_fd, offset, count):
+            os.write(out_fd, b'a')
+            unsupported()
+
+        with mock.patch('fcntl.ioctl', side_effect=unsupported):
+            with mock.patch('os.copy_file_range', side_effect=unsupported,
+                            create=True):
+                with mock.patch('os.sendfile', partial_sendfile,
+                                create=True):
+                    strategy = fastcopy.copy_file(self.get_fullname('a'),
+                                                  self.get_fullname('b'))
+
+        assert strategy is fastcopy.strategies.USERSPACE
+        assert self.read_file('b') == 'abc'
+
+    @istest
+    def copy_file_same_file(self):
+        """
+        Unit: Fastcopy Refuses To Copy A File Over Itself
+        Checks that copying a file to a link to itself raises an error,
+        rather than truncating it.
+        """
+        self.write_file('a', 'abc')
+        os.symlink(self.get_fullname('a'), self.get_fullname('b'))
+
+        ensure_except(shutil.Error, fastcopy.copy_file,
+                      self.get_fullname('a'), self.get_fullname('b'))
+        assert self.read_file('a') == 'abc'
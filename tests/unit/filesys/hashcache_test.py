@@ -0,0 +1,164 @@
+#!/usr/bin/python
+
+import hashlib
+import os
+
+import mock
+
+from nose.tools import istest
+from tests.util import scratch
+
+import salve.util
+from salve.filesys.hashcache import HashCache
+
+
+class TestWithScratchdir(scratch.ScratchContainer):
+    def setUp(self):
+        scratch.ScratchContainer.setUp(self)
+        # the files written by the tests are new, so let their hashes be
+        # stored anyway
+        self.racy_patch = mock.patch('salve.filesys.hashcache.RACY_SECONDS',
+                                     -60)
+        self.racy_patch.start()
+        self.cache_path = self.get_fullname('cache/hashes.json')
+
+    def tearDown(self):
+        self.racy_patch.stop()
+        scratch.ScratchContainer.tearDown(self)
+
+    def hash_a(self, cache):
+        def fake_hash(path):
+            return 'h-' + salve.util.configured_hash_algorithm()
+
+        with mock.patch('salve.util.hash_from_path',
+                        side_effect=fake_hash) as hasher:
+            digest = cache.hash_from_path(self.get_fullname('a'))
+        return digest, hasher.call_count
+
+    @istest
+    def hash_cache_persists(self):
+        """
+        Unit: Hash Cache Reuses Hashes Across Runs
+        Checks that a file hashed by one run is not hashed again by a later
+        one, through the saved cache file.
+        """
+        self.write_file('a', 'abc')
+        cache = HashCache(self.cache_path)
+        digest = cache.hash_from_path(self.get_fullname('a'))
+        assert digest == hashlib.sha512(b'abc').hexdigest()
+        cache.save()
+
+        cache = HashCache(self.cache_path)
+        assert self.hash_a(cache) == (digest, 0)
+        assert (cache.hits, cache.misses) == (1, 0)
+
+    @istest
+    def hash_cache_changed_file(self):
+        """
+        Unit: Hash Cache Rehashes Changed File
+        Checks that a file is hashed again once it is rewritten, even with
+        the same size and mtime.
+        """
+        self.write_file('a', 'abc')
+        name = self.get_fullname('a')
+        cache = HashCache(self.cache_path)
+        cache.hash_from_path(name)
+        st = os.stat(name)
+
+        self.write_file('a', 'xyz')
+        os.utime(name, (st.st_atime, st.st_mtime))
+
+        assert cache.hash_from_path(name) == \
+            hashlib.sha512(b'xyz').hexdigest()
+        assert cache.misses == 2
+
+    @istest
+    def hash_cache_algorithm(self):
+        """
+        Unit: Hash Cache Keyed On Algorithm
+        Checks that a hash made with one algorithm is not reused once another
+        is configured.
+        """
+        self.write_file('a', 'abc')
+        cache = HashCache(self.cache_path)
+        assert self.hash_a(cache) == ('h-sha512', 1)
+
+        with mock.patch('salve.util.configured_hash_algorithm',
+                        return_value='md5'):
+            assert self.hash_a(cache) == ('h-md5', 1)
+        assert self.hash_a(cache) == ('h-sha512', 0)
+
+    @istest
+    def hash_cache_eviction(self):
+        """
+        Unit: Hash Cache Evicts Least Recently Used
+        Checks that the cache never holds more than its maximum number of
+        hashes, and evicts the one used least recently.
+        """
+        for name in ['a', 'b', 'c']:
+            self.write_file(name, name)
+        cache = HashCache(self.cache_path, max_entries=2)
+        for name in ['a', 'b', 'a', 'c']:
+            cache.hash_from_path(self.get_fullname(name))
+        cache.save()
+
+        cache = HashCache(self.cache_path, max_entries=2)
+        assert len(cache.entries) == 2
+        cache.hash_from_path(self.get_fullname('a'))
+        cache.hash_from_path(self.get_fullname('b'))
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    @istest
+    def hash_cache_corrupt(self):
+        """
+        Unit: Hash Cache Ignores Corrupt File
+        Checks that a cache file which cannot be read is treated as empty,
+        and replaced when the cache is saved.
+        """
+        self.make_dir('cache')
+        self.write_file('cache/hashes.json', '{"version": 1, "entr')
+        self.write_file('a', 'abc')
+        cache = HashCache(self.cache_path)
+        assert len(cache.entries) == 0
+        cache.hash_from_path(self.get_fullname('a'))
+        cache.save()
+
+        assert len(HashCache(self.cache_path).entries) == 1
+        assert self.listdir('cache') == ['hashes.json']
+
+    @istest
+    def hash_cache_no_load(self):
+        """
+        Unit: Hash Cache Rehash Ignores Stored Hashes
+        Checks that a cache which is not loaded hashes every file again, and
+        replaces the stored hashes with the new ones.
+        """
+        self.write_file('a', 'abc')
+        self.write_file('b', 'b')
+        cache = HashCache(self.cache_path)
+        cache.hash_from_path(self.get_fullname('b'))
+        self.hash_a(cache)
+        cache.save()
+
+        cache = HashCache(self.cache_path, load=False)
+        assert self.hash_a(cache) == ('h-sha512', 1)
+        cache.save()
+
+        cache = HashCache(self.cache_path)
+        assert list(cache.entries.values()) == ['h-sha512']
+
+    @istest
+    def hash_cache_racy_file(self):
+        """
+        Unit: Hash Cache Skips Recently Changed File
+        Checks that the hash of a file changed just before it was hashed is
+        not stored, since it might change again without changing its key.
+        """
+        self.racy_patch.stop()
+        self.write_file('a', 'abc')
+        cache = HashCache(self.cache_path)
+        cache.hash_from_path(self.get_fullname('a'))
+        self.racy_patch.start()
+
+        assert len(cache.entries) == 0
+        assert not cache.dirty
@@ -0,0 +1,219 @@
+#!/usr/bin/python
+
+import hashlib
+import io
+import os
+import zlib
+
+from nose.tools import istest
+from tests.util import ensure_except, scratch
+
+from salve.filesys.store import BackupStore, _CompressedWriter
+
+
+def sha512(content):
+    return hashlib.sha512(content.encode('utf-8')).hexdigest()
+
+
+class TestWithScratchdir(scratch.ScratchContainer):
+    def setUp(self):
+        scratch.ScratchContainer.setUp(self)
+        self.make_dir('files')
+        self.root = self.get_fullname('files')
+
+    def restored(self, store, name):
+        dst = self.get_fullname('restored')
+        store.restore(name, dst)
+        try:
+            return self.read_file('restored')
+        finally:
+            os.remove(dst)
+
+    @istest
+    def store_packs_small_files(self):
+        """
+        Unit: Backup Store Packs Small Files
+        Checks that files below the pack threshold are appended to a single
+        pack, with each distinct content stored only once.
+        """
+        for (name, content) in [('a', 'abc'), ('b', 'def'), ('c', 'abc')]:
+            self.write_file(name, content)
+        store = BackupStore(self.root)
+        names = [store.add_file(self.get_fullname(name))
+                 for name in ['a', 'b', 'c']]
+        store.close()
+
+        assert names == [sha512('abc'), sha512('def'), sha512('abc')]
+        assert sorted(self.listdir('files')) == ['packs']
+        assert len(self.listdir('files/packs')) == 2
+        store = BackupStore(self.root)
+        assert store.names() == set(names)
+        assert self.restored(store, names[1]) == 'def'
+
+    @istest
+    def store_shards_compressed_files(self):
+        """
+        Unit: Backup Store Shards Compressed Files
+        Checks that files above the pack threshold are stored compressed, in
+        a directory named by the start of their hash, with each compression.
+        """
+        content = 'x' * 5000
+        self.write_file('a', content)
+        for (compression, suffix) in [('none', ''), ('zlib', '.z'),
+                                      ('lzma', '.xz')]:
+            self.make_dir('files/' + compression)
+            store = BackupStore(self.get_fullname('files/' + compression),
+                                compression=compression, pack_threshold=100)
+            name = store.add_file(self.get_fullname('a'))
+            path = 'files/{0}/{1}/{2}{3}'.format(compression, name[:2],
+                                                 name, suffix)
+            assert self.exists(path), path
+            if compression != 'none':
+                assert os.path.getsize(self.get_fullname(path)) < 5000
+            assert self.restored(store, name) == content
+
+    @istest
+    def store_reads_flat_backups(self):
+        """
+        Unit: Backup Store Reads Flat Backups
+        Checks that objects stored flat in the files directory, by earlier
+        versions, are found without being stored again.
+        """
+        self.write_file('files/' + sha512('abc'), 'abc')
+        self.write_file('a', 'abc')
+        store = BackupStore(self.root)
+
+        assert store.add_file(self.get_fullname('a')) == sha512('abc')
+        assert self.listdir('files') == [sha512('abc')]
+        assert self.restored(store, sha512('abc')) == 'abc'
+
+    @istest
+    def store_migrate(self):
+        """
+        Unit: Backup Store Migrates Flat Backups
+        Checks that migrating moves flat objects into packs and shards, and
+        that they can be restored afterwards.
+        """
+        contents = ['abc', 'y' * 500]
+        for content in contents:
+            self.write_file('files/' + sha512(content), content)
+        os.symlink('target', self.get_fullname('files/link'))
+        store = BackupStore(self.root, compression='zlib',
+                            pack_threshold=100)
+
+        assert store.migrate(jobs=2) == 3
+        store.close()
+
+        big = sha512(contents[1])
+        assert sorted(self.listdir('files')) == sorted(['packs', big[:2],
+                                                        'li'])
+        store = BackupStore(self.root)
+        assert store.names() == set([sha512('abc'), big, 'link'])
+        for content in contents:
+            assert self.restored(store, sha512(content)) == content
+        store.restore('link', self.get_fullname('link'))
+        assert os.readlink(self.get_fullname('link')) == 'target'
+
+    @istest
+    def store_ignores_incomplete_index(self):
+        """
+        Unit: Backup Store Ignores Incomplete Index Lines
+        Checks that an index line which was cut short, or which refers past
+        the end of its pack, does not make an object appear stored.
+        """
+        self.write_file('a', 'abc')
+        store = BackupStore(self.root)
+        name = store.add_file(self.get_fullname('a'))
+        store.close()
+        idx = [n for n in self.listdir('files/packs') if n.endswith('.idx')]
+        with open(self.get_fullname('files/packs/' + idx[0]), 'a') as f:
+            f.write('bad 3 100 none\ntruncated 0')
+
+        store = BackupStore(self.root)
+        assert store.names() == set([name])
+        ensure_except(KeyError, store.restore, 'bad',
+                      self.get_fullname('restored'))
+
+    @istest
+    def store_reuses_packs(self):
+        """
+        Unit: Backup Store Appends To Existing Packs
+        Checks that a store appends to a pack left by an earlier one, rather
+        than starting a pack for every run, but not to one which another
+        store is still appending to.
+        """
+        names = []
+        for content in ['abc', 'def']:
+            self.write_file('a', content)
+            store = BackupStore(self.root)
+            names.append(store.add_file(self.get_fullname('a')))
+            store.close()
+        assert len(self.listdir('files/packs')) == 2
+
+        self.write_file('a', 'ghi')
+        self.write_file('b', 'jkl')
+        first = BackupStore(self.root)
+        second = BackupStore(self.root)
+        names.append(first.add_file(self.get_fullname('a')))
+        names.append(second.add_file(self.get_fullname('b')))
+        first.close()
+        second.close()
+        assert len(self.listdir('files/packs')) == 4
+
+        store = BackupStore(self.root)
+        assert [self.restored(store, name) for name in names] == \
+            ['abc', 'def', 'ghi', 'jkl']
+
+    @istest
+    def store_trims_incomplete_index(self):
+        """
+        Unit: Backup Store Trims Incomplete Index Before Appending
+        Checks that an incomplete last index line is removed before more
+        objects are appended to its pack, so that it does not run into the
+        next line.
+        """
+        self.write_file('a', 'abc')
+        store = BackupStore(self.root)
+        store.add_file(self.get_fullname('a'))
+        store.close()
+        idx = [n for n in self.listdir('files/packs') if n.endswith('.idx')]
+        idx_path = 'files/packs/' + idx[0]
+        with open(self.get_fullname(idx_path), 'a') as f:
+            f.write('truncated 0')
+
+        self.write_file('b', 'def')
+        store = BackupStore(self.root)
+        name = store.add_file(self.get_fullname('b'))
+        store.close()
+
+        lines = self.read_file(idx_path).splitlines()
+        assert len(lines) == 2
+        assert lines[1].startswith(name + ' 3 ')
+        assert self.restored(BackupStore(self.root), name) == 'def'
+
+    @istest
+    def store_shards_by_digest(self):
+        """
+        Unit: Backup Store Shards By Digest
+        Checks that objects named by another algorithm than the default are
+        sharded by their digests, not by the algorithm name.
+        """
+        store = BackupStore(self.root)
+        assert store._shard_path('md5-abcdef') == \
+            os.path.join(self.root, 'ab', 'md5-abcdef')
+
+    @istest
+    def compressed_writer_memoryview(self):
+        """
+        Unit: Compressed Writer Accepts Memoryviews
+        Checks that data written as memoryview slices, as hash_copy writes
+        it, is compressed, as Python 2's zlib does not accept them directly.
+        """
+        f = io.BytesIO()
+        writer = _CompressedWriter(f, 'zlib')
+        view = memoryview(bytearray(b'abcdef'))
+        writer.write(view[:3])
+        writer.write(view[3:])
+        writer.finish()
+
+        assert zlib.decompress(f.getvalue()) == b'abcdef'
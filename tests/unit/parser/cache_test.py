@@ -0,0 +1,147 @@
+import os
+
+import mock
+from nose.tools import istest
+
+from salve.block import FileBlock, ManifestBlock
+from salve.context import ExecutionContext
+from salve.parser import cache
+
+from tests.util import scratch
+
+manifest_content = ('manifest /a/b/c\n' +
+                    'file {\n    source "x y"\n    target z\n}\n')
+
+
+def assert_blocks_equal(blocks1, blocks2):
+    assert len(blocks1) == len(blocks2)
+    for (b1, b2) in zip(blocks1, blocks2):
+        assert type(b1) is type(b2)
+        assert b1.attrs == b2.attrs
+        assert str(b1.file_context) == str(b2.file_context)
+
+
+class TestParseCache(scratch.ScratchContainer):
+    def setUp(self):
+        scratch.ScratchContainer.setUp(self)
+        self.write_file('1.man', manifest_content)
+        self.man_path = self.get_fullname('1.man')
+        self.cache = cache.ParseCache(self.get_fullname('cache'))
+
+    def _entries(self):
+        return [f for f in self.listdir('cache') if f.endswith('.json')]
+
+    @istest
+    def miss_then_hit(self):
+        """
+        Unit: Parse Cache Miss Then Hit
+        Checks that parsing a manifest a second time loads the blocks from
+        the cache, without tokenizing, and that they match the originals.
+        """
+        first = self.cache.parse_file(self.man_path)
+        assert self.cache.misses == 1
+        assert len(self._entries()) == 1
+
+        with mock.patch('salve.parser.cache.parse_stream') as mock_parse:
+            second = self.cache.parse_file(self.man_path)
+            assert not mock_parse.called
+        assert self.cache.hits == 1
+
+        assert_blocks_equal(first, second)
+        assert isinstance(second[0], ManifestBlock)
+        assert isinstance(second[1], FileBlock)
+        assert second[1]['source'] == 'x y'
+        # loaded blocks must be new objects, since expansion modifies them
+        assert second[1] is not first[1]
+
+    @istest
+    def changed_manifest_invalidates(self):
+        """
+        Unit: Parse Cache Invalidated By Manifest Change
+        Checks that changing a manifest causes it to be reparsed, even if its
+        size and mtime are unchanged.
+        """
+        self.cache.parse_file(self.man_path)
+        st = os.stat(self.man_path)
+
+        self.write_file('1.man', manifest_content.replace('x y', 'x q'))
+        os.utime(self.man_path, (st.st_atime, st.st_mtime))
+
+        blocks = self.cache.parse_file(self.man_path)
+        assert self.cache.misses == 2
+        assert blocks[1]['source'] == 'x q'
+
+    @istest
+    def corrupt_entry_is_miss(self):
+        """
+        Unit: Parse Cache Corrupt Entry Is A Miss
+        Checks that an unreadable cache entry is ignored and rewritten.
+        """
+        first = self.cache.parse_file(self.man_path)
+        entry = self._entries()[0]
+        self.write_file(os.path.join('cache', entry), '{"version": 1, ')
+
+        second = self.cache.parse_file(self.man_path)
+        assert self.cache.misses == 2
+        assert_blocks_equal(first, second)
+
+        self.cache.parse_file(self.man_path)
+        assert self.cache.hits == 1
+
+    @istest
+    def eviction(self):
+        """
+        Unit: Parse Cache Size Bounded Eviction
+        Checks that writing entries beyond the size limit evicts the least
+        recently used ones.
+        """
+        self.cache.parse_file(self.man_path)
+        entry_size = os.path.getsize(
+            os.path.join(self.get_fullname('cache'), self._entries()[0]))
+        self.cache.max_size = entry_size * 2
+
+        for name in ('2.man', '3.man', '4.man'):
+            self.write_file(name, manifest_content)
+            self.cache.parse_file(self.get_fullname(name))
+
+        assert len(self._entries()) <= 2
+
+    @istest
+    def store_scans_once(self):
+        """
+        Unit: Parse Cache Scanned Once Below Size Limit
+        Checks that storing many entries lists the cache directory only
+        once, while the cache is below its size limit, and reads each
+        manifest only to hash it and to parse it.
+        """
+        names = ['{0}.man'.format(i) for i in range(2, 7)]
+        for name in names:
+            self.write_file(name, manifest_content)
+
+        with mock.patch('os.listdir', side_effect=os.listdir) as listdir:
+            with mock.patch('salve.parser.cache._file_digest',
+                            side_effect=cache._file_digest) as digest:
+                for name in names:
+                    self.cache.parse_file(self.get_fullname(name))
+
+        assert listdir.call_count == 1
+        assert digest.call_count == len(names)
+        assert len(self._entries()) == len(names)
+        assert self.cache.total == sum(
+            os.path.getsize(self.get_fullname('cache/' + e))
+            for e in self._entries())
+
+    @istest
+    def parse_manifest_without_cache(self):
+        """
+        Unit: Parse Manifest Without Parse Cache
+        Checks that parse_manifest parses directly when there is no
+        ParseCache in the ExecutionContext, and goes through it when there is.
+        """
+        blocks = cache.parse_manifest(self.man_path)
+        assert len(blocks) == 2
+        assert not self.exists('cache')
+
+        ExecutionContext()['parse_cache'] = self.cache
+        cache.parse_manifest(self.man_path)
+        assert self.cache.misses == 1
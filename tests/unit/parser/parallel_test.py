@@ -0,0 +1,168 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import mock
+from nose.tools import istest
+
+from salve.exceptions import ParsingException, TokenizationException
+from salve.parser import parallel, parse
+
+from tests.util import ensure_except, scratch
+
+# handle Py2 vs. Py3 StringIO change
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+manifest_content = (
+    '# a comment with a brace {\n' +
+    'file {\n    source "${HOME}/x y"\n    target z\n}\n' +
+    'manifest /a/b/c\n' +
+    'directory { source \'d}\' target e\\ f }\n' +
+    'file /g\n' +
+    'file {\n    source "multi\nline"\n    target h # trailing\n}\n'
+) * 5
+
+
+def describe(blocks):
+    return [(b.block_type, str(b.file_context), b.attrs) for b in blocks]
+
+
+@istest
+def find_boundary_simple():
+    """
+    Unit: Parallel Parser Finds Block Boundaries
+    Checks that the pre-scan finds the end of the last block which is closed
+    with a brace, and ignores braces in comments and quoted strings.
+    """
+    text = 'file { a b }\nfile { c "}x" # {\n}\nfile x'
+    assert parallel.find_boundary(text)[:2] == (len(text) - 7, True)
+    assert parallel.find_boundary('file x\nfile y')[:2] == (0, True)
+
+
+@istest
+def find_boundary_unsafe():
+    """
+    Unit: Parallel Parser Stops At Quoted Braces
+    Checks that the pre-scan gives up on text which the tokenizer may
+    read differently, keeping the boundaries found before it.
+    """
+    for bad in ['file "{" { }', 'file \\{ x }', 'file { { }', '}']:
+        text = 'file { a b }\n' + bad
+        assert parallel.find_boundary(text)[:2] == (12, False), bad
+
+
+@istest
+def find_boundary_resumes():
+    """
+    Unit: Parallel Parser Pre-Scan Resumes
+    Checks that the pre-scan stops at a quote which is not closed yet, and
+    picks up from there once the rest of the text is available.
+    """
+    text = 'file { a "b'
+    boundary, safe, pos, depth = parallel.find_boundary(text)
+    assert (boundary, safe, pos, depth) == (0, True, 9, 1)
+    text += ' } c" }'
+    assert parallel.find_boundary(text, pos, depth)[:2] == (len(text), True)
+
+
+@istest
+def split_stream_pieces():
+    """
+    Unit: Parallel Parser Splits Streams At Boundaries
+    Checks that a stream is split into pieces which end with a block, that
+    the pieces make up the whole stream, and that each piece has the line
+    number on which it starts.
+    """
+    for segment_size in (1, 7, 64, 2 ** 20):
+        pieces = list(parallel.split_stream(StringIO(manifest_content),
+                                            segment_size=segment_size))
+        assert ''.join(text for (text, lineno) in pieces) == manifest_content
+        consumed = ''
+        for (text, lineno) in pieces:
+            assert lineno == consumed.count('\n') + 1
+            consumed += text
+        for (text, lineno) in pieces[:-1]:
+            assert text.endswith('}')
+        if segment_size < 2 ** 20:
+            assert len(pieces) > 1
+
+
+class TestParallelParse(scratch.ScratchContainer):
+    def setUp(self):
+        scratch.ScratchContainer.setUp(self)
+        # threads stand in for processes, which keeps the tests fast and
+        # lets them see the mocked globals
+        patch = mock.patch('salve.parser.parallel._make_pool',
+                           ThreadPoolExecutor)
+        patch.start()
+        self.patches.add(patch)
+
+    def parse_both(self, content):
+        """
+        Parse @content serially and in parallel, checking that the results
+        are the same, and returning the parallel result.
+        """
+        self.write_file('1.man', content)
+        with open(self.get_fullname('1.man')) as f:
+            serial = parse.parse_stream(f)
+        with open(self.get_fullname('1.man')) as f:
+            blocks = list(parallel.generate_blocks_parallel(
+                f, 2, min_size=0, segment_size=16))
+        assert describe(blocks) == describe(serial)
+        return blocks
+
+    def ensure_same_error(self, content, exc_type):
+        self.write_file('1.man', content)
+        with open(self.get_fullname('1.man')) as f:
+            serial = ensure_except(exc_type, parse.parse_stream, f)
+        with open(self.get_fullname('1.man')) as f:
+            e = ensure_except(exc_type, list,
+                              parallel.generate_blocks_parallel(
+                                  f, 2, min_size=0, segment_size=16))
+        assert type(e) is type(serial)
+        assert str(e) == str(serial)
+        if hasattr(serial, 'file_context'):
+            assert str(e.file_context) == str(serial.file_context)
+
+    @istest
+    def parallel_matches_serial(self):
+        """
+        Unit: Parallel Parser Matches Serial Parser
+        Checks that parsing a manifest in pieces gives the same blocks, in the
+        same order and with the same FileContexts, as parsing it serially.
+        """
+        blocks = self.parse_both(manifest_content)
+        assert len(blocks) == 25
+        assert blocks[-1].file_context.lineno > 40
+
+    @istest
+    def parallel_small_input(self):
+        """
+        Unit: Parallel Parser Small Inputs
+        Checks that manifests which are too small to split, or which have no
+        block boundaries, are parsed correctly without the workers.
+        """
+        with mock.patch('salve.parser.parallel._make_pool') as make_pool:
+            self.parse_both('')
+            self.parse_both('file /a\nmanifest /b\n' * 10)
+            assert not make_pool.called
+
+    @istest
+    def parallel_errors_match_serial(self):
+        """
+        Unit: Parallel Parser Errors Match Serial Parser
+        Checks that the parallel parser raises the same errors, at the same
+        locations, as the serial parser, including the precedence of a
+        tokenization error over an earlier parsing error.
+        """
+        block = 'file { source a target b }\n'
+        self.ensure_same_error(block * 3 + 'foo { }\n' + block * 3,
+                               ParsingException)
+        self.ensure_same_error(block * 3 + 'file { source }\n' + block,
+                               TokenizationException)
+        self.ensure_same_error(block * 3 + 'foo { }\n' + block * 3 +
+                               'file { source }\n' + block,
+                               TokenizationException)
+        self.ensure_same_error(block * 3 + 'file { source "a',
+                               ValueError)
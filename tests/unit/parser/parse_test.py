@@ -4,8 +4,9 @@ from nose.tools import istest
 
 from salve import paths
 from salve.parser import parse, Token
-from salve.context import FileContext
+from salve.context import FileContext, ExecutionContext
 from salve.block import FileBlock, ManifestBlock
+from salve.exceptions import TokenizationException
 
 from tests.util import ensure_except, full_path, MockedGlobals
 
@@ -41,6 +42,12 @@ def _generate_tokens(*args):
     return [Token(name, ty, dummy_context) for (name, ty) in args]
 
 
+def _recording_iter(tokens, consumed):
+    for tok in tokens:
+        consumed.append(tok)
+        yield tok
+
+
 def _check_blocks(block_list, *args):
     assert len(block_list) == len(args)
 
@@ -227,3 +234,115 @@ class TestParsingMockedGlobals(MockedGlobals):
         _check_blocks(blocks, (FileBlock, 2))
         assert blocks[0][blocks[0].primary_attr] == "lobster"
         assert blocks[0]['source'] == "salad"
+
+    @istest
+    def generate_blocks_yields_closed_block_immediately(self):
+        """
+        Unit: Parser Yields Block On Block Close
+        Checks that generate_blocks yields a block as soon as its closing
+        brace is parsed, without consuming any further tokens.
+        """
+        tokens = _generate_tokens(
+            ('file', Token.types.IDENTIFIER), ('{', Token.types.BLOCK_START),
+            ('source', Token.types.IDENTIFIER),
+            ('/tmp/txt', Token.types.TEMPLATE), ('}', Token.types.BLOCK_END),
+            ('file', Token.types.IDENTIFIER), ('{', Token.types.BLOCK_START),
+            ('}', Token.types.BLOCK_END)
+        )
+        consumed = []
+        blocks = parse.generate_blocks(_recording_iter(tokens, consumed))
+
+        first = next(blocks)
+        assert first['source'] == '/tmp/txt'
+        assert len(consumed) == 5
+
+        _check_blocks(list(blocks), (FileBlock, 0))
+        assert len(consumed) == len(tokens)
+
+    @istest
+    def generate_blocks_yields_primary_attr_block_on_next_id(self):
+        """
+        Unit: Parser Yields Primary Attr Block On Next Identifier
+        Checks that generate_blocks yields a Primary Attribute style block
+        once the next block's identifier is parsed, and yields the final
+        block when the token stream ends.
+        """
+        tokens = _generate_tokens(
+            ('file', Token.types.IDENTIFIER), ('/a', Token.types.TEMPLATE),
+            ('manifest', Token.types.IDENTIFIER), ('/b', Token.types.TEMPLATE)
+        )
+        consumed = []
+        blocks = parse.generate_blocks(_recording_iter(tokens, consumed))
+
+        first = next(blocks)
+        assert first['target'] == '/a'
+        assert len(consumed) == 3
+
+        rest = list(blocks)
+        _check_blocks(rest, (ManifestBlock, 1))
+        assert rest[0]['source'] == '/b'
+
+    @istest
+    def tokenization_error_takes_precedence(self):
+        """
+        Unit: Parser Tokenization Error Precedes Parsing Error
+        Checks that when a file contains a parsing error followed by a
+        tokenization error, the TokenizationException is raised, just as it
+        was when the whole file was tokenized before parsing began.
+        """
+        e = ensure_except(TokenizationException, parse_filename,
+                          full_path('invalid_id_and_unclosed.manifest'))
+        assert (paths.clean_path(e.file_context.filename) ==
+                paths.clean_path(
+                    full_path('invalid_id_and_unclosed.manifest')))
+
+    @istest
+    def interleaved_streams(self):
+        """
+        Unit: Parser Several Streams At Once
+        Checks that two manifests can be parsed at the same time, with their
+        blocks interleaved, and get the same results as parsing each one on
+        its own.
+        """
+        names = ['primary_attr2.manifest', 'two_attr.manifest']
+        expect = [[(b.block_type, b.file_context.filename, b.attrs)
+                   for b in parse_filename(full_path(name))]
+                  for name in names]
+
+        files = [open(full_path(name)) for name in names]
+        try:
+            gens = [parse.generate_blocks_from_stream(f) for f in files]
+            got = [[], []]
+            done = [False, False]
+            while not all(done):
+                for i, gen in enumerate(gens):
+                    if done[i]:
+                        continue
+                    try:
+                        b = next(gen)
+                    except StopIteration:
+                        done[i] = True
+                        continue
+                    got[i].append((b.block_type, b.file_context.filename,
+                                   b.attrs))
+        finally:
+            for f in files:
+                f.close()
+        assert got == expect, (got, expect)
+
+    @istest
+    def parse_tokens_fills_context(self):
+        """
+        Unit: Parser Final State In ExecutionContext
+        Checks that the parser's final state and blocks are stored in the
+        ExecutionContext, as they were when the parser kept its state there.
+        """
+        blocks = parse.parse_tokens(_generate_tokens(
+            ('file', Token.types.IDENTIFIER), ('/a', Token.types.TEMPLATE)
+        ))
+        parsing_ctx = ExecutionContext()['parsing']
+        assert parsing_ctx['blocks'] == blocks
+        assert parsing_ctx['current_block'] is blocks[0]
+        assert not parsing_ctx['in_block']
+        assert parsing_ctx['expected_token_types'] == [
+            Token.types.BLOCK_START, Token.types.IDENTIFIER]
@@ -0,0 +1,122 @@
+import os
+import shlex
+
+from nose.tools import istest
+
+from salve.parser.scanner import scan, WORDCHARS
+
+from tests.util import ensure_except, testfile_dir
+
+# handle Py2 vs. Py3 StringIO change
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+
+def shlex_tokens(text):
+    """
+    The reference tokenization: shlex, configured as SALVE used it before
+    the scanner was introduced.
+    """
+    shlexer = shlex.shlex(StringIO(text), posix=True)
+    shlexer.wordchars = WORDCHARS
+    tokens = []
+    current = shlexer.get_token()
+    while current is not None:
+        tokens.append((current, shlexer.lineno))
+        current = shlexer.get_token()
+    return tokens
+
+
+def assert_matches_shlex(text):
+    expect = shlex_tokens(text)
+    got = list(scan(StringIO(text)))
+    assert got == expect, '{0!r}: {1} != {2}'.format(text, got, expect)
+
+
+@istest
+def scan_matches_shlex_on_testfiles():
+    """
+    Unit: Scanner Matches shlex On Test Manifests
+    Verifies that the scanner produces the same token values and line
+    numbers as shlex for every manifest in the testfiles directory.
+    """
+    for name in sorted(os.listdir(testfile_dir)):
+        if not name.endswith('.manifest'):
+            continue
+        with open(os.path.join(testfile_dir, name)) as f:
+            assert_matches_shlex(f.read())
+
+
+@istest
+def scan_matches_shlex_on_quoting():
+    """
+    Unit: Scanner Matches shlex On Quotes And Escapes
+    Verifies that quoted strings, escapes, and adjacent quoted segments are
+    joined and unquoted the same way that shlex does it.
+    """
+    for text in ['file "a b" {}',
+                 'file a"b c"d',
+                 "file 'a \\ b' \"c \\\" \\\\ \\d\"",
+                 'file \\{ x\\ y',
+                 'file ""',
+                 'file "multi\nline"\n{ }',
+                 'file a\\\nb c']:
+        assert_matches_shlex(text)
+
+
+@istest
+def scan_matches_shlex_on_comments_and_delimiters():
+    """
+    Unit: Scanner Matches shlex On Comments And Delimiters
+    Verifies that comments, braces adjacent to words, and other single
+    character tokens get the same values and line numbers as with shlex.
+    """
+    for text in ['file{source a}',
+                 'file # comment\n{\n  target b # more\n}',
+                 'file a#comment',
+                 'a;b:c',
+                 '\n\n  file\n\n{\n\n}\n\n']:
+        assert_matches_shlex(text)
+
+
+@istest
+def scan_unclosed_quote():
+    """
+    Unit: Scanner Unclosed Quote Fails
+    Ensures that an unterminated quote raises the same ValueError as shlex.
+    """
+    for text in ['file "a', "file b'a", 'file "a\\"']:
+        e = ensure_except(ValueError, list, scan(StringIO(text)))
+        assert str(e) == 'No closing quotation'
+
+
+@istest
+def scan_dangling_escape():
+    """
+    Unit: Scanner Dangling Escape Fails
+    Ensures that an escape at the end of input raises the same ValueError as
+    shlex.
+    """
+    for text in ['file \\', 'file a\\', 'file "a\\']:
+        e = ensure_except(ValueError, list, scan(StringIO(text)))
+        assert str(e) == 'No escaped character'
+
+
+@istest
+def scan_across_chunk_boundaries():
+    """
+    Unit: Scanner Tokens Spanning Chunk Boundaries
+    Verifies that tokens, quotes, escapes, and comments which are split
+    across reads from the stream are scanned exactly as if the stream had
+    been read all at once.
+    """
+    text = ('# leading comment\nfile "a quoted\nvalue" {\n' +
+            '  source a\\ b # trailing\n  target \'c d\'\n}\n' +
+            'manifest /x/y/z')
+    expect = shlex_tokens(text)
+    for chunk_size in (1, 2, 3, 5, 8):
+        got = list(scan(StringIO(text), chunk_size=chunk_size))
+        assert got == expect, '{0}: {1} != {2}'.format(chunk_size, got,
+                                                       expect)
@@ -1,7 +1,7 @@
 from nose.tools import istest
 
 from salve import paths
-from salve.context import FileContext
+from salve.context import FileContext, ExecutionContext
 from salve.parser import tokenize
 from salve.parser.tokenize import Token
 
@@ -189,3 +189,55 @@ class TestTokenizeMockedGlobals(MockedGlobals):
         file_tok = Token('file', Token.types.IDENTIFIER, ctx)
         assert (str(file_tok) ==
                 'Token(value=file,ty=IDENTIFIER,lineno=2,filename=a/b/c)')
+
+    @istest
+    def generate_tokens_is_lazy(self):
+        """
+        Unit: Tokenizer Generates Tokens Lazily
+        Checks that generate_tokens yields Tokens before the stream has been
+        read to the end, and that the results match tokenize_stream.
+        """
+        with open(full_path('primary_attr2.manifest')) as f:
+            tokens = tokenize.generate_tokens(f)
+            first = next(tokens)
+            assert first.ty == Token.types.IDENTIFIER
+            assert first.value == 'manifest'
+            rest = list(tokens)
+        assert_tokens_match_types(
+            [first] + rest,
+            id_and_template_tys + id_and_start_tys +
+            2*id_and_template_tys + [Token.types.BLOCK_END]
+        )
+
+    @istest
+    def tokens_share_file_contexts(self):
+        """
+        Unit: Tokenizer Tokens Share FileContexts
+        Checks that all of the Tokens on a line share a single FileContext,
+        and that all of the FileContexts for a manifest share one filename.
+        """
+        tokens = tokenize_filename(full_path('two_attr.manifest'))
+        # 'file {'
+        assert tokens[0].file_context is tokens[1].file_context
+        assert tokens[1].file_context is not tokens[2].file_context
+        for tok in tokens[1:]:
+            assert tok.file_context.filename is tokens[0].file_context.filename
+        assert (str(tokens[0].file_context) ==
+                str(FileContext(full_path('two_attr.manifest'), 3)))
+
+    @istest
+    def tokenize_stream_fills_context(self):
+        """
+        Unit: Tokenizer Final State In ExecutionContext
+        Checks that the tokenizer's final state and tokens are stored in the
+        ExecutionContext, as they were when the tokenizer kept its state
+        there.
+        """
+        tokens = tokenize_filename(full_path('two_attr.manifest'))
+        tokenizing_ctx = ExecutionContext()['tokenizing']
+        assert tokenizing_ctx['tokens'] == tokens
+        assert tokenizing_ctx['state'] == tokenize.tokenizing_states.FREE
+        assert tokenizing_ctx['filectx'] is tokens[-1].file_context
+        assert (tokenizing_ctx['filename'] ==
+                paths.clean_path(full_path('two_attr.manifest'),
+                                 absolute=True))
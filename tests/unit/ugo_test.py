@@ -65,6 +65,7 @@ def name_to_uid():
     mock_getpwnam = mock.Mock()
     mock_getpwnam.return_value = mock_pw
 
+    ugo.clear_cache()
     with mock.patch('pwd.getpwnam', mock_getpwnam):
         uuid = ugo.name_to_uid('user1')
 
@@ -84,8 +85,87 @@ def name_to_gid():
     mock_getgrnam = mock.Mock()
     mock_getgrnam.return_value = mock_gr
 
+    ugo.clear_cache()
     with mock.patch('grp.getgrnam', mock_getgrnam):
         gid = ugo.name_to_gid('group2')
 
     assert gid == 2000
     mock_getgrnam.assert_called_once_with('group2')
+
+
+@istest
+def name_to_uid_cached():
+    """
+    Unit: UID Lookups Cached
+
+    Checks that each username is only looked up once, and that the cache
+    hits and misses are counted.
+    """
+    mock_pw = mock.Mock()
+    mock_pw.pw_uid = 101
+    mock_getpwnam = mock.Mock()
+    mock_getpwnam.return_value = mock_pw
+
+    ugo.clear_cache()
+    with mock.patch('pwd.getpwnam', mock_getpwnam):
+        uids = [ugo.name_to_uid('user1') for _ in range(3)]
+
+    assert uids == [101, 101, 101]
+    mock_getpwnam.assert_called_once_with('user1')
+    assert ugo.cache_stats() == (2, 1)
+
+
+@istest
+def name_to_gid_failure_cached():
+    """
+    Unit: GID Lookup Failure Cached
+
+    Checks that an unknown groupname raises a KeyError every time, but is
+    only looked up once.
+    """
+    mock_getgrnam = mock.Mock()
+    mock_getgrnam.side_effect = KeyError('getgrnam(): name not found')
+
+    ugo.clear_cache()
+    with mock.patch('grp.getgrnam', mock_getgrnam):
+        for _ in range(2):
+            try:
+                ugo.name_to_gid('nosuchgroup')
+            except KeyError:
+                pass
+            else:
+                assert False, 'Expected a KeyError'
+
+    mock_getgrnam.assert_called_once_with('nosuchgroup')
+
+
+@istest
+def prefetch_names():
+    """
+    Unit: Prefetch Users And Groups
+
+    Checks that prefetched names, including unknown ones, are answered from
+    the cache afterwards.
+    """
+    mock_pw = mock.Mock()
+    mock_pw.pw_uid = 101
+    mock_getpwnam = mock.Mock()
+    mock_getpwnam.return_value = mock_pw
+    mock_getgrnam = mock.Mock()
+    mock_getgrnam.side_effect = KeyError('getgrnam(): name not found')
+
+    ugo.clear_cache()
+    with mock.patch('pwd.getpwnam', mock_getpwnam):
+        with mock.patch('grp.getgrnam', mock_getgrnam):
+            ugo.prefetch(users=['user1', 'user1'], groups=['nosuchgroup'])
+            assert ugo.cache_stats() == (0, 2)
+
+            assert ugo.name_to_uid('user1') == 101
+            try:
+                ugo.name_to_gid('nosuchgroup')
+            except KeyError:
+                pass
+
+    assert mock_getpwnam.call_count == 1
+    assert mock_getgrnam.call_count == 1
+    assert ugo.cache_stats() == (2, 2)
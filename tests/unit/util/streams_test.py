@@ -1,8 +1,12 @@
+import hashlib
+
+import mock
 from nose.tools import istest
 
-from tests.util import full_path
+from tests.util import full_path, scratch
 
 import salve.util
+from salve.context import ExecutionContext
 
 
 def compare_shas(f1, f2):
@@ -50,3 +54,68 @@ def sha512_mismatch():
     Ensures that the sha512 hashes of nonmatching files don't match.
     """
     assert not compare_shas('a', 'c')
+
+
+class TestWithScratchdir(scratch.ScratchContainer):
+    @istest
+    def hash_binary_file(self):
+        """
+        Unit: Streams Util Hash Binary File
+        Checks that a file which is not valid UTF-8 is hashed by its bytes,
+        with the same result through mmap as through reads.
+        """
+        content = bytes(bytearray(range(256))) * 10
+        name = self.get_fullname('bin')
+        with open(name, 'wb') as f:
+            f.write(content)
+        expect = hashlib.sha512(content).hexdigest()
+
+        assert salve.util.hash_file(name) == expect
+        with mock.patch('salve.util.MMAP_THRESHOLD', 1):
+            assert salve.util.hash_file(name) == expect
+        with mock.patch('salve.util.HASH_CHUNK_SIZE', 100):
+            assert salve.util.hash_file(name) == expect
+
+    @istest
+    def hash_from_path_algorithm(self):
+        """
+        Unit: Streams Util Hash From Path Algorithm
+        Checks that hashes made by the default algorithm are named by the
+        digest alone, and those made by any other by the algorithm too.
+        """
+        self.write_file('a', 'xyz')
+        name = self.get_fullname('a')
+
+        assert salve.util.hash_from_path(name) == \
+            hashlib.sha512(b'xyz').hexdigest()
+        assert salve.util.hash_from_path(name, algorithm='md5') == \
+            'md5-' + hashlib.md5(b'xyz').hexdigest()
+
+        ExecutionContext()['hash_algorithm'] = 'sha1'
+        try:
+            assert salve.util.hash_from_path(name) == \
+                'sha1-' + hashlib.sha1(b'xyz').hexdigest()
+        finally:
+            ExecutionContext()['hash_algorithm'] = 'sha512'
+
+    @istest
+    def hash_copy(self):
+        """
+        Unit: Streams Util Hash Copy
+        Checks that a file copied through hash_copy arrives intact, and that
+        the digest is the file's, even when it spans several chunks.
+        """
+        content = bytes(bytearray(range(256))) * 10
+        src = self.get_fullname('src')
+        dst = self.get_fullname('dst')
+        with open(src, 'wb') as f:
+            f.write(content)
+
+        with mock.patch('salve.util.HASH_CHUNK_SIZE', 100):
+            with open(src, 'rb') as fsrc:
+                with open(dst, 'wb') as fdst:
+                    digest = salve.util.hash_copy(fsrc, fdst)
+
+        assert digest == hashlib.sha512(content).hexdigest()
+        with open(dst, 'rb') as f:
+            assert f.read() == content
@@ -21,7 +21,8 @@ class MockedGlobals(MockedIO):
             for loc in [
                 'backup.file', 'backup.directory',
                 'copy.file', 'create.file',
-                'copy.directory', 'create.directory',
+                'copy.directory', 'create.directory', 'copy.tree',
+                'ensure', 'optimize',
                 'modify.chmod', 'modify.chown',
                 'modify.file_chmod', 'modify.file_chown',
                 'modify.dir_chmod', 'modify.dir_chown'
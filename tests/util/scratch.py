@@ -8,6 +8,8 @@ import mock
 import textwrap
 
 from salve import paths
+from salve.action.backup.log import close_logs
+from salve.filesys.store import BackupStore, close_stores
 from tests.util import MockedGlobals
 
 
@@ -126,6 +128,8 @@ class ScratchContainer(MockedGlobals):
                 if os.path.isdir(fullname) and not os.path.islink(fullname):
                     recursive_chmod(fullname)
 
+        close_logs()
+        close_stores()
         recursive_chmod(self.scratch_dir)
         shutil.rmtree(self.scratch_dir)
 
@@ -135,6 +139,23 @@ class ScratchContainer(MockedGlobals):
     def get_backup_path(self, backup_dir):
         return os.path.join(self.get_fullname(backup_dir), 'files')
 
+    def list_backups(self, backup_dir):
+        return BackupStore(self.get_backup_path(backup_dir)).names()
+
+    def read_backup(self, backup_dir, name):
+        """
+        Read a backed up file, wherever and however the store keeps it.
+        """
+        fd, tmp = tempfile.mkstemp(dir=self.scratch_dir)
+        os.close(fd)
+        os.remove(tmp)
+        try:
+            BackupStore(self.get_backup_path(backup_dir)).restore(name, tmp)
+            with open(tmp) as f:
+                return f.read()
+        finally:
+            os.remove(tmp)
+
     def make_dir(self, relpath):
         full_path = self.get_fullname(relpath)
         try: